@@ -0,0 +1,219 @@
+"""
+Benchmark cold imports, client construction, authentication, call latency, unpacking and report downloads against
+a local stand-in Panopto server, optionally saving the results as a baseline or comparing them against one.
+
+usage: python benchmarks/run_benchmarks.py [--repeat N] [--users N] [--report-rows N] [--only NAME ...]
+                                           [--save BASELINE.json] [--compare BASELINE.json [--tolerance 0.2]]
+
+Run with src on the python path (e.g. PYTHONPATH=src). Comparisons are of medians, and only meaningful between runs
+on the same machine; exits with status 1 if any benchmark is slower than its baseline by more than the tolerance.
+benchmarks/baseline.json is a reference run with the defaults (its environment is recorded in it): save a baseline
+of your own on your machine before a change, and compare against that.
+"""
+# Standard Library
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+# Third Party
+import zeep
+
+# Local
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.ReportReader import ReportReader
+from panopto_api.ServiceRegistry import ServiceRegistry
+from panopto_api.ServiceStub import StubPackage
+from panopto_api.StubGenerator import StubGenerator
+from panopto_api.WsdlCache import WsdlCache
+from stand_in_server import StandInServer
+
+
+class Benchmark(object):
+    """
+    A named measurement: setup runs once, then run is timed repeat times. items is how many things one run handles,
+    for reporting throughput.
+    """
+    def __init__(self, name: str, run: Callable[[], object], items: int = 1, unit: str = 'op',
+                 setup: Optional[Callable[[], object]] = None) -> None:
+        self.name = name
+        self.run = run
+        self.items = items
+        self.unit = unit
+        self.setup = setup
+
+    def measure(self, repeat: int) -> Dict[str, float]:
+        if self.setup is not None:
+            self.setup()
+        # one untimed run to warm up caches and connections
+        self.run()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.run()
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        return {
+            'median': median,
+            'best': min(timings),
+            'items': self.items,
+            'unit': self.unit,
+            'per_second': self.items / median if median else 0.0,
+        }
+
+
+def cold_import(statement: str) -> Callable[[], None]:
+    """
+    Run the statement in a fresh interpreter (with this one's python path), as a short-lived job would on start up.
+    The interpreter's own start up is included, so compare these against a baseline rather than reading them alone.
+    """
+    def run() -> None:
+        subprocess.run([sys.executable, '-c', statement], check=True)
+    return run
+
+
+def benchmarks(server: StandInServer) -> List[Benchmark]:
+    """
+    The benchmarks, all against the server (bar the cold imports, which don't touch it).
+    """
+    endpoints = AuthenticatedClientFactory.get_endpoint()
+    wsdl_dir = tempfile.mkdtemp(prefix='panopto_api_benchmark_')
+    cached = server.factory(wsdl_cache=WsdlCache(wsdl_dir))
+    registry = server.factory(wsdl_cache=WsdlCache(wsdl_dir), service_registry=ServiceRegistry())
+    stub_dir = tempfile.mkdtemp(prefix='panopto_api_benchmark_stubs_')
+    StubGenerator.generate_package(server.host, os.path.join(stub_dir, 'benchmark_stubs'), over_ssl=False)
+    sys.path.insert(0, stub_dir)
+    stubbed = server.factory(stubs=StubPackage('benchmark_stubs'))
+    factory = server.factory()
+    compiled = server.factory(compiled=True)
+    state = {}
+
+    def construct(factory_to_use: AuthenticatedClientFactory) -> Callable[[], None]:
+        def run() -> None:
+            for endpoint in endpoints:
+                factory_to_use.get_client(endpoint, authenticate_now=False)
+        return run
+
+    def setup_clients() -> None:
+        state['users'] = factory.get_client('UserManagement')
+        state['sessions'] = factory.get_client('SessionManagement')
+        state['usage'] = factory.get_client('UsageReporting')
+        state['session_id'] = str(uuid.uuid4())
+        state['compiled_sessions'] = compiled.get_client('SessionManagement')
+
+    def build_request(wrapper_name: str) -> Callable[[], None]:
+        def run() -> None:
+            state[wrapper_name]._request(  # pylint: disable=protected-access
+                'GetSessionsById', {'sessionIds': {'guid': [state['session_id']]}})
+        return run
+
+    def download_report() -> int:
+        with ReportReader.download(state['usage'], str(uuid.UUID(int=0))) as report:
+            return sum(1 for _ in report.rows())
+
+    return [
+        Benchmark('import_interpreter', cold_import('pass'), unit='start'),
+        Benchmark('import_factory', cold_import('import panopto_api.AuthenticatedClientFactory'), unit='start'),
+        Benchmark('import_and_construct_client', cold_import(
+            'from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory\n'
+            'from panopto_api.ServiceRegistry import ServiceRegistry\n'
+            'from panopto_api.WsdlCache import WsdlCache\n'
+            'AuthenticatedClientFactory({!r}, "u", "p", wsdl_cache=WsdlCache({!r}), service_registry=ServiceRegistry())'
+            '.get_client("UserManagement", authenticate_now=False)'.format(server.host, wsdl_dir)), unit='start'),
+        Benchmark('import_and_construct_stub', cold_import(
+            'import sys\n'
+            'sys.path.insert(0, {!r})\n'
+            'from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory\n'
+            'from panopto_api.ServiceStub import StubPackage\n'
+            'AuthenticatedClientFactory({!r}, "u", "p", stubs=StubPackage("benchmark_stubs"))'
+            '.get_client("UserManagement", authenticate_now=False)'.format(stub_dir, server.host)), unit='start'),
+        Benchmark('construct_clients_download', construct(factory), items=len(endpoints), unit='client'),
+        Benchmark('construct_clients_wsdl_cache', construct(cached), items=len(endpoints), unit='client'),
+        Benchmark('construct_clients_registry', construct(registry), items=len(endpoints), unit='client'),
+        Benchmark('construct_clients_stub', construct(stubbed), items=len(endpoints), unit='client'),
+        Benchmark('authenticate', factory.authenticate_factory, setup=setup_clients),
+        Benchmark('call_latency', lambda: state['sessions'].call_service(
+            'GetSessionsById', sessionIds={'guid': [state['session_id']]}), unit='call'),
+        Benchmark('call_latency_compiled', lambda: state['compiled_sessions'].call_service(
+            'GetSessionsById', sessionIds={'guid': [state['session_id']]}), unit='call'),
+        Benchmark('build_request', build_request('sessions'), unit='call'),
+        Benchmark('build_request_compiled', build_request('compiled_sessions'), unit='call'),
+        Benchmark('list_users_page', lambda: state['users'].call_service('ListUsers', searchQuery='user'),
+                  items=server.users, unit='row'),
+        Benchmark('get_report', download_report, items=server.report_rows, unit='row'),
+    ]
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Print each benchmark's median against the baseline's, returning the names of those that regressed.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print('  {:<30} no baseline'.format(name))
+            continue
+        ratio = result['median'] / base['median']
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+        print('  {:<30} {:>7.2f}x baseline{}'.format(name, ratio, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--users', type=int, default=10000, help='users in a ListUsers page')
+    parser.add_argument('--report-rows', type=int, default=100000, help='rows in a GetReport report')
+    parser.add_argument('--only', nargs='+', help='run only the named benchmarks')
+    parser.add_argument('--save', help='write the results to this baseline file')
+    parser.add_argument('--compare', help='compare the results against this baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown tolerated before a regression')
+    args = parser.parse_args()
+
+    results = {}
+    with StandInServer(users=args.users, report_rows=args.report_rows) as server:
+        for benchmark in benchmarks(server):
+            if args.only and benchmark.name not in args.only:
+                continue
+            result = results[benchmark.name] = benchmark.measure(args.repeat)
+            print('{:<30} median {:>10.2f} ms  best {:>10.2f} ms  {:>14,.0f} {}s/sec'.format(
+                benchmark.name, result['median'] * 1000, result['best'] * 1000, result['per_second'], result['unit']))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as baseline_file:
+            json.dump({
+                'environment': {
+                    'python': platform.python_version(),
+                    'zeep': zeep.__version__,
+                    'platform': platform.platform(),
+                    'repeat': args.repeat,
+                    'users': args.users,
+                    'report_rows': args.report_rows,
+                },
+                'results': results,
+            }, baseline_file, indent=2, sort_keys=True)
+        print('saved baseline to {}'.format(args.save))
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        print('compared with {}:'.format(args.compare))
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            print('regressed: {}'.format(', '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+A local stand-in for a Panopto server, for benchmarking without a network.
+
+Serves a WSDL for each of AuthenticatedClientFactory.ENDPOINTS and answers operations with synthetic responses of
+configurable size. Auth is served from the recorded Auth WSDL. The other endpoints' own WSDLs aren't recorded in this
+repository, so each is served the synthetic PublicAPI test WSDL (which covers the operations the benchmarks call)
+renamed to the endpoint's service, with its address: every endpoint offers the same operations, and client
+construction parses a WSDL of the same size for each, so construction timings are indicative, not Panopto's.
+
+usage: python benchmarks/stand_in_server.py [--port N] [--users N] [--report-rows N]
+"""
+# Standard Library
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+import argparse
+import base64
+import io
+import os
+import re
+import threading
+import uuid
+import zipfile
+
+# Local
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests', 'data')
+DATACONTRACT_NS = 'http://schemas.datacontract.org/2004/07/Panopto.Server.Services.PublicAPI.V40'
+LOCATION_REGEX = re.compile(r'location="[^"]*"')
+GUID_REGEX = re.compile(r'<(?:\w+:)?guid[^>]*>([^<]+)<')
+
+
+def envelope(body: str) -> bytes:
+    """
+    Wrap a SOAP body fragment in an envelope.
+    """
+    return ('<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>{}</s:Body></s:Envelope>'
+            .format(body).encode('utf-8'))
+
+
+def log_on_response() -> bytes:
+    return envelope(
+        '<LogOnWithPasswordResponse xmlns="http://tempuri.org/">'
+        '<LogOnWithPasswordResult>true</LogOnWithPasswordResult></LogOnWithPasswordResponse>')
+
+
+def list_users_response(users: int) -> bytes:
+    """
+    A ListUsers response with a page of the specified number of users.
+    """
+    items = ''.join(
+        '<a:User><a:Email>user{0}@example.com</a:Email><a:FirstName>First{0}</a:FirstName>'
+        '<a:LastName>Last{0}</a:LastName><a:UserId>{1}</a:UserId><a:UserKey>user{0}</a:UserKey></a:User>'.format(
+            i, uuid.UUID(int=i)) for i in range(users))
+    return envelope(
+        '<ListUsersResponse xmlns="http://tempuri.org/"><ListUsersResult xmlns:a="{}">'
+        '<a:PagedResults>{}</a:PagedResults><a:TotalNumberResults>{}</a:TotalNumberResults>'
+        '</ListUsersResult></ListUsersResponse>'.format(DATACONTRACT_NS, items, users))
+
+
+def sessions_by_id_response(session_ids) -> bytes:
+    """
+    A GetSessionsById response with a session for each of the ids.
+    """
+    sessions = ''.join(
+        '<a:Session><a:Duration>60.5</a:Duration><a:Id>{0}</a:Id><a:Name>Session {0}</a:Name>'
+        '<a:StartTime>2024-01-01T00:00:00Z</a:StartTime></a:Session>'.format(session_id) for session_id in session_ids)
+    return envelope(
+        '<GetSessionsByIdResponse xmlns="http://tempuri.org/"><GetSessionsByIdResult xmlns:a="{}">{}'
+        '</GetSessionsByIdResult></GetSessionsByIdResponse>'.format(DATACONTRACT_NS, sessions))
+
+
+def report_zip(rows: int) -> bytes:
+    """
+    A zipped usage report CSV with the specified number of rows.
+    """
+    csv = io.StringIO()
+    csv.write('﻿Session Name,Session ID,Presenter,Views,Minutes Delivered\r\n')
+    for i in range(rows):
+        csv.write('"Session {0}, part {1}",{2},Presenter {1},{0},{3:.2f}\r\n'.format(i, i % 7, uuid.UUID(int=i), i * 1.25))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('SessionUsage.csv', csv.getvalue().encode('utf-8'))
+    return buffer.getvalue()
+
+
+def get_report_response(rows: int) -> bytes:
+    """
+    A GetReport response carrying the zipped report as base64, as Panopto sends it.
+    """
+    return envelope(
+        '<GetReportResponse xmlns="http://tempuri.org/"><GetReportResult>{}</GetReportResult>'
+        '</GetReportResponse>'.format(base64.b64encode(report_zip(rows)).decode('ascii')))
+
+
+def fault_response(message: str) -> bytes:
+    return envelope('<s:Fault><faultcode>s:Client</faultcode><faultstring>{}</faultstring></s:Fault>'.format(message))
+
+
+class StandInServer(object):
+    """
+    A threaded http server on the loopback interface standing in for a Panopto server. Start it with start()
+    (or as a context manager) and point an AuthenticatedClientFactory at its host (see factory()).
+    Large responses are generated once, on first request, so benchmarks measure the client rather than the server.
+    """
+    def __init__(self, port: int = 0, users: int = 10000, report_rows: int = 100000) -> None:
+        self.users = users
+        self.report_rows = report_rows
+        self._responses: Dict[str, bytes] = {}
+        self._responses_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self.wsdls = {service: self._wsdl(service, version)
+                      for service, version in AuthenticatedClientFactory.ENDPOINTS.items()}
+        self.requests = 0
+
+    def __enter__(self) -> 'StandInServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def host(self) -> str:
+        return '{}:{}'.format(*self._server.server_address[:2])
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stand_in_server', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def factory(self, **kwargs) -> AuthenticatedClientFactory:
+        """
+        A factory for this server. The server only speaks plain http, so the factory logs on without ssl.
+        """
+        return StandInClientFactory(self.host, 'admin', 'password', **kwargs)
+
+    def _wsdl(self, service: str, version: str) -> bytes:
+        name = 'Auth' if service == 'Auth' else 'PublicAPI'
+        with open(os.path.join(DATA_DIR, '{}.wsdl'.format(name)), 'r', encoding='utf-8') as wsdl_file:
+            wsdl = wsdl_file.read()
+        if name != service:
+            # its definitions and service are named PublicAPI, and its port type, binding, messages and actions
+            # IPublicAPI, as Panopto names them after each service
+            wsdl = wsdl.replace('name="PublicAPI"', 'name="{}"'.format(service)).replace('IPublicAPI', 'I' + service)
+        # the address is fixed up to the server's host when clients are created with the service registry
+        address = 'http://{}/{}'.format(self.host, AuthenticatedClientFactory.get_endpoint(service))
+        return LOCATION_REGEX.sub('location="{}"'.format(address), wsdl).encode('utf-8')
+
+    def _cached(self, key: str, build: Callable[[], bytes]) -> bytes:
+        with self._responses_lock:
+            response = self._responses.get(key)
+            if response is None:
+                response = self._responses[key] = build()
+            return response
+
+    def respond(self, action: str, message: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Answer an operation: the http status, extra headers and body.
+        """
+        if action == 'LogOnWithPassword':
+            return 200, {'Set-Cookie': '.ASPXAUTH={}; path=/; HttpOnly'.format(uuid.uuid4().hex)}, log_on_response()
+        if action == 'ListUsers':
+            return 200, {}, self._cached('ListUsers', lambda: list_users_response(self.users))
+        if action == 'GetReport':
+            return 200, {}, self._cached('GetReport', lambda: get_report_response(self.report_rows))
+        if action == 'GetSessionsById':
+            return 200, {}, sessions_by_id_response(GUID_REGEX.findall(message.decode('utf-8')))
+        return 500, {}, fault_response('{} is not supported by the stand-in server'.format(action))
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body go out in separate writes; with Nagle's algorithm on, the body waits on the client's
+            # delayed ack of the headers (about 40 ms a call) and latency benchmarks measure that instead
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+            def _send(self, status: int, headers: Dict[str, str], body: bytes) -> None:
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/xml; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # noqa: N802 pylint: disable=invalid-name
+                server.requests += 1
+                match = AuthenticatedClientFactory.ENDPOINT_REGEX.match(self.path.split('?')[0].lstrip('/'))
+                wsdl = server.wsdls.get(match.group('service')) if match else None
+                if wsdl is None:
+                    self._send(404, {}, b'')
+                else:
+                    self._send(200, {}, wsdl)
+
+            def do_POST(self):  # noqa: N802 pylint: disable=invalid-name
+                server.requests += 1
+                message = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                action = self.headers.get('SOAPAction', '').strip('"').rsplit('/', 1)[-1]
+                self._send(*server.respond(action, message))
+
+        return Handler
+
+
+class StandInClientFactory(AuthenticatedClientFactory):
+    """
+    An AuthenticatedClientFactory that never uses ssl, since the stand-in server only speaks plain http.
+    """
+    def _decorate_endpoint(self, endpoint_path: str, over_ssl: bool = False) -> str:
+        return super()._decorate_endpoint(endpoint_path, over_ssl=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--report-rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    server = StandInServer(port=args.port, users=args.users, report_rows=args.report_rows)
+    print('serving on http://{}/ (ctrl-c to stop)'.format(server.host))
+    try:
+        server._server.serve_forever()  # pylint: disable=protected-access
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()  # pylint: disable=protected-access
+
+
+if __name__ == '__main__':
+    main()
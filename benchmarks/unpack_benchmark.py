@@ -0,0 +1,109 @@
+"""
+Benchmark unpacking large zeep responses: ClientWrapper._unpack_response versus ResponseUnpacker and RecordUnpacker,
+in speed and in the memory the unpacked result holds.
+
+usage: python benchmarks/unpack_benchmark.py [--rows N] [--repeat N]
+"""
+# Standard Library
+import argparse
+import os
+import time
+import tracemalloc
+import uuid
+
+# Third Party
+import requests
+from zeep import Client
+
+# Local
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.RecordUnpacker import RecordUnpacker
+from panopto_api.ResponseUnpacker import ResponseUnpacker
+
+
+WSDL = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests', 'data', 'PublicAPI.wsdl')
+DATACONTRACT_NS = 'http://schemas.datacontract.org/2004/07/Panopto.Server.Services.PublicAPI.V40'
+
+
+def detailed_usage_response(rows: int) -> bytes:
+    """
+    A GetUserDetailedUsage response with the specified number of rows.
+    """
+    user_id = uuid.uuid4()
+    items = ''.join(
+        '<a:DetailedUsageResponseItem><a:Duration>{}</a:Duration><a:SessionId>{}</a:SessionId>'
+        '<a:StartPosition>{}</a:StartPosition><a:Time>2024-01-01T00:00:{:02d}Z</a:Time><a:UserId>{}</a:UserId>'
+        '</a:DetailedUsageResponseItem>'.format(i * 1.5, uuid.uuid4(), i * 0.5, i % 60, user_id)
+        for i in range(rows))
+    return (
+        '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+        '<GetUserDetailedUsageResponse xmlns="http://tempuri.org/">'
+        '<GetUserDetailedUsageResult xmlns:a="{}"><a:PagedResponses>{}</a:PagedResponses>'
+        '<a:TotalNumberResponses>{}</a:TotalNumberResponses></GetUserDetailedUsageResult>'
+        '</GetUserDetailedUsageResponse></s:Body></s:Envelope>'.format(DATACONTRACT_NS, items, rows)).encode('utf-8')
+
+
+def parse_response(client: Client, operation_name: str, content: bytes) -> object:
+    """
+    Run the content through zeep as if it were the reply to the operation.
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'text/xml; charset=utf-8'
+    response._content = content  # pylint: disable=protected-access
+    binding = client.service._binding  # pylint: disable=protected-access
+    return binding.process_reply(client, binding.get(operation_name), response)
+
+
+def best_of(repeat: int, func, *args) -> float:
+    """
+    The fastest of repeated timings of the function, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def retained(func, *args) -> int:
+    """
+    The bytes allocated by the function that its result keeps alive.
+    """
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        size = tracemalloc.get_traced_memory()[0]
+        del result
+        return size
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    client = Client(WSDL)
+    response = parse_response(client, 'GetUserDetailedUsage', detailed_usage_response(args.rows))
+    unpacker = ResponseUnpacker()
+    assert unpacker.unpack(response) == ClientWrapper._unpack_response(response)  # pylint: disable=protected-access
+
+    wrapper = ClientWrapper(client)
+    record_unpacker = RecordUnpacker(wrapper.types, wrapper.namespaces)
+    assert record_unpacker.unpack(response) == unpacker.unpack(response)
+
+    before = best_of(args.repeat, ClientWrapper._unpack_response, response)  # pylint: disable=protected-access
+    print('{} rows, best of {}'.format(args.rows, args.repeat))
+    print('  _unpack_response: {:>12,.0f} rows/sec'.format(args.rows / before))
+    for name, unpack in (('ResponseUnpacker', unpacker.unpack), ('RecordUnpacker', record_unpacker.unpack)):
+        after = best_of(args.repeat, unpack, response)
+        print('  {}: {:>12,.0f} rows/sec ({:.1f}x), {:>12,} bytes retained'.format(
+            name.rjust(16), args.rows / after, before / after, retained(unpack, response)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,7 @@
-from typing import List
-
 from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.ReportReader import ReportReader
 from datetime import datetime, timedelta
 from time import sleep
-from io import BytesIO, StringIO
-import zipfile
 
 host = 'localhost'
 username = 'admin'
@@ -62,53 +59,35 @@ for attempt in range(3):
 if not isAvailable:
     print('the report engine is taking the day off it seems. try again later.')
 else:
-    # let's get the report! this bit is a little tricky since we want to download raw bytes.
-    raw_response = usage.call_service_raw('GetReport', reportId=report_id)
-    content_buffer = StringIO(raw_response.content).getvalue().encode()
-    with zipfile.ZipFile(BytesIO(content_buffer)) as zip_archive:
-        # there's just one report, the archive is for compression only
-        report_file = zip_archive.namelist()[0]
-        report_rows = zip_archive.open(report_file).readlines()
-    # the rows are comma-delimited content (it's a CSV)
-    if len(report_rows) == 1:
+    # let's get the report! it's streamed to a temporary file and read into columns: numbers land in typed arrays
+    with ReportReader.download(usage, report_id) as report:
+        columns = report.columns()
+    row_count = columns.row_count
+    if not row_count:
         print('the report is empty! use more sessions')
     else:
-        # the report always leads with a 3-character UTF-8 BOM. strip it out.
-        headers: List[str] = report_rows[0][3:].split(',')
-        rows = []
-        for line in report_rows[1:]:
-            # the first field, sessionName, might contain commas itself
-            # in that case, it's wrapped in quotation marks. test that case.
-            if line[0] == '"':
-                splitz = line.split('"')
-                rows.append([splitz[1]] + splitz[2].split(',')[1:])
-            else:
-                rows.append(line.split(','))
-
-        print("{} rows in the report... let's peel out some stats!".format(len(rows)))
+        print("{} rows in the report... let's peel out some stats!".format(row_count))
         print()
 
-        session_name_index = headers.index('Session Name')
-        average_rating_index = headers.index('Average Rating')
-        views_index = headers.index('Views')
+        def nan_to_zero(value):
+            return 0 if value is None or value != value else value
+
         # most-viewed session
-        mvs = max(rows, key=lambda r: r[views_index])
-        print('most-viewed session: {} ({} views)'.format(mvs[session_name_index], mvs[views_index]))
+        views = columns['Views']
+        mvs = max(range(row_count), key=lambda i: nan_to_zero(views[i]))
+        print('most-viewed session: {} ({} views)'.format(columns['Session Name'][mvs], views[mvs]))
         # highest-rated session
-        hrs = max(rows, key=lambda r: r[average_rating_index])
-        print('highest-rated session: {} (rated {} out of 5)'.format(
-            hrs[session_name_index], hrs[average_rating_index]))
-
-        # tabulate presenter stats
-        presenter_index = headers.index('Presenter')
-        presenter_column_indices = {c: headers.index(c) for c in
-                                    ['Views', 'Unique Viewers', 'Minutes Delivered', 'Session Length']}
-        presenter_stats = {p: {c: 0 for c in presenter_column_indices}
-                           for p in set([row[presenter_index] for row in rows])}
-        for row in rows:
-            presenter_stat = presenter_stats[row[presenter_index]]
-            for column, column_index in presenter_column_indices.items():
-                presenter_stat[column] += float(row[column_index])
+        ratings = columns['Average Rating']
+        hrs = max(range(row_count), key=lambda i: nan_to_zero(ratings[i]))
+        print('highest-rated session: {} (rated {} out of 5)'.format(columns['Session Name'][hrs], ratings[hrs]))
+
+        # tabulate presenter stats, a column at a time
+        presenter_columns = ['Views', 'Unique Viewers', 'Minutes Delivered', 'Session Length']
+        presenters = columns['Presenter']
+        presenter_stats = {p: {c: 0 for c in presenter_columns} for p in set(presenters)}
+        for column in presenter_columns:
+            for presenter, value in zip(presenters, columns[column]):
+                presenter_stats[presenter][column] += float(nan_to_zero(value))
 
         # show the people
         for stat_name, stat_description, stat_formatter in [
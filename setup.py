@@ -20,6 +20,10 @@ setup(
         'lxml<5.0.0; python_version < "3.10"',
         'zeep'
     ],
+    extras_require={
+        # AsyncAuthenticatedClientFactory / AsyncClientWrapper
+        'async': ['zeep[async]'],
+    },
     package_dir={'': 'src'},
     packages=find_packages('src'),
     python_requires='>=3.8',
@@ -0,0 +1,184 @@
+"""
+This module provides an asyncio flavor of AuthenticatedClientFactory
+"""
+# Standard Library
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+import asyncio
+import logging
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep import AsyncClient
+    from zeep.transports import AsyncTransport
+
+# Local
+from panopto_api.AsyncClientWrapper import AsyncClientWrapper
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.Instrumentation import Instrument, measure
+from panopto_api.RateLimiter import RateLimiter
+from panopto_api.ResponseCache import ResponseCache
+from panopto_api.ServiceRegistry import ServiceRegistry
+from panopto_api.ServiceStub import ServiceStub, StubPackage
+from panopto_api.SessionStore import SessionStore
+from panopto_api.WsdlCache import WsdlCache
+
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncAuthenticatedClientFactory(AuthenticatedClientFactory):
+    """
+    An AuthenticatedClientFactory whose clients are AsyncClientWrappers, so operations can be awaited
+    without blocking the event loop. Loading and parsing a wsdl is inherently synchronous in zeep,
+    so client construction runs in the loop's default executor.
+    All clients share the factory's AsyncTransport; to allow more concurrent calls than httpx's default
+    connection limits, pass a transport built around an httpx.AsyncClient with larger limits.
+    A rate limiter is waited on without blocking the event loop, and may be shared with sync factories.
+    Requires zeep's async extras (httpx).
+    """
+    # Every operation of AuthenticatedClientFactory that does i/o is overridden here by a coroutine taking the same
+    # arguments: this class substitutes for AuthenticatedClientFactory in code that awaits those operations, not in
+    # sync code, and nothing inherited calls them except from other overrides.
+    # pylint: disable=invalid-overridden-method
+    WRAPPER_CLASS = AsyncClientWrapper
+
+    def __init__(self, host: str, username: str, password: str,  # pylint: disable=too-many-arguments
+                 *, wsdl_cache: Optional[WsdlCache] = None, service_registry: Optional[ServiceRegistry] = None,
+                 transport: Optional['AsyncTransport'] = None, response_cache: Optional[ResponseCache] = None,
+                 session_store: Optional[SessionStore] = None, instrument: Optional[Instrument] = None,
+                 stubs: Optional[StubPackage] = None, results: str = AsyncClientWrapper.DICT_RESULTS,
+                 limiter: Optional[RateLimiter] = None, compiled: Union[bool, Iterable[str]] = False):
+        super().__init__(host, username, password, wsdl_cache=wsdl_cache, service_registry=service_registry,
+                         transport=transport, response_cache=response_cache, session_store=session_store,
+                         instrument=instrument, stubs=stubs, results=results, limiter=limiter, compiled=compiled)
+        self._log_on_task: Optional[asyncio.Future] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+    def _default_transport(self) -> 'AsyncTransport':
+        from zeep.transports import AsyncTransport  # pylint: disable=import-outside-toplevel
+        return AsyncTransport()
+
+    def _client_class(self) -> type:
+        if self.CLIENT_CLASS is not None:
+            return self.CLIENT_CLASS
+        from zeep import AsyncClient  # pylint: disable=import-outside-toplevel
+        return AsyncClient
+
+    async def get_client(self, endpoint: str, over_ssl: bool = False, authenticate_now: bool = True,
+                         as_wrapper: bool = True) -> Union['AsyncClient', AsyncClientWrapper]:
+        """
+        Create a client to the specified endpoint with options:
+            over_ssl: hit the endpoint over ssl
+            authenticate_now: authenticate the client with the factory's cookie
+        """
+        loop = asyncio.get_running_loop()
+        client, rebind_host = await loop.run_in_executor(None, self._create_client, endpoint, over_ssl)
+        if authenticate_now:
+            await self.authenticate_client(client)
+        if as_wrapper:
+            client = self.WRAPPER_CLASS(client, host=rebind_host, cache=self.response_cache, authenticator=self,
+                                        instrument=self.instrument, results=self.results, limiter=self.limiter,
+                                        compiled=self.compiled)
+        return client
+
+    async def get_stub(self, service: str, over_ssl: bool = False, authenticate_now: bool = True) -> ServiceStub:
+        """
+        Create a client to the specified service, wrapped in the typed operations of the factory's stub for it.
+        """
+        if self.stubs is None:
+            raise ValueError('the factory has no stubs')
+        client = await self.get_client(service, over_ssl=over_ssl, authenticate_now=authenticate_now)
+        return self.stubs.stub(client, service, AuthenticatedClientFactory.ENDPOINTS[service])
+
+    async def _log_on(self) -> bool:
+        if self.instrument is None:
+            return await self._post_log_on()
+        with measure(self.instrument, 'LogOnWithPassword', kind='authenticate'):
+            return await self._post_log_on()
+
+    async def _post_log_on(self) -> bool:
+        if self._auth_service is None:
+            # Need to hit auth endpoint over ssl to get cookie,
+            # but we might not be authenticated yet so explicitly don't authenticate the auth client!
+            auth_endpoint = AuthenticatedClientFactory.get_endpoint('Auth')
+            auth_client = await self.get_client(auth_endpoint, authenticate_now=False, as_wrapper=False)
+            self._auth_service = AsyncClientWrapper.create_service_proxy(
+                auth_client, '{http://tempuri.org/}BasicHttpBinding_IAuth',
+                self._decorate_endpoint(auth_endpoint, over_ssl=True))
+            self._auth_client = auth_client
+
+        # need to pick apart raw response to get the cookie
+        response = await AsyncClientWrapper.post_operation(
+            self._auth_client, self._auth_service, 'LogOnWithPassword', userKey=self.username, password=self.password)
+        if response.status_code == 200:
+            xml_str = response.content.decode('utf-8')
+            if self.parse_log_on_with_password_response(xml_str):
+                self._apply_cookie(response.headers['Set-Cookie'])
+                if self.session_store is not None:
+                    self.session_store.save(self.host, self.username, self.cookie)
+                return True
+        return False
+
+    def _apply_cookie(self, cookie: str) -> None:
+        self.cookie = cookie
+        self.transport.client.headers['Cookie'] = self.cookie
+
+    async def authenticate_factory(self) -> bool:
+        """
+        Authenticate the factory by renewing the cookie with stored credentials.
+        Coroutines that ask while a log on is already in flight share its outcome rather than logging on again.
+        """
+        log_on_task = self._log_on_task
+        if log_on_task is None:
+            log_on_task = self._log_on_task = asyncio.ensure_future(self._log_on())
+        try:
+            # shield the shared log on, so one cancelled caller doesn't cancel it for everyone
+            return await asyncio.shield(log_on_task)
+        finally:
+            if log_on_task.done() and self._log_on_task is log_on_task:
+                self._log_on_task = None
+
+    async def refresh_authentication(self, stale_cookie: Optional[str]) -> bool:
+        """
+        Renew the cookie, unless it has already been renewed since stale_cookie was read,
+        here or (with a session store) by another process.
+        Coroutines that find the cookie stale at the same time share a single log on, and with a session store,
+        so do processes sharing the store, as with AuthenticatedClientFactory.
+        """
+        if self._refresh_lock is None:
+            # made here rather than in __init__, so it belongs to the running loop
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            if self.cookie is not None and self.cookie != stale_cookie:
+                return True
+            if self.session_store is None:
+                return await self.authenticate_factory()
+            # another process may have logged on already; if not, log on while it waits.
+            # Acquiring the store's lock blocks the loop until any other process's log on completes.
+            with self.session_store.lock(self.host, self.username):
+                return self._restore_session(stale_cookie) or await self.authenticate_factory()
+
+    async def authenticate_client(self, client: 'AsyncClient') -> bool:
+        """
+        Authenticate the client with the factory's cookie.
+        If the factory doesn't have a cookie, authenticate the factory to get one.
+        """
+        if self.cookie is None:
+            if not await self.refresh_authentication(None):
+                return False
+        client.transport.client.headers['Cookie'] = self.cookie
+        return True
+
+    async def aclose(self) -> None:
+        """
+        Close the connections pooled by the factory's transport, if it has made any.
+        """
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport.wsdl_client.close()
+
+    def close(self) -> None:
+        """
+        Async transports must be closed from the event loop.
+        """
+        raise TypeError('use aclose() to close an {}'.format(type(self).__name__))
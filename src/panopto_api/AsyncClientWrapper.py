@@ -0,0 +1,292 @@
+"""
+This module provides an asyncio flavor of ClientWrapper, built on zeep's async client and transport.
+"""
+# Standard Library
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Deque, Iterable, Iterator, Optional
+import asyncio
+import collections
+import math
+import time
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep import AsyncClient
+    from zeep.proxy import AsyncServiceProxy
+    import requests
+
+# Local
+from panopto_api.ClientWrapper import BatchResult, ClientWrapper
+from panopto_api.Columns import Columns
+from panopto_api.Instrumentation import CallMetrics, measure
+
+
+class AsyncClientWrapper(ClientWrapper):
+    """
+    A ClientWrapper whose operations are awaitable. Inspection of the wsdl works exactly as in ClientWrapper;
+    only invoking operations differs. The wrapped client must be a zeep AsyncClient (with an AsyncTransport).
+    iter_pages, iter_items, iter_column_pages and call_service_many are async generators (use async for);
+    call_service_items and call_service_streamed need a streaming requests session, so they aren't supported.
+    """
+    # Every operation of ClientWrapper that does i/o is overridden here by a coroutine taking the same arguments:
+    # this class substitutes for ClientWrapper in code that awaits those operations, not in sync code, and
+    # nothing inherited calls them except from other overrides.
+    # pylint: disable=invalid-overridden-method
+    @staticmethod
+    def create_service_proxy(client: 'AsyncClient', binding_name: str, address: str) -> 'AsyncServiceProxy':
+        """
+        Create an async service proxy for the named binding at the specified address.
+        """
+        from zeep.proxy import AsyncServiceProxy  # pylint: disable=import-outside-toplevel
+        return AsyncServiceProxy(client, client.wsdl.bindings[binding_name], address=address)
+
+    async def call_service(self, operation_name: str, **kwargs) -> Iterable:
+        """
+        Invoke an operation against the currently bound service and port.
+        Automatically unpack the response into a pythonic object.
+        If the wrapper's cache caches the operation, a fresh cached result is returned instead.
+        """
+        if self.instrument is None:
+            return await self._call_service(operation_name, kwargs, None)
+        with measure(self.instrument, operation_name) as metrics:
+            return await self._call_service(operation_name, kwargs, metrics)
+
+    async def _call_service(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics]) -> Iterable:
+        ttl = self.cache.ttl(operation_name) if self.cache is not None else None
+        key = self._cache_key(operation_name, kwargs) if ttl is not None else None
+        if key is None:
+            return self._unpack(await self._invoke(operation_name, kwargs, metrics), metrics)
+        hit, result = self.cache.get(key)
+        if metrics is not None:
+            metrics.cache_hit = hit
+        if not hit:
+            result = self._unpack(await self._invoke(operation_name, kwargs, metrics), metrics)
+            self.cache.set(key, result, ttl)
+        return result
+
+    async def _invoke(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics] = None) -> object:
+        """
+        Invoke the operation, retrying once with a renewed cookie if it fails for want of authentication.
+        """
+        authenticator = self.authenticator
+        if authenticator is None:
+            return await self._send_limited(operation_name, kwargs, metrics)
+        cookie = authenticator.cookie
+        try:
+            return await self._send_limited(operation_name, kwargs, metrics)
+        except Exception as exc:  # pylint: disable=broad-except
+            if not authenticator.is_authentication_fault(exc) or not await authenticator.refresh_authentication(cookie):
+                raise
+        if metrics is not None:
+            metrics.retries += 1
+        return await self._send_limited(operation_name, kwargs, metrics)
+
+    async def _send_limited(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics]) -> object:
+        """
+        Send the operation through the wrapper's rate limiter, if any (see _limited).
+        """
+        if self.limiter is None:
+            return await self._send(operation_name, kwargs, metrics)
+        return await self._limited(operation_name, lambda: self._send(operation_name, kwargs, metrics), metrics)
+
+    async def _limited(self, operation_name: str, send: Callable[[], Awaitable[Any]],
+                       metrics: Optional[CallMetrics]) -> Any:
+        """
+        Make a call to the operation with await send(), as ClientWrapper._limited does, waiting on the rate limiter
+        and backing off without blocking the event loop.
+        """
+        limiter = self.limiter
+        if limiter is None:
+            return await send()
+        attempt = 0
+        while True:
+            try:
+                async with limiter.limit_call_async(operation_name) as waited:
+                    if metrics is not None:
+                        metrics.add('wait', waited)
+                    return await send()
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt >= limiter.max_retries or not limiter.should_retry(operation_name, exc):
+                    raise
+            if metrics is not None:
+                metrics.retries += 1
+            await asyncio.sleep(limiter.backoff_delay(attempt))
+            attempt += 1
+
+    async def _send(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics]) -> object:
+        if metrics is None:
+            if not self.compiled:
+                return await self._service[operation_name](**kwargs)
+            address, message, http_headers = self._request(operation_name, kwargs)
+            transport = self.client.transport
+            response = transport.new_response(await transport.post(address, message, http_headers))
+            binding = self._service._binding  # pylint: disable=protected-access
+            return binding.process_reply(self.client, binding.get(operation_name), response)
+        response = await self._post(operation_name, kwargs, metrics)
+        binding = self._service._binding  # pylint: disable=protected-access
+        start = time.perf_counter()
+        try:
+            return binding.process_reply(self.client, binding.get(operation_name), response)
+        finally:
+            metrics.add('parse', time.perf_counter() - start)
+
+    async def _post(self, operation_name: str, kwargs: dict, metrics: CallMetrics):
+        address, message, http_headers = self._serialize(operation_name, kwargs, metrics)
+        start = time.perf_counter()
+        try:
+            transport = self.client.transport
+            response = transport.new_response(await transport.post(address, message, http_headers))
+        finally:
+            metrics.add('network', time.perf_counter() - start)
+        metrics.response_bytes += len(response.content)
+        return response
+
+    @staticmethod
+    async def post_operation(client: 'AsyncClient', service: 'AsyncServiceProxy', operation_name: str, **kwargs):
+        """
+        Post the operation to the service and return the raw http response.
+        zeep's raw_response setting is thread-local, so it can't be scoped to one coroutine;
+        posting the envelope directly is what zeep does for raw responses anyway.
+        """
+        binding = service._binding  # pylint: disable=protected-access
+        options = service._binding_options  # pylint: disable=protected-access
+        envelope, http_headers = binding._create(  # pylint: disable=protected-access
+            operation_name, (), kwargs, client=client, options=options)
+        return await client.transport.post_xml(options['address'], envelope, http_headers)
+
+    async def call_service_raw(self, operation_name: str, **kwargs) -> Iterable:
+        """
+        Invoke an operation against the currently bound service and port.
+        Return the response without any unpacking. Good for reading the raw response.
+        A response with a transient status (see RateLimiter.TRANSIENT_STATUS_CODES) is raised as a TransportError.
+        """
+        if self.instrument is None:
+            return await self._limited(operation_name, lambda: self._post_raw(operation_name, kwargs), None)
+        with measure(self.instrument, operation_name, kind='raw') as metrics:
+            return await self._limited(operation_name, lambda: self._post_raw(operation_name, kwargs, metrics), metrics)
+
+    async def _post_raw(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics] = None):
+        if metrics is None:
+            response = await AsyncClientWrapper.post_operation(self.client, self._service, operation_name, **kwargs)
+        else:
+            response = await self._post(operation_name, kwargs, metrics)
+        return self._raise_for_transient_status(response)
+
+    async def call_service_columns(self, operation_name: str, **kwargs) -> Columns:
+        """
+        Invoke an operation with a list-shaped response against the currently bound service and port,
+        and lay its rows out as Columns. See ClientWrapper.call_service_columns.
+        """
+        if self.instrument is None:
+            return self._columns(await self._invoke(operation_name, kwargs))
+        with measure(self.instrument, operation_name, kind='columns') as metrics:
+            response = await self._invoke(operation_name, kwargs, metrics)
+            start = time.perf_counter()
+            columns = self._columns(response)
+            metrics.add('unpack', time.perf_counter() - start)
+            return columns
+
+    async def iter_pages(self, operation_name: str, page_size: Optional[int] = None, prefetch: int = 2,
+                         **kwargs) -> AsyncIterator[dict]:
+        """
+        Invoke a paged operation against the currently bound service and port, yielding each unpacked page in order.
+        See ClientWrapper.iter_pages; here prefetched pages are fetched by concurrent tasks rather than threads.
+        """
+        async for page in self._iter_pages(operation_name, self.call_service, page_size, prefetch, kwargs):
+            yield page
+
+    async def _iter_pages(self, operation_name: str, call: Callable[..., Awaitable[Any]], page_size: Optional[int],
+                          prefetch: int, kwargs: dict) -> AsyncIterator[Any]:
+        """
+        Page through the operation as iter_pages does, fetching each page with await call(operation_name, **kwargs).
+        """
+        path, page_size, first_page_number = self._pagination_start(operation_name, page_size, kwargs)
+
+        def fetch(page_number: int) -> Awaitable[Any]:
+            return call(operation_name, **ClientWrapper._paginate(kwargs, path, page_size, page_number))
+
+        page = await fetch(first_page_number)
+        yield page
+        total = ClientWrapper._page_total(page)
+        if total is None:
+            # without a total, keep going until a page comes up short
+            page_number = first_page_number
+            while ClientWrapper._page_length(page) >= page_size:
+                page_number += 1
+                page = await fetch(page_number)
+                yield page
+            return
+        pending: Deque[asyncio.Future] = collections.deque()
+        try:
+            for page_number in range(first_page_number + 1, int(math.ceil(total / float(page_size)))):
+                pending.append(asyncio.ensure_future(fetch(page_number)))
+                if len(pending) > prefetch:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def iter_items(self, operation_name: str, page_size: Optional[int] = None, prefetch: int = 2,
+                         **kwargs) -> AsyncIterator[dict]:
+        """
+        Invoke a paged operation like iter_pages, yielding the individual items of each page.
+        """
+        async for page in self.iter_pages(operation_name, page_size=page_size, prefetch=prefetch, **kwargs):
+            for item in ClientWrapper.page_items(page):
+                yield item
+
+    async def iter_column_pages(self, operation_name: str, page_size: Optional[int] = None, prefetch: int = 2,
+                                **kwargs) -> AsyncIterator[Columns]:
+        """
+        Invoke a paged operation like iter_pages, yielding each page as Columns.
+        """
+        async for page in self._iter_pages(operation_name, self.call_service_columns, page_size, prefetch, kwargs):
+            yield page
+
+    async def call_service_many(self, operation_name: str, iterable_of_kwargs: Iterable[dict],
+                                max_concurrency: int = 8, ordered: bool = True) -> AsyncIterator[BatchResult]:
+        """
+        Invoke an operation once per set of kwargs, running up to max_concurrency calls at a time as tasks,
+        and yield a BatchResult per call. See ClientWrapper.call_service_many.
+        """
+        async def call(index: int, kwargs: dict) -> BatchResult:
+            try:
+                return BatchResult(index, kwargs, result=await self.call_service(operation_name, **kwargs))
+            except Exception as exc:  # pylint: disable=broad-except
+                return BatchResult(index, kwargs, error=exc)
+
+        async def next_result() -> BatchResult:
+            if ordered:
+                return await pending.popleft()
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            task = next(iter(done))
+            pending.remove(task)
+            return task.result()
+
+        pending: Deque[asyncio.Future] = collections.deque()
+        try:
+            for index, kwargs in enumerate(iterable_of_kwargs):
+                pending.append(asyncio.ensure_future(call(index, kwargs)))
+                if len(pending) >= max_concurrency:
+                    yield await next_result()
+            while pending:
+                yield await next_result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def call_service_items(self, operation_name: str, **kwargs) -> Iterator:
+        """
+        Not supported: the async transport doesn't stream responses into the incremental parser.
+        Use iter_items, or call_service, instead.
+        """
+        raise TypeError('{} does not support call_service_items; use iter_items or call_service'.format(
+            type(self).__name__))
+
+    def call_service_streamed(self, operation_name: str, **kwargs) -> 'requests.Response':
+        """
+        Not supported: the async transport has no requests session to stream a response from.
+        Use call_service_raw instead.
+        """
+        raise TypeError('{} does not support call_service_streamed; use call_service_raw'.format(type(self).__name__))
@@ -2,15 +2,26 @@
 This module provides a class encapsulating the Panopto authentication protocol
 """
 # Standard Library
-from typing import List, Optional, Union
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Union
 import logging
+import re
+import threading
 import xml.etree.ElementTree as ET
 
 # Third Party
-from zeep import Client
+if TYPE_CHECKING:
+    # zeep is imported on first client construction, so get_endpoint and friends don't pay for it
+    from zeep import Client, Transport
 
 # Local
 from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.Instrumentation import Instrument, measure
+from panopto_api.RateLimiter import RateLimiter
+from panopto_api.ResponseCache import ResponseCache
+from panopto_api.ServiceRegistry import ServiceRegistry
+from panopto_api.ServiceStub import ServiceStub, StubPackage
+from panopto_api.SessionStore import SessionStore
+from panopto_api.WsdlCache import WsdlCache
 
 
 LOG = logging.getLogger(__name__)
@@ -23,7 +34,7 @@ class UnexpectedAuthenticationResponseException(Exception):
     pass
 
 
-class AuthenticatedClientFactory(object):
+class AuthenticatedClientFactory(object):  # pylint: disable=too-many-instance-attributes
     """
     A class encapsulating the Panopto authentication protocol, using username/password specified at construction.
     Use the class to get clients for supported endpoints and authenticate them with the stored credentials.
@@ -36,12 +47,82 @@ class AuthenticatedClientFactory(object):
         'UsageReporting': '4.0',
         'UserManagement': '4.0'
     }
+    # the zeep client class; None for zeep.Client, imported when the first client is constructed
+    CLIENT_CLASS: Optional[type] = None
+    WRAPPER_CLASS = ClientWrapper
+    ENDPOINT_REGEX = re.compile(r'^Panopto/PublicAPI/(?P<version>[^/]+)/(?P<service>[^/]+)\.svc$')
+    # only faults meaning the session is missing or expired; a caller denied access to something has a session,
+    # and logging on again won't change what it may do
+    AUTH_FAULT_REGEX = re.compile(
+        r'not logged on|not authenticated|authentication (failed|required|expired)|'
+        r'(session|cookie|ticket)( has)? (expired|timed out)|log ?on (again|required)', re.IGNORECASE)
+    AUTH_FAULT_STATUS_CODES = frozenset([401])
 
-    def __init__(self, host: str, username: str, password: str):
+    def __init__(self, host: str, username: str, password: str,  # pylint: disable=too-many-arguments
+                 *, wsdl_cache: Optional[WsdlCache] = None, service_registry: Optional[ServiceRegistry] = None,
+                 transport: Optional['Transport'] = None, response_cache: Optional[ResponseCache] = None,
+                 session_store: Optional[SessionStore] = None, instrument: Optional[Instrument] = None,
+                 stubs: Optional[StubPackage] = None, results: str = ClientWrapper.DICT_RESULTS,
+                 limiter: Optional[RateLimiter] = None, compiled: Union[bool, Iterable[str]] = False):
+        """
+        Optionally, share a WSDL cache and/or a service registry (such as ServiceRegistry.SERVICE_REGISTRY)
+        to avoid downloading and parsing the same WSDLs over and over.
+        Every client from the factory shares one transport, and so one connection pool and one cookie.
+        Pass a configured transport (e.g. PooledTransport(pool_maxsize=20, operation_timeout=60)) to tune it;
+        otherwise a PooledTransport is made when the factory first needs one.
+        Pass a response cache to have the factory's client wrappers cache read-only operations through it.
+        Client wrappers from the factory retry a call once, with a fresh cookie, if it fails for want of authentication.
+        Pass a session store (e.g. FileSessionStore()) to reuse a still-valid cookie saved by an earlier process
+        instead of logging on, and to save the cookie of every log on for later processes.
+        Pass an instrument (e.g. a MetricsRegistry) to measure client construction, log ons,
+        and every call made through the factory's client wrappers.
+        Pass a package of stubs generated by StubGenerator to construct clients of the services it has stubs for
+        from the stubs, without downloading the wsdl or inspecting it.
+        Pass results=ClientWrapper.RECORD_RESULTS to have the factory's client wrappers unpack responses into Records.
+        Pass a rate limiter (e.g. RateLimiter(rate=50, max_concurrency=16)) to have every client wrapper from the factory
+        share it, so together they stay within what the host tolerates (see RateLimiter).
+        Pass compiled=True (or the names of hot operations) to have the factory's client wrappers send precompiled
+        request envelopes (see ClientWrapper).
+        """
         self.host = host
         self.username = username
         self.password = password
         self.cookie = None
+        self.wsdl_cache = wsdl_cache
+        self.service_registry = service_registry
+        self._transport = transport
+        self._transport_lock = threading.Lock()
+        self.response_cache = response_cache
+        self.session_store = session_store
+        self.instrument = instrument
+        self.stubs = stubs
+        self.results = results
+        self.limiter = limiter
+        self.compiled = compiled
+        self._auth_lock = threading.Lock()
+        self._auth_client = None
+        self._auth_service = None
+
+    @property
+    def transport(self) -> 'Transport':
+        """
+        The transport shared by every client from the factory, made on first use if none was passed in.
+        """
+        if self._transport is None:
+            with self._transport_lock:
+                if self._transport is None:
+                    self._transport = self._default_transport()
+        return self._transport
+
+    def _default_transport(self) -> 'Transport':
+        from panopto_api.PooledTransport import PooledTransport  # pylint: disable=import-outside-toplevel
+        return PooledTransport()
+
+    def _client_class(self) -> type:
+        if self.CLIENT_CLASS is not None:
+            return self.CLIENT_CLASS
+        from zeep import Client  # pylint: disable=import-outside-toplevel
+        return Client
 
     def _decorate_endpoint(self, endpoint_path: str, over_ssl: bool = False) -> str:
         return 'http{}://{}/{}'.format('s' if over_ssl else '', self.host, endpoint_path)
@@ -57,23 +138,86 @@ class AuthenticatedClientFactory(object):
         else:
             return sorted(AuthenticatedClientFactory.ENDPOINTS.keys())
 
+    @staticmethod
+    def parse_endpoint(endpoint_path: str) -> Optional[Tuple[str, str]]:
+        """
+        Split a fully-qualified endpoint into its service name and version.
+        If the endpoint isn't a Panopto public API endpoint, return None.
+        """
+        match = AuthenticatedClientFactory.ENDPOINT_REGEX.match(endpoint_path)
+        return (match.group('service'), match.group('version')) if match else None
+
+    def _get_wsdl(self, endpoint_path: str, over_ssl: bool, transport: 'Transport') -> str:
+        """
+        Locate the WSDL for the endpoint, preferring the factory's WSDL cache when there is one.
+        """
+        wsdl = self._decorate_endpoint(endpoint_path, over_ssl) + '?singleWsdl'
+        service_version = AuthenticatedClientFactory.parse_endpoint(endpoint_path)
+        if self.wsdl_cache is not None and service_version:
+            wsdl = self.wsdl_cache.fetch(self.host, *service_version, url=wsdl, transport=transport)
+        return wsdl
+
+    def _create_client(self, endpoint: str, over_ssl: bool) -> Tuple['Client', Optional[str]]:
+        """
+        Create an unauthenticated client to the specified endpoint.
+        Also return the host its services must be rebound to, if the wsdl is shared through the service registry.
+        """
+        if endpoint in AuthenticatedClientFactory.get_endpoint():
+            endpoint = AuthenticatedClientFactory.get_endpoint(endpoint)
+        if self.instrument is None:
+            return self._build_client(endpoint, over_ssl)
+        with measure(self.instrument, endpoint, kind='construct'):
+            return self._build_client(endpoint, over_ssl)
+
+    def _build_client(self, endpoint: str, over_ssl: bool) -> Tuple['Client', Optional[str]]:
+        service_version = AuthenticatedClientFactory.parse_endpoint(endpoint)
+        wsdl = self.stubs.document(*service_version) if self.stubs is not None and service_version else None
+        rebind_host = None
+        if wsdl is not None:
+            # a stub is generated from one host's wsdl, like a document shared through the service registry
+            rebind_host = self.host
+        else:
+            wsdl = self._get_wsdl(endpoint, over_ssl, self.transport)
+            if self.service_registry is not None and service_version:
+                wsdl = self.service_registry.get_document(*service_version, wsdl=wsdl)
+                rebind_host = self.host
+        client = self._client_class()(wsdl=wsdl, transport=self.transport)
+        if rebind_host:
+            # the default service proxy would point at whichever host the shared document was parsed for
+            port = next(iter(next(iter(client.wsdl.services.values())).ports.values()))
+            client._default_service = self.WRAPPER_CLASS.create_service_proxy(  # pylint: disable=protected-access
+                client, port.binding.name.text,
+                ClientWrapper.rebind_address(port.binding_options['address'], rebind_host))
+        return client, rebind_host
+
     def get_client(self, endpoint: str, over_ssl: bool = False, authenticate_now: bool = True, as_wrapper: bool = True) \
-            -> Union[Client, ClientWrapper]:
+            -> Union['Client', ClientWrapper]:
         """
         Create a client to the specified endpoint with options:
             over_ssl: hit the endpoint over ssl
             authenticate_now: authenticate the client with the factory's cookie
+        If the factory has a WSDL cache, the WSDL is read from it rather than downloaded whenever possible.
+        If the factory has a service registry, the parsed WSDL is shared with every other client of the same service
+        version (whatever the host) and the client's services are rebound to this factory's host.
         """
-        transport = None
-        if endpoint in AuthenticatedClientFactory.get_endpoint():
-            endpoint = AuthenticatedClientFactory.get_endpoint(endpoint)
-        client = Client(wsdl=self._decorate_endpoint(endpoint, over_ssl)+'?singleWsdl', transport=transport)
+        client, rebind_host = self._create_client(endpoint, over_ssl)
         if authenticate_now:
             self.authenticate_client(client)
         if as_wrapper:
-            client = ClientWrapper(client)
+            client = self.WRAPPER_CLASS(client, host=rebind_host, cache=self.response_cache, authenticator=self,
+                                        instrument=self.instrument, results=self.results, limiter=self.limiter,
+                                        compiled=self.compiled)
         return client
 
+    def get_stub(self, service: str, over_ssl: bool = False, authenticate_now: bool = True) -> ServiceStub:
+        """
+        Create a client to the specified service, wrapped in the typed operations of the factory's stub for it.
+        """
+        if self.stubs is None:
+            raise ValueError('the factory has no stubs')
+        client = self.get_client(service, over_ssl=over_ssl, authenticate_now=authenticate_now)
+        return self.stubs.stub(client, service, AuthenticatedClientFactory.ENDPOINTS[service])
+
     def parse_log_on_with_password_response(self, xml_str: str):
         """
         Parse the response from the LogOnWithPassword operation.
@@ -87,38 +231,110 @@ class AuthenticatedClientFactory(object):
             return bool(entry.find('ns:LogOnWithPasswordResult', xml_ns).text.lower() == 'true')
         raise UnexpectedAuthenticationResponseException('Unexpected response from LogOnWithPassword: {}'.format(xml_str))
 
-    def authenticate_factory(self) -> bool:
+    def _get_auth_service(self):
         """
-        Authenticate the factory by renewing the cookie with stored credentials.
+        The service proxy for the Auth endpoint, created on first use and then reused for every log on.
         """
-        # Need to hit auth endpoint over ssl to get cookie,
-        # but we might not be authenticated yet so explicitly don't authenticate the auth client!
-        auth_endpoint = AuthenticatedClientFactory.get_endpoint('Auth')  # Panopto/PublicAPI/4.2/Auth.svc
-        auth_client = self.get_client(auth_endpoint, authenticate_now=False, as_wrapper=False)
-        auth_service = auth_client.create_service(
-            binding_name='{http://tempuri.org/}BasicHttpBinding_IAuth',
-            address=self._decorate_endpoint(auth_endpoint, over_ssl=True)
-        )
+        if self._auth_service is None:
+            # Need to hit auth endpoint over ssl to get cookie,
+            # but we might not be authenticated yet so explicitly don't authenticate the auth client!
+            auth_endpoint = AuthenticatedClientFactory.get_endpoint('Auth')  # Panopto/PublicAPI/4.2/Auth.svc
+            self._auth_client = self.get_client(auth_endpoint, authenticate_now=False, as_wrapper=False)
+            self._auth_service = self._auth_client.create_service(
+                binding_name='{http://tempuri.org/}BasicHttpBinding_IAuth',
+                address=self._decorate_endpoint(auth_endpoint, over_ssl=True)
+            )
+        return self._auth_service
+
+    def _log_on(self) -> bool:
+        if self.instrument is None:
+            return self._post_log_on()
+        with measure(self.instrument, 'LogOnWithPassword', kind='authenticate'):
+            return self._post_log_on()
+
+    def _post_log_on(self) -> bool:
+        auth_service = self._get_auth_service()
 
         # need to pick apart raw response to get the cookie
-        with auth_client.settings(raw_response=True):
+        with self._auth_client.settings(raw_response=True):
             response = auth_service.LogOnWithPassword(userKey=self.username, password=self.password)
             if response.status_code == 200:
                 xml_str = response.content.decode('utf-8')
                 logon_response = self.parse_log_on_with_password_response(xml_str)
                 if logon_response:
-                    self.cookie = response.headers['Set-Cookie']
+                    self._apply_cookie(response.headers['Set-Cookie'])
+                    if self.session_store is not None:
+                        self.session_store.save(self.host, self.username, self.cookie)
                     return True
 
         return False
 
-    def authenticate_client(self, client: Client) -> bool:
+    def _apply_cookie(self, cookie: str) -> None:
+        self.cookie = cookie
+        # every client shares the factory's transport, so this refreshes all of them at once
+        self.transport.session.headers.update({'Cookie': self.cookie})
+
+    def _restore_session(self, stale_cookie: Optional[str]) -> bool:
+        """
+        Adopt the session store's cookie, if it has an unexpired one other than stale_cookie.
+        """
+        if self.session_store is None:
+            return False
+        cookie = self.session_store.load(self.host, self.username)
+        if cookie is None or cookie == stale_cookie:
+            return False
+        self._apply_cookie(cookie)
+        return True
+
+    def authenticate_factory(self) -> bool:
+        """
+        Authenticate the factory by renewing the cookie with stored credentials.
+        """
+        with self._auth_lock:
+            return self._log_on()
+
+    def refresh_authentication(self, stale_cookie: Optional[str]) -> bool:
+        """
+        Renew the cookie, unless it has already been renewed since stale_cookie was read.
+        Threads that find the cookie stale at the same time queue up behind a single log on and then share its cookie,
+        rather than each logging on in turn. With a session store, so do processes sharing the store.
+        """
+        with self._auth_lock:
+            if self.cookie is not None and self.cookie != stale_cookie:
+                return True
+            if self.session_store is None:
+                return self._log_on()
+            # another process may have logged on already; if not, log on while it waits
+            with self.session_store.lock(self.host, self.username):
+                return self._restore_session(stale_cookie) or self._log_on()
+
+    def is_authentication_fault(self, exc: BaseException) -> bool:
+        """
+        Whether an operation failed because the caller isn't (or is no longer) authenticated:
+        an http 401, or a SOAP fault whose message matches AUTH_FAULT_REGEX. Permission faults (http 403, access
+        denied) are not: the caller is authenticated, so they are raised rather than retried.
+        """
+        from zeep.exceptions import Fault, TransportError  # pylint: disable=import-outside-toplevel
+        if isinstance(exc, TransportError):
+            return exc.status_code in self.AUTH_FAULT_STATUS_CODES
+        if isinstance(exc, Fault):
+            return bool(self.AUTH_FAULT_REGEX.search(exc.message or ''))
+        return False
+
+    def authenticate_client(self, client: 'Client') -> bool:
         """
         Authenticate the client with the factory's cookie.
         If the factory doesn't have a cookie, authenticate the factory to get one.
         """
         if self.cookie is None:
-            if not self.authenticate_factory():
+            if not self.refresh_authentication(None):
                 return False
         client.transport.session.headers.update({'Cookie': self.cookie})
         return True
+
+    def close(self) -> None:
+        """
+        Close the connections pooled by the factory's transport, if it has made any.
+        """
+        if self._transport is not None:
+            self._transport.session.close()
@@ -0,0 +1,172 @@
+"""
+This module provides a loader coalescing single-id lookups into calls of operations taking arrays of ids
+"""
+# Standard Library
+from collections.abc import Mapping
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+import threading
+import time
+
+# Local
+from panopto_api.BoundedExecutor import BoundedExecutor
+from panopto_api.ClientWrapper import ClientWrapper, InvalidOperationException
+
+
+class BatchLoader(object):
+    """
+    Coalesces individual lookups by id into batched calls of an operation taking an array of ids, such as
+    SessionManagement.GetSessionsById or UserManagement.GetUsers. load(id) returns a future; ids loaded from any
+    thread within window seconds of the first are collected (up to max_batch_size), deduplicated and looked up in one
+    call, and each result is handed to the futures waiting on its id. Ids with no result resolve to None, and if the
+    call fails, every future in its batch fails with the same exception.
+    Results are matched to ids by key_field (by default, the first of KEY_FIELDS each result has),
+    or by position if results have none of them. Use the loader as a context manager, or call close() when done.
+    """
+    KEY_FIELDS = ('Id', 'UserId', 'SessionId', 'FolderId')
+
+    def __init__(self, client: ClientWrapper, operation_name: str, key_field: Optional[str] = None, *,
+                 max_batch_size: int = 100, window: float = 0.005, max_concurrency: int = 4, **kwargs) -> None:
+        """
+        Load through the operation of the client's bound service. Any kwargs are passed on every call.
+        """
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.client = client
+        self.operation_name = operation_name
+        self.key_field = key_field
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.kwargs = kwargs
+        self._arg_name, self._member_name = self._array_argument()
+        self._pending: Dict[Hashable, Future] = {}
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._first_pending: Optional[float] = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._executor = BoundedExecutor(max_workers=max_concurrency, thread_name_prefix='panopto_api_loader')
+        self._dispatcher = threading.Thread(target=self._dispatch_forever, name='panopto_api_loader', daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self) -> 'BatchLoader':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _array_argument(self) -> tuple:
+        """
+        Find the operation's array argument, and the name of the array's repeated member.
+        """
+        signature = self.client.bound_operation(self.operation_name)
+        if isinstance(signature, dict):
+            for arg_name, arg_type in (signature['input'] or {}).items():
+                if arg_type.split(':')[-1].startswith('ArrayOf'):
+                    members = self.client.types.get(arg_type, {}).get('members') or [None]
+                    return arg_name, (members[0] or {}).get('name')
+        raise InvalidOperationException('{} takes no array argument'.format(self.operation_name))
+
+    def load(self, key: Hashable) -> Future:
+        """
+        Request the result for the id. Requests for an id already waiting for (or in) a call share its future.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('cannot load after close')
+            future = self._pending.get(key) or self._in_flight.get(key)
+            if future is None or future.cancelled():
+                future = self._pending[key] = Future()
+                if self._first_pending is None:
+                    self._first_pending = time.monotonic()
+                self._condition.notify()
+            return future
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Future]:
+        """
+        Request the results for each of the ids.
+        """
+        return [self.load(key) for key in keys]
+
+    def flush(self) -> None:
+        """
+        Dispatch the pending ids now rather than at the end of the window.
+        """
+        with self._condition:
+            self._first_pending = -float('inf') if self._pending else None
+            self._condition.notify()
+
+    def close(self) -> None:
+        """
+        Dispatch the pending ids, wait for every call to finish, and stop the loader.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _dispatch_forever(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._pending and (self._closed or len(self._pending) >= self.max_batch_size):
+                        break
+                    if self._first_pending is not None:
+                        remaining = self._first_pending + self.window - time.monotonic()
+                        if remaining <= 0:
+                            break
+                    elif self._closed:
+                        return
+                    else:
+                        remaining = None
+                    self._condition.wait(remaining)
+                batch = dict(list(self._pending.items())[:self.max_batch_size])
+                for key in list(batch):
+                    del self._pending[key]
+                    # a future its caller cancelled while pending is dropped; the rest can no longer be cancelled
+                    if not batch[key].set_running_or_notify_cancel():
+                        del batch[key]
+                self._in_flight.update(batch)
+                # whatever didn't fit in the batch stays on the clock of the batch's window
+                if not self._pending:
+                    self._first_pending = None
+            if batch:
+                self._executor.submit(self._call, batch)
+
+    @staticmethod
+    def _results(response: Any) -> list:
+        if isinstance(response, Mapping):
+            # ArrayOfX wraps a single repeated member named X
+            response = next(iter(response.values()), None) if len(response) == 1 else None
+        return response or []
+
+    def _match(self, keys: List[Hashable], results: list) -> Dict[Hashable, Any]:
+        present = [result for result in results if result is not None]
+        key_field = self.key_field
+        if key_field is None and present and isinstance(present[0], Mapping):
+            key_field = next((field for field in BatchLoader.KEY_FIELDS if field in present[0]), None)
+        if key_field is None:
+            if len(results) != len(keys):
+                raise InvalidOperationException(
+                    '{} results have no key field and can\'t be matched by position'.format(self.operation_name))
+            return dict(zip(keys, results))
+        # ids are usually guids, which the server may send back in another case
+        by_key = {str(result.get(key_field)).lower(): result for result in present}
+        return {key: by_key.get(str(key).lower()) for key in keys}
+
+    def _call(self, batch: Dict[Hashable, Future]) -> None:
+        keys = list(batch)
+        ids = {self._member_name: keys} if self._member_name else keys
+        try:
+            response = self.client.call_service(self.operation_name, **dict(self.kwargs, **{self._arg_name: ids}))
+            matched, error = self._match(keys, BatchLoader._results(response)), None
+        except Exception as exc:  # pylint: disable=broad-except
+            matched, error = {}, exc
+        with self._condition:
+            for key in keys:
+                del self._in_flight[key]
+        for key, future in batch.items():
+            if error is None:
+                future.set_result(matched.get(key))
+            else:
+                future.set_exception(error)
@@ -0,0 +1,74 @@
+"""
+This module provides a thread pool that consumes its input lazily, with a bounded number of calls in flight
+"""
+# Standard Library
+from concurrent import futures
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+import collections
+
+
+class BoundedExecutor(object):
+    """
+    A thread pool that maps a function over an iterable, submitting at most `window` calls ahead of the consumer.
+    The iterable is consumed lazily and completed futures are handed back one at a time,
+    so arbitrarily long inputs are processed with bounded memory, and work keeps flowing while the caller
+    processes each result. Use it as a context manager, or call shutdown() when done.
+    """
+    def __init__(self, max_workers: int, window: Optional[int] = None, thread_name_prefix: str = 'panopto_api') -> None:
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        self.window = max(window or max_workers, 1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+    def __enter__(self) -> 'BoundedExecutor':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown(wait=exc_type is None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Release the pool's threads, optionally waiting for calls in flight to finish.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Submit a single call to the pool.
+        """
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable, iterable: Iterable, ordered: bool = True) -> Iterator[Future]:
+        """
+        Call fn on each item of the iterable and yield each call's completed future,
+        in input order if ordered, otherwise as the calls complete.
+        Failed calls are yielded like any other; inspect future.exception() or call future.result().
+        If the consumer stops early, calls that haven't started are cancelled.
+        """
+        iterator = iter(iterable)
+        pending = collections.deque() if ordered else set()
+        add = pending.append if ordered else pending.add
+
+        def submit_next() -> bool:
+            for item in iterator:
+                add(self._executor.submit(fn, item))
+                return True
+            return False
+
+        try:
+            while len(pending) < self.window and submit_next():
+                pass
+            while pending:
+                if ordered:
+                    future = pending.popleft()
+                    futures.wait([future])
+                else:
+                    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    future = done.pop()
+                    pending.remove(future)
+                submit_next()
+                yield future
+        finally:
+            for future in pending:
+                future.cancel()
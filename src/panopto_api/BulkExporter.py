@@ -0,0 +1,386 @@
+"""
+This module provides bulk exports of Panopto data, sharded across a process pool, with checkpoint and resume
+"""
+# Standard Library
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, time as datetime_time
+from decimal import Decimal
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from uuid import UUID
+import csv
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import tempfile
+
+# Local
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.ClientWrapper import ClientWrapper, InvalidOperationException
+from panopto_api.Record import Record
+
+
+LOG = logging.getLogger(__name__)
+
+
+class Shard(NamedTuple):
+    """
+    A unit of export work: one call of operation on service with kwargs (or, if paged, every page of it),
+    whose items are written to one file of the named export. key identifies the shard within the export.
+    """
+    export: str
+    key: str
+    service: str
+    operation: str
+    kwargs: dict
+    paged: bool = False
+
+    @property
+    def id(self) -> str:
+        """
+        The shard's id in the checkpoint.
+        """
+        return '{}/{}'.format(self.export, self.key)
+
+
+class ExportResult(NamedTuple):
+    """
+    The outcome of BulkExporter.run: rows written per shard id completed by this run, ids of shards skipped because
+    an earlier run completed them, and an error message per shard id that failed (run again to retry those).
+    """
+    completed: Dict[str, int]
+    skipped: List[str]
+    failed: Dict[str, str]
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether every shard is now complete.
+        """
+        return not self.failed
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, (datetime, date, datetime_time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError('{} is not JSON serializable'.format(type(value).__name__))
+
+
+def _flatten(row: Mapping, prefix: str = '') -> Dict[str, Any]:
+    """
+    Flatten nested mappings into dotted column names, and lists into JSON, for CSV.
+    """
+    flat = {}
+    for name, value in row.items():
+        column = prefix + name
+        if isinstance(value, Mapping):
+            flat.update(_flatten(value, column + '.'))
+        elif isinstance(value, list):
+            flat[column] = json.dumps(value, default=_json_default, separators=(',', ':'))
+        elif isinstance(value, (datetime, date, datetime_time, UUID, Decimal, bytes)):
+            flat[column] = _json_default(value)
+        else:
+            flat[column] = value
+    return flat
+
+
+class ShardRunner(object):
+    """
+    Exports shards with clients from a factory of its own, made on first use with factory_builder.
+    BulkExporter makes one per worker process, since factories, clients and connections can't cross processes.
+    """
+    def __init__(self, factory_builder: Callable[[], AuthenticatedClientFactory], output_dir: str,
+                 file_format: str) -> None:
+        self.factory_builder = factory_builder
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self._factory: Optional[AuthenticatedClientFactory] = None
+        self._clients: Dict[str, ClientWrapper] = {}
+
+    def client(self, service: str) -> ClientWrapper:
+        """
+        The runner's client of the service, authenticated on first use.
+        """
+        client = self._clients.get(service)
+        if client is None:
+            if self._factory is None:
+                self._factory = self.factory_builder()
+            client = self._clients[service] = self._factory.get_client(service)
+        return client
+
+    def rows(self, shard: Shard) -> Iterator:
+        """
+        Call the shard's operation, yielding its items.
+        """
+        client = self.client(shard.service)
+        if shard.paged:
+            return client.iter_items(shard.operation, **shard.kwargs)
+        return iter(ClientWrapper.result_items(client.call_service(shard.operation, **shard.kwargs)))
+
+    def export(self, shard: Shard) -> int:
+        """
+        Write the shard's items to its file as they arrive, returning how many there were. The file is written
+        under a temporary name and renamed into place once complete, so an interrupted shard leaves no file behind.
+        """
+        path = BulkExporter.shard_path(self.output_dir, shard, self.file_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.partial')
+        rows = 0
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as out:
+                if self.file_format == BulkExporter.JSONL:
+                    for row in self.rows(shard):
+                        out.write(json.dumps(row, default=_json_default, separators=(',', ':')))
+                        out.write('\n')
+                        rows += 1
+                else:
+                    rows = ShardRunner.write_csv(self.rows(shard), out)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return rows
+
+    @staticmethod
+    def write_csv(rows: Iterable, out: IO[str]) -> int:
+        """
+        Write the rows to out as CSV, returning how many there were. The columns are every column of every row, in
+        the order they first appear; rows lacking a column leave it empty. Columns aren't known until the last row,
+        so rows are spooled to a temporary file and copied after the header, padded if columns were added along the
+        way.
+        """
+        columns: Dict[str, None] = {}
+        count = 0
+        widened = False
+        with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as body:
+            writer = csv.writer(body)
+            for row in rows:
+                row = _flatten(row) if isinstance(row, Mapping) else {'value': row}
+                width = len(columns)
+                columns.update(dict.fromkeys(row))
+                widened = widened or (count > 0 and len(columns) > width)
+                writer.writerow([row.get(column, '') for column in columns])
+                count += 1
+            if not count:
+                return 0
+            body.seek(0)
+            header = list(columns)
+            csv.writer(out).writerow(header)
+            if not widened:
+                shutil.copyfileobj(body, out)
+                return count
+            out_writer = csv.writer(out)
+            for values in csv.reader(body):
+                out_writer.writerow(values + [''] * (len(header) - len(values)))
+        return count
+
+
+_RUNNER: Optional[ShardRunner] = None
+
+
+def _init_worker(factory_builder: Callable[[], AuthenticatedClientFactory], output_dir: str,
+                 file_format: str) -> None:
+    global _RUNNER  # pylint: disable=global-statement
+    _RUNNER = ShardRunner(factory_builder, output_dir, file_format)
+
+
+def _export_shard(shard: Shard) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Export the shard in a worker process. Errors come back as messages: zeep's exceptions don't always pickle.
+    """
+    try:
+        return _RUNNER.export(shard), None
+    except Exception as exc:  # pylint: disable=broad-except
+        LOG.exception('Exporting %s failed', shard.id)
+        return None, '{}: {}'.format(type(exc).__name__, exc)
+
+
+class BulkExporter(object):
+    """
+    Exports large amounts of data by splitting it into shards (pages of a paged operation, date ranges, or one
+    shard per value of an argument such as a folder, user or session id) and exporting them across a pool of
+    worker processes, each with its own factory (made with factory_builder) and clients.
+    Each shard's items are written, as they arrive, to a file of their own under output_dir/<export>/ (see path_name),
+    as JSON lines (JSONL) or CSV (with nested members flattened into dotted column names, and the columns of every
+    row). Completed shards are recorded in output_dir/checkpoint.json, so running the same shards again after an
+    interruption or failure exports only those not yet complete. Read an export back with read, e.g. to plan the
+    shards of a next stage from its ids.
+    factory_builder must be picklable, e.g. functools.partial(AuthenticatedClientFactory, host, username, password,
+    wsdl_cache=WsdlCache(), session_store=FileSessionStore()); the session store lets the workers share one log on.
+    Each process limits its own calls, so give the factory a RateLimiter sized for one process's share of the host.
+    With processes=0, shards are exported one at a time in the calling process.
+    """
+    JSONL = 'jsonl'
+    CSV = 'csv'
+    CHECKPOINT_FILE = 'checkpoint.json'
+    UNSAFE_PATH_CHARACTERS = re.compile(r'[^A-Za-z0-9._-]')
+
+    def __init__(self, factory_builder: Callable[[], AuthenticatedClientFactory], output_dir: str,
+                 file_format: str = JSONL, processes: Optional[int] = None) -> None:
+        if file_format not in (BulkExporter.JSONL, BulkExporter.CSV):
+            raise ValueError('unknown file format {}'.format(file_format))
+        self.factory_builder = factory_builder
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.checkpoint_path = os.path.join(output_dir, BulkExporter.CHECKPOINT_FILE)
+        # plans shards, and runs them when processes=0
+        self._runner = ShardRunner(factory_builder, output_dir, file_format)
+
+    @staticmethod
+    def path_name(name: str) -> str:
+        """
+        The name as a file name: itself if it's safe, or else with unsafe characters replaced by _ and a hash of the
+        name appended, so names differing only in unsafe characters (e.g. a/b and a_b) don't share a file.
+        """
+        safe = BulkExporter.UNSAFE_PATH_CHARACTERS.sub('_', name)
+        if name and safe == name and name not in ('.', '..'):
+            return name
+        return '{}-{}'.format(safe, hashlib.sha256(name.encode('utf-8')).hexdigest()[:12])
+
+    @staticmethod
+    def shard_path(output_dir: str, shard: Shard, file_format: str) -> str:
+        """
+        The location of the shard's file.
+        """
+        return os.path.join(output_dir, BulkExporter.path_name(shard.export),
+                            '{}.{}'.format(BulkExporter.path_name(shard.key), file_format))
+
+    def page_shards(self, export: str, service: str, operation: str, page_size: int = ClientWrapper.DEFAULT_PAGE_SIZE,
+                    **kwargs) -> List[Shard]:
+        """
+        A shard per page of a paged operation. A one-item page is fetched to learn the number of pages.
+        Items added or removed while the export runs can shift between pages, as with any paging.
+        """
+        client = self._runner.client(service)
+        path = client._pagination_path(operation)  # pylint: disable=protected-access
+        first_kwargs = ClientWrapper._paginate(kwargs, path, 1, 0)  # pylint: disable=protected-access
+        first = client.call_service(operation, **first_kwargs)
+        total = ClientWrapper._page_total(first)  # pylint: disable=protected-access
+        if total is None:
+            raise InvalidOperationException('{} reports no total; export it as one paged shard'.format(operation))
+        return [
+            Shard(export, 'page-{:06d}'.format(page_number), service, operation,
+                  ClientWrapper._paginate(kwargs, path, page_size, page_number))  # pylint: disable=protected-access
+            for page_number in range(int(math.ceil(total / float(page_size))))
+        ]
+
+    @staticmethod
+    def date_range_shards(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            export: str, service: str, operation: str, begin: datetime, end: datetime, interval: timedelta, *,
+            begin_argument: Union[str, Tuple[str, ...]] = 'beginRange',
+            end_argument: Union[str, Tuple[str, ...]] = 'endRange', paged: bool = False, **kwargs) -> List[Shard]:
+        """
+        A shard per interval from begin to end, passing each interval's bounds as begin_argument and end_argument
+        (e.g. GetSessionSummaryUsage's beginRange and endRange, or ('request', 'StartDate') and
+        ('request', 'EndDate') for GetSessionsList). If paged, each shard pages through its interval.
+        """
+        shards = []
+        start = begin
+        while start < end:
+            stop = min(start + interval, end)
+            shards.append(Shard(export, '{:%Y%m%dT%H%M%S}-{:%Y%m%dT%H%M%S}'.format(start, stop), service, operation,
+                                ClientWrapper.with_arguments(kwargs, {begin_argument: start, end_argument: stop}),
+                                paged))
+            start = stop
+        return shards
+
+    @staticmethod
+    def value_shards(export: str, service: str, operation: str, argument: Union[str, Tuple[str, ...]],
+                     values: Iterable[Any], *, paged: bool = False, **kwargs) -> List[Shard]:
+        """
+        A shard per value, passing it as argument: a name, or a tuple path of names into a nested argument
+        (e.g. ('request', 'FolderId')). If paged, each shard pages through the operation for its value.
+        """
+        return [
+            Shard(export, str(value), service, operation, ClientWrapper.with_arguments(kwargs, {argument: value}), paged)
+            for value in values
+        ]
+
+    def checkpoint(self) -> Dict[str, int]:
+        """
+        Rows written per completed shard id, as recorded in the checkpoint file.
+        """
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return {}
+        if checkpoint.get('format') != self.file_format:
+            raise ValueError('{} was written as {}'.format(self.output_dir, checkpoint.get('format')))
+        return checkpoint['done']
+
+    def _save_checkpoint(self, done: Dict[str, int]) -> None:
+        """
+        Replace the checkpoint file atomically, so an interruption never leaves it half written.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.output_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+                json.dump({'format': self.file_format, 'done': done}, temp_file, indent=1, sort_keys=True)
+            os.replace(temp_path, self.checkpoint_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def run(self, shards: Iterable[Shard]) -> ExportResult:
+        """
+        Export every shard not already complete, recording each in the checkpoint as it completes.
+        A failing shard doesn't stop the others; it's reported in the result and retried by the next run.
+        """
+        done = self.checkpoint()
+        shards = list(shards)
+        ids = [shard.id for shard in shards]
+        if len(set(ids)) != len(ids):
+            raise ValueError('shard ids must be unique')
+        pending = [shard for shard in shards if shard.id not in done]
+        result = ExportResult({}, [shard.id for shard in shards if shard.id in done], {})
+
+        def record(shard: Shard, rows: Optional[int], error: Optional[str]) -> None:
+            if error is not None:
+                result.failed[shard.id] = error
+                return
+            result.completed[shard.id] = done[shard.id] = rows
+            self._save_checkpoint(done)
+
+        if not self.processes:
+            for shard in pending:
+                try:
+                    record(shard, self._runner.export(shard), None)
+                except Exception as exc:  # pylint: disable=broad-except
+                    LOG.exception('Exporting %s failed', shard.id)
+                    record(shard, None, '{}: {}'.format(type(exc).__name__, exc))
+            return result
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                 initargs=(self.factory_builder, self.output_dir, self.file_format)) as pool:
+            futures = {pool.submit(_export_shard, shard): shard for shard in pending}
+            for future in as_completed(futures):
+                record(futures[future], *future.result())
+        return result
+
+    def read(self, export: str) -> Iterator[dict]:
+        """
+        The rows exported so far under the export's name, shard by shard. CSV values are read back as strings.
+        """
+        export_dir = os.path.join(self.output_dir, BulkExporter.path_name(export))
+        suffix = '.' + self.file_format
+        for name in sorted(os.listdir(export_dir)) if os.path.isdir(export_dir) else []:
+            if not name.endswith(suffix):
+                continue
+            with open(os.path.join(export_dir, name), 'r', encoding='utf-8', newline='') as export_file:
+                if self.file_format == BulkExporter.JSONL:
+                    for line in export_file:
+                        yield json.loads(line)
+                else:
+                    yield from csv.DictReader(export_file)
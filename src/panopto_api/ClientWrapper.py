@@ -2,11 +2,31 @@
 This module provides a class wrapping the zeep SOAP infrastructure to make it more pythonic.
 """
 # Standard Library
+from collections.abc import Mapping
+from contextlib import closing
+import math
 import re
-from typing import Iterable, Optional, Union
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+import weakref
 
 # Third Party
-from zeep import Client
+if TYPE_CHECKING:
+    # zeep (and with it lxml and requests) is imported where it's first used, once a client exists,
+    # so importing panopto_api stays cheap for code that never constructs one
+    from zeep import Client
+    import requests
+
+# Local
+from panopto_api.BoundedExecutor import BoundedExecutor
+from panopto_api.Columns import Columns
+from panopto_api.EnvelopeTemplate import EnvelopeTemplate, UncompilableOperationException, UnsupportedValueException
+from panopto_api.Instrumentation import CallMetrics, Instrument, measure
+from panopto_api.RateLimiter import RateLimiter
+from panopto_api.RecordUnpacker import RecordUnpacker
+from panopto_api.ResponseCache import ResponseCache
+from panopto_api.ResponseUnpacker import ResponseUnpacker
 
 
 class InvalidTypeException(Exception):
@@ -23,15 +43,50 @@ class InvalidServiceConfigurationException(Exception):
     pass
 
 
-class ClientWrapper(object):
+class InvalidOperationException(Exception):
+    """
+    Exception raised when an operation can't be invoked in the requested way
+    """
+    pass
+
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of one call in a batch: its position in the batch, its arguments,
+    and either its unpacked result or the exception it raised.
+    """
+    index: int
+    kwargs: dict
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the call succeeded.
+        """
+        return self.error is None
+
+
+class ClientWrapper(object):  # pylint: disable=too-many-public-methods
     """
     A class wrapping the zeep SOAP infrastructure to make it more pythonic. zeep uses proxies to optimistically invoke
     services, ports, and operations, which may or may not exist in the wsdl. This wrapper class inspects the wsdl to provide
     the available services, ports, and operations in a pythonic way to make programmatic discovery of the same easy.
     wsdl-specified namespaces and types are also exposed for convenience. In many cases, zeep can cons up those types from
     pythonic objects, but not always.
+    The inspected wsdl details are computed lazily, on first access, once per parsed wsdl document, and are shared by
+    every wrapper around it; a wrapper that only calls operations never pays for the inspection.
     """
+    PAGINATION_TYPE = 'Pagination'
+    PAGED_RESULTS_FIELDS = ('PagedResults', 'PagedResponses')
+    TOTAL_RESULTS_FIELDS = ('TotalNumberResults', 'TotalNumberResponses')
+    DEFAULT_PAGE_SIZE = 100
+    STREAM_CHUNK_SIZE = 64 * 1024
+    DICT_RESULTS = 'dicts'
+    RECORD_RESULTS = 'records'
     REGEX = re.compile(r'^(?P<namespace>[^:]+):(?P<name>[^\(]+)\((?P<member_list>[^\)]+)\)$')
+    _DEFINITIONS: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
 
     @staticmethod
     def _parse_operation_signature(op_sig: str) -> dict:
@@ -102,21 +157,115 @@ class ClientWrapper(object):
         else:
             return response
 
-    def __init__(self, client: Client) -> None:
+    @staticmethod
+    def rebind_address(address: str, host: str) -> str:
+        """
+        Move a service address onto the specified host, keeping its scheme and path.
+        """
+        parts = urlsplit(address)
+        return urlunsplit((parts.scheme, host, parts.path, parts.query, parts.fragment))
+
+    @staticmethod
+    def create_service_proxy(client: 'Client', binding_name: str, address: str):
+        """
+        Create a service proxy for the named binding at the specified address.
+        """
+        return client.create_service(binding_name, address)
+
+    def __init__(self, client: 'Client', host: Optional[str] = None, *, cache: Optional[ResponseCache] = None,
+                 authenticator: Optional[Any] = None, instrument: Optional[Instrument] = None,
+                 results: str = DICT_RESULTS, limiter: Optional[RateLimiter] = None,
+                 compiled: Union[bool, Iterable[str]] = False) -> None:
+        """
+        Wrap the client. If a host is specified, services are bound to that host rather than
+        the address in the wsdl, which is needed when the wsdl document is shared across hosts.
+        If a response cache is specified, call_service serves the operations it caches from it.
+        If an authenticator (the AuthenticatedClientFactory that made the client) is specified,
+        call_service renews the cookie through it and retries once when a call fails for want of authentication.
+        If an instrument (a callable such as a MetricsRegistry) is specified, call_service and call_service_raw
+        report a CallMetrics to it for every call, with the time spent in each phase of the call.
+        results is how call_service unpacks responses: DICT_RESULTS unpacks complex values into dicts, and
+        RECORD_RESULTS into Records (compact, typed objects with attribute and read-only mapping access).
+        If a rate limiter is specified (usually the one shared by the factory's wrappers), every call (through
+        call_service, call_service_raw, call_service_streamed and the methods built on them) waits on it and is
+        retried, as it directs, if it fails transiently.
+        compiled opts operations (every one if True, else those named) into precompiled request envelopes: each
+        operation's envelope is compiled once into an EnvelopeTemplate, shared by every wrapper around the wsdl,
+        and calls fill in just their arguments instead of having zeep build the envelope. Calls whose arguments
+        the template doesn't fit, and operations that don't compile, are serialized by zeep as usual.
+        """
         if not client:
             raise ValueError('client must be provided')
+        if results not in (ClientWrapper.DICT_RESULTS, ClientWrapper.RECORD_RESULTS):
+            raise ValueError('unknown results {}'.format(results))
         self.client = client
+        self.host = host
+        self.cache = cache
+        self.authenticator = authenticator
+        self.instrument = instrument
+        self.results = results
+        self.limiter = limiter
+        self.compiled = compiled if isinstance(compiled, bool) else frozenset(compiled)
         self.bound_service_name = None
         self.bound_port_name = None
-        self._unpack_types()
-        self._unpack_services()
         self._service = self.bind()
 
-    def _unpack_services(self) -> None:
-        self.services = {}
+    def _definition(self, name: str, unpack: Callable[[], Any]) -> Any:
+        """
+        Look up a wsdl definition shared by every wrapper around the same wsdl document,
+        unpacking it on first use.
+        """
+        definitions = ClientWrapper._DEFINITIONS.get(self.client.wsdl)
+        if definitions is None:
+            definitions = ClientWrapper._DEFINITIONS.setdefault(self.client.wsdl, {})
+        definition = definitions.get(name)
+        if definition is None:
+            definition = definitions[name] = unpack()
+        return definition
+
+    @property
+    def namespaces(self) -> dict:
+        """
+        The namespace prefixes used by the wsdl's types and elements.
+        """
+        return self._definition('namespaces', lambda: self.client.wsdl.types.prefix_map)
+
+    @property
+    def elements(self) -> dict:
+        """
+        The wsdl's elements, parsed from their signatures on first access.
+        """
+        return self._definition('elements', self._unpack_elements)
+
+    @property
+    def types(self) -> dict:
+        """
+        The wsdl's types, parsed from their signatures on first access.
+        """
+        return self._definition('types', self._unpack_types)
+
+    @property
+    def services(self) -> dict:
+        """
+        The wsdl's services, ports, and operation signatures, parsed on first access.
+        """
+        return self._definition('services', self._unpack_services)
+
+    @property
+    def unpacker(self) -> ResponseUnpacker:
+        """
+        The response unpacker for the wsdl and the wrapper's results,
+        whose compiled converters are shared by every wrapper around the wsdl with the same results.
+        """
+        if self.results == ClientWrapper.RECORD_RESULTS:
+            return self._definition('record_unpacker', lambda: RecordUnpacker(self.types, self.namespaces))
+        return self._definition('unpacker', ResponseUnpacker)
+
+    def _unpack_services(self) -> dict:
+        services = {}
         for service_name, service in self.client.wsdl.services.items():
             srv = {}
-            self.services[service_name] = srv
+            services[service_name] = srv
             for port_name, port in service.ports.items():
                 prt = {}
                 srv[port_name] = prt
@@ -128,29 +277,40 @@ class ClientWrapper(object):
                         }
                     except Exception as exc:
                         raise InvalidServiceConfigurationException(operation_name) from exc
+        return services
 
-    def _unpack_types(self) -> None:
+    def _unpack_elements(self) -> dict:
         wsdl = self.client.wsdl
-        self.namespaces = wsdl.types.prefix_map
-        self.elements = {
+        return {
             '{}:{}'.format(sig['namespace'], sig['name']): sig for sig in
             [ClientWrapper._parse_element_signature(el.signature(schema=wsdl.types))
              for el in wsdl.types.elements] if sig
         }
-        self.types = {
+
+    def _unpack_types(self) -> dict:
+        wsdl = self.client.wsdl
+        return {
             '{}:{}'.format(sig['namespace'], sig['name']): sig for sig in
             [ClientWrapper._parse_type_signature(t.signature(schema=wsdl.types))
              for t in wsdl.types.types] if sig
         }
 
-    def bind(self, service_name: Optional[str] = None, port_name: Optional[str] = None) -> Client:
+    def bind(self, service_name: Optional[str] = None, port_name: Optional[str] = None) -> 'Client':
         """
         Set the active service of this ClientWrapper to the specified service and port names.
         If either is unspecified, the default is used. In most cases, that's desired.
         """
-        service_name = service_name or list(self.services.keys())[0]
-        port_name = port_name or list(self.services[service_name].keys())[0]
-        self._service = self.client.bind(service_name, port_name)
+        # read the defaults straight from the wsdl so binding doesn't force unpacking operation signatures
+        wsdl_services = self.client.wsdl.services
+        service_name = service_name or next(iter(wsdl_services))
+        port_name = port_name or next(iter(wsdl_services[service_name].ports))
+        if self.host:
+            port = wsdl_services[service_name].ports[port_name]
+            self._service = self.create_service_proxy(
+                self.client, port.binding.name.text,
+                ClientWrapper.rebind_address(port.binding_options['address'], self.host))
+        else:
+            self._service = self.client.bind(service_name, port_name)
         self.bound_service_name = service_name
         self.bound_port_name = port_name
         return self._service
@@ -163,18 +323,540 @@ class ClientWrapper(object):
         operations = self.services[self.bound_service_name][self.bound_port_name]
         return operations.get(operation_name, sorted(operations.keys()))
 
+    def _cache_key(self, operation_name: str, kwargs: dict) -> Optional[str]:
+        """
+        The key of the call in the cache, or None if its arguments can't be keyed, so it mustn't be cached.
+        """
+        address = self._service._binding_options['address']  # pylint: disable=protected-access
+        identity = getattr(self.authenticator, 'username', None) or ''
+        try:
+            return ResponseCache.key(address, self.bound_service_name, self.bound_port_name, operation_name, kwargs,
+                                     identity=identity, results=self.results)
+        except TypeError:
+            # an argument has no canonical form
+            return None
+
     def call_service(self, operation_name: str, **kwargs) -> Iterable:
         """
         Invoke an operation against the currently bound service and port.
         Automatically unpack the response into a pythonic object.
+        If the wrapper's cache caches the operation, a fresh cached result is returned instead.
+        """
+        if self.instrument is None:
+            return self._call_service(operation_name, kwargs, None)
+        with measure(self.instrument, operation_name) as metrics:
+            return self._call_service(operation_name, kwargs, metrics)
+
+    def _call_service(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics]) -> Iterable:
+        ttl = self.cache.ttl(operation_name) if self.cache is not None else None
+        key = self._cache_key(operation_name, kwargs) if ttl is not None else None
+        if key is None:
+            return self._unpack(self._invoke(operation_name, kwargs, metrics), metrics)
+        hit, result = self.cache.get(key)
+        if metrics is not None:
+            metrics.cache_hit = hit
+        if not hit:
+            result = self._unpack(self._invoke(operation_name, kwargs, metrics), metrics)
+            self.cache.set(key, result, ttl)
+        return result
+
+    def _unpack(self, response: object, metrics: Optional[CallMetrics]) -> Iterable:
+        if metrics is None:
+            return self.unpacker.unpack(response)
+        start = time.perf_counter()
+        result = self.unpacker.unpack(response)
+        metrics.add('unpack', time.perf_counter() - start)
+        return result
+
+    def _invoke(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics] = None) -> object:
+        """
+        Invoke the operation, retrying once with a renewed cookie if it fails for want of authentication.
+        """
+        authenticator = self.authenticator
+        if authenticator is None:
+            return self._send_limited(operation_name, kwargs, metrics)
+        cookie = authenticator.cookie
+        try:
+            return self._send_limited(operation_name, kwargs, metrics)
+        except Exception as exc:  # pylint: disable=broad-except
+            if not authenticator.is_authentication_fault(exc) or not authenticator.refresh_authentication(cookie):
+                raise
+        if metrics is not None:
+            metrics.retries += 1
+        return self._send_limited(operation_name, kwargs, metrics)
+
+    def _send_limited(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics]) -> object:
+        """
+        Send the operation through the wrapper's rate limiter, if any (see _limited).
+        """
+        if self.limiter is None:
+            return self._send(operation_name, kwargs, metrics)
+        return self._limited(operation_name, lambda: self._send(operation_name, kwargs, metrics), metrics)
+
+    def _limited(self, operation_name: str, send: Callable[[], Any], metrics: Optional[CallMetrics]) -> Any:
+        """
+        Make a call to the operation with send, holding a slot of the wrapper's rate limiter, if any, and retrying
+        failures it deems safe to retry (see RateLimiter.should_retry) with backoff.
+        """
+        limiter = self.limiter
+        if limiter is None:
+            return send()
+        attempt = 0
+        while True:
+            try:
+                with limiter.limit_call(operation_name) as waited:
+                    if metrics is not None:
+                        metrics.add('wait', waited)
+                    return send()
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt >= limiter.max_retries or not limiter.should_retry(operation_name, exc):
+                    raise
+            if metrics is not None:
+                metrics.retries += 1
+            time.sleep(limiter.backoff_delay(attempt))
+            attempt += 1
+
+    def _send(self, operation_name: str, kwargs: dict, metrics: Optional[CallMetrics]) -> object:
+        """
+        Invoke the operation through zeep. When measuring, or compiling envelopes, do what zeep's operation proxy
+        does one step at a time.
+        """
+        if metrics is None:
+            if not self.compiled:
+                return self._service[operation_name](**kwargs)
+            address, message, http_headers = self._request(operation_name, kwargs)
+            response = self.client.transport.post(address, message, http_headers)
+            binding = self._service._binding  # pylint: disable=protected-access
+            return binding.process_reply(self.client, binding.get(operation_name), response)
+        response = self._post(operation_name, kwargs, metrics)
+        binding = self._service._binding  # pylint: disable=protected-access
+        start = time.perf_counter()
+        try:
+            return binding.process_reply(self.client, binding.get(operation_name), response)
+        finally:
+            metrics.add('parse', time.perf_counter() - start)
+
+    def _template(self, operation_name: str) -> Optional[EnvelopeTemplate]:
+        """
+        The operation's compiled envelope, if the wrapper compiles it and it compiles, compiling it on first use.
+        """
+        if self.compiled is not True and operation_name not in self.compiled:
+            return None
+        binding = self._service._binding  # pylint: disable=protected-access
+        templates = self._definition('envelope_templates', dict)
+        key = (binding.name.text, operation_name)
+        template = templates.get(key)
+        if template is None:
+            try:
+                template = EnvelopeTemplate.compile(
+                    self.client, binding, self._service._binding_options, operation_name)  # pylint: disable=protected-access
+            except UncompilableOperationException:
+                template = False
+            templates[key] = template
+        return template or None
+
+    def _request(self, operation_name: str, kwargs: dict) -> tuple:
+        """
+        Build the operation's envelope, from its compiled template if it has one the arguments fit, else as zeep's
+        operation proxy would, and return the address, message and http headers to post.
+        """
+        options = self._service._binding_options  # pylint: disable=protected-access
+        template = self._template(operation_name) if self.compiled else None
+        if template is not None:
+            try:
+                message, http_headers = template.render(self.client, kwargs)
+                return options['address'], message, http_headers
+            except UnsupportedValueException:
+                pass
+        from zeep.wsdl.utils import etree_to_string  # pylint: disable=import-outside-toplevel
+        binding = self._service._binding  # pylint: disable=protected-access
+        soap_headers = self._service[operation_name]._merge_soap_headers(  # pylint: disable=protected-access
+            kwargs.get('_soapheaders'))
+        if soap_headers:
+            kwargs = dict(kwargs, _soapheaders=soap_headers)
+        envelope, http_headers = binding._create(  # pylint: disable=protected-access
+            operation_name, (), kwargs, client=self.client, options=options)
+        return options['address'], etree_to_string(envelope), http_headers
+
+    def _serialize(self, operation_name: str, kwargs: dict, metrics: CallMetrics) -> tuple:
+        """
+        Build the operation's envelope (see _request), measuring it, and return the address, message and
+        http headers to post.
+        """
+        start = time.perf_counter()
+        address, message, http_headers = self._request(operation_name, kwargs)
+        metrics.add('serialize', time.perf_counter() - start)
+        metrics.request_bytes += len(message)
+        return address, message, http_headers
+
+    def _post(self, operation_name: str, kwargs: dict, metrics: CallMetrics) -> 'requests.Response':
         """
-        response = self._service[operation_name](**kwargs)
-        return ClientWrapper._unpack_response(response)
+        Serialize and post the operation's envelope, measuring each step, and return the http response.
+        """
+        address, message, http_headers = self._serialize(operation_name, kwargs, metrics)
+        start = time.perf_counter()
+        try:
+            response = self.client.transport.post(address, message, http_headers)
+        finally:
+            metrics.add('network', time.perf_counter() - start)
+        metrics.response_bytes += len(response.content)
+        return response
+
+    def _columns(self, response: object) -> Columns:
+        """
+        Lay out a list-shaped response as columns: the rows are the response itself if it's a list, else the
+        member named in PAGED_RESULTS_FIELDS, else its only member, descending until a list turns up.
+        A total named in TOTAL_RESULTS_FIELDS is kept along the way.
+        """
+        total = None
+        rows = response
+        member_name = 'value'
+        while rows is not None and not isinstance(rows, list):
+            try:
+                values = object.__getattribute__(rows, '__values__')
+            except AttributeError as exc:
+                raise InvalidOperationException('response is not list-shaped') from exc
+            total = next((values[field] for field in ClientWrapper.TOTAL_RESULTS_FIELDS
+                          if values.get(field) is not None), total)
+            member_name = next((field for field in ClientWrapper.PAGED_RESULTS_FIELDS if field in values), None)
+            if member_name is None and len(values) == 1:
+                member_name = next(iter(values))
+            if member_name is None:
+                raise InvalidOperationException('response is not list-shaped')
+            rows = values[member_name]
+        rows = rows or []
+        if rows and hasattr(rows[0], '__values__'):
+            return Columns.from_values([object.__getattribute__(row, '__values__') for row in rows], total=total,
+                                       convert=self.unpacker.unpack)
+        # a list of simple values, e.g. ArrayOfguid, is a single column named for its member
+        return Columns({member_name: Columns.column(rows)}, total=total) if rows else Columns(total=total)
+
+    def call_service_columns(self, operation_name: str, **kwargs) -> Columns:
+        """
+        Invoke an operation with a list-shaped response (a list, an ArrayOfX, or a page of PagedResults or
+        PagedResponses) against the currently bound service and port, and lay its rows out as Columns,
+        straight from zeep's objects without a dict per row. The response cache isn't consulted.
+        """
+        if self.instrument is None:
+            return self._columns(self._invoke(operation_name, kwargs))
+        with measure(self.instrument, operation_name, kind='columns') as metrics:
+            response = self._invoke(operation_name, kwargs, metrics)
+            start = time.perf_counter()
+            columns = self._columns(response)
+            metrics.add('unpack', time.perf_counter() - start)
+            return columns
+
+    def iter_column_pages(self, operation_name: str, page_size: Optional[int] = None, prefetch: int = 2, **kwargs) \
+            -> Iterator[Columns]:
+        """
+        Invoke a paged operation like iter_pages, yielding each page as Columns.
+        Concatenate them with Columns.concat to get every result as one set of columns.
+        """
+        yield from self._iter_pages(operation_name, self.call_service_columns, page_size, prefetch, kwargs)
 
     def call_service_raw(self, operation_name: str, **kwargs) -> Iterable:
         """
         Invoke an operation against the currently bound service and port.
         Return the response without any unpacking. Good for reading the raw response.
+        A response with a transient status (see RateLimiter.TRANSIENT_STATUS_CODES) is raised as a TransportError.
         """
+        if self.instrument is None:
+            return self._limited(operation_name, lambda: ClientWrapper._raise_for_transient_status(
+                self._send_raw(operation_name, kwargs)), None)
+        with measure(self.instrument, operation_name, kind='raw') as metrics:
+            return self._limited(operation_name, lambda: ClientWrapper._raise_for_transient_status(
+                self._post(operation_name, kwargs, metrics)), metrics)
+
+    def _send_raw(self, operation_name: str, kwargs: dict) -> 'requests.Response':
         with self.client.settings(raw_response=True):
             return self._service[operation_name](**kwargs)
+
+    @staticmethod
+    def _raise_for_transient_status(response: 'requests.Response', close: bool = False) -> 'requests.Response':
+        """
+        Raise a TransportError for a response whose status is in RateLimiter.TRANSIENT_STATUS_CODES (closing it
+        first if asked), so the rate limiter sees the failure as it would from call_service. Any other response,
+        faults included, is returned for the caller to process.
+        """
+        if response.status_code in RateLimiter.TRANSIENT_STATUS_CODES:
+            from zeep.exceptions import TransportError  # pylint: disable=import-outside-toplevel
+            if close:
+                response.close()
+            raise TransportError('Server returned HTTP status {}'.format(response.status_code),
+                                 status_code=response.status_code)
+        return response
+
+    def call_service_streamed(self, operation_name: str, **kwargs) -> 'requests.Response':
+        """
+        Invoke an operation against the currently bound service and port.
+        Return the http response as soon as its headers arrive, leaving the body to be streamed by the caller
+        (e.g. with iter_content) rather than read into memory. The caller must close the response.
+        With a rate limiter, the call holds its slot until the headers arrive, not while the body streams.
+        A response with a transient status (see RateLimiter.TRANSIENT_STATUS_CODES) is closed and raised as a
+        TransportError.
+        """
+        address, message, http_headers = self._request(operation_name, kwargs)
+        transport = self.client.transport
+        return self._limited(operation_name, lambda: ClientWrapper._raise_for_transient_status(transport.session.post(
+            address, data=message, headers=http_headers, stream=True, timeout=transport.operation_timeout), close=True),
+            None)
+
+    def _item_path(self, operation_name: str) -> tuple:
+        """
+        Find the repeated element holding the items of the operation's response, descending from the response
+        element through the member named in PAGED_RESULTS_FIELDS, else its only member, as _columns does.
+        Return the tags of the elements from the soap body down to the item element, and the item's xsd element.
+        """
+        from zeep.xsd import ComplexType  # pylint: disable=import-outside-toplevel
+        binding = self._service._binding  # pylint: disable=protected-access
+        element = binding.get(operation_name).output.body
+        tags = [element.qname.text]
+        while not element.accepts_multiple:
+            members = dict(element.type.elements) if isinstance(element.type, ComplexType) else {}
+            member_name = next((field for field in ClientWrapper.PAGED_RESULTS_FIELDS if field in members), None)
+            if member_name is None and len(members) == 1:
+                member_name = next(iter(members))
+            if member_name is None:
+                raise InvalidOperationException('{} does not respond with a list'.format(operation_name))
+            element = members[member_name]
+            tags.append(element.qname.text)
+        return tuple(tags), element
+
+    def call_service_items(self, operation_name: str, **kwargs) -> Iterator:
+        """
+        Invoke an operation with a list-shaped response (a list, an ArrayOfX, or a page of PagedResults or
+        PagedResponses) against the currently bound service and port, yielding its items one at a time,
+        unpacked as call_service would. The response is parsed incrementally as it streams in, and each item's
+        nodes are discarded once it's unpacked, so memory is bounded by an item rather than the whole response.
+        Members of the response besides its items (e.g. TotalNumberResults) are skipped.
+        The response cache isn't consulted. Close the generator to abandon the rest of the response.
+        """
+        authenticator = self.authenticator
+        cookie = authenticator.cookie if authenticator is not None else None
+        try:
+            # faults arrive in place of the response, so this only retries before any item has been yielded
+            yield from self._stream_items(operation_name, kwargs)
+            return
+        except Exception as exc:  # pylint: disable=broad-except
+            if authenticator is None or not authenticator.is_authentication_fault(exc) \
+                    or not authenticator.refresh_authentication(cookie):
+                raise
+        yield from self._stream_items(operation_name, kwargs)
+
+    def _stream_items(self, operation_name: str, kwargs: dict) -> Iterator:
+        from lxml import etree  # pylint: disable=import-outside-toplevel
+        from zeep.exceptions import TransportError, XMLSyntaxError  # pylint: disable=import-outside-toplevel
+        tags, item = self._item_path(operation_name)
+        binding = self._service._binding  # pylint: disable=protected-access
+        schema = self.client.wsdl.types
+        unpack = self.unpacker.unpack
+        # envelope, body, then the elements down to the items
+        item_depth = len(tags) + 2
+        path: List[str] = []
+        parser = etree.XMLPullParser(events=('start', 'end'), resolve_entities=False, no_network=True)
+        with closing(self.call_service_streamed(operation_name, **kwargs)) as response:
+            try:
+                for chunk in response.iter_content(ClientWrapper.STREAM_CHUNK_SIZE):
+                    parser.feed(chunk)
+                    for event, node in parser.read_events():
+                        if event == 'start':
+                            path.append(node.tag)
+                            continue
+                        if len(path) == item_depth and tuple(path[2:]) == tags:
+                            value = unpack(item.parse(node, schema))
+                            # drop the item and any items before it, so the tree never holds more than one
+                            node.clear()
+                            parent = node.getparent()
+                            while node.getprevious() is not None:
+                                del parent[0]
+                            yield value
+                        elif len(path) == 3 and etree.QName(node).localname == 'Fault':
+                            binding.process_error(node.getroottree().getroot(), binding.get(operation_name))
+                        path.pop()
+                parser.close()
+            except etree.XMLSyntaxError as exc:
+                if response.status_code != 200:
+                    raise TransportError(status_code=response.status_code) from exc
+                raise XMLSyntaxError('The server responded with invalid XML: {}'.format(exc)) from exc
+            if response.status_code != 200:
+                raise TransportError(status_code=response.status_code)
+
+    def process_response(self, operation_name: str, response: 'requests.Response') -> Iterable:
+        """
+        Process a raw http response to an operation of the currently bound service and port, as call_service would:
+        faults are raised and the result is unpacked into a pythonic object.
+        """
+        binding = self._service._binding  # pylint: disable=protected-access
+        return self.unpacker.unpack(binding.process_reply(self.client, binding.get(operation_name), response))
+
+    def _pagination_path(self, operation_name: str) -> List[str]:
+        """
+        Find where the operation takes its Pagination: either as an argument of its own (as in UsageReporting)
+        or as a member of a request argument (as in SessionManagement and UserManagement).
+        """
+        signature = self.bound_operation(operation_name)
+        if isinstance(signature, dict):
+            for arg_name, arg_type in (signature['input'] or {}).items():
+                if arg_type.split(':')[-1] == ClientWrapper.PAGINATION_TYPE:
+                    return [arg_name]
+                for member in self.types.get(arg_type, {}).get('members', []):
+                    if member and member.get('name') and member['type'] == ClientWrapper.PAGINATION_TYPE:
+                        return [arg_name, member['name']]
+        raise InvalidOperationException('{} is not a paged operation'.format(operation_name))
+
+    @staticmethod
+    def _paginate(kwargs: dict, path: List[str], page_size: int, page_number: int) -> dict:
+        """
+        Copy the operation arguments, setting the pagination found at path. Arguments on the path must be dicts.
+        """
+        page_kwargs = dict(kwargs)
+        container = page_kwargs
+        for key in path[:-1]:
+            container[key] = dict(container.get(key) or {})
+            container = container[key]
+        container[path[-1]] = dict(container.get(path[-1]) or {}, MaxNumberResults=page_size, PageNumber=page_number)
+        return page_kwargs
+
+    @staticmethod
+    def result_items(result: Any) -> list:
+        """
+        The items of an unpacked result: a list is its items, a page its paged results, anything else one item.
+        """
+        if result is None:
+            return []
+        if isinstance(result, list):
+            return result
+        if isinstance(result, Mapping) and any(field in result for field in ClientWrapper.PAGED_RESULTS_FIELDS):
+            return ClientWrapper.page_items(result)
+        return [result]
+
+    @staticmethod
+    def with_arguments(kwargs: dict, arguments: Dict[Union[str, Tuple[str, ...]], Any]) -> dict:
+        """
+        Copy the operation arguments, setting each of arguments: by name, or by a tuple path of names into a
+        nested argument (e.g. ('request', 'FolderId')). Arguments on a path must be dicts.
+        """
+        new_kwargs = dict(kwargs)
+        for argument, value in arguments.items():
+            path = (argument,) if isinstance(argument, str) else tuple(argument)
+            container = new_kwargs
+            for key in path[:-1]:
+                container[key] = dict(container.get(key) or {})
+                container = container[key]
+            container[path[-1]] = value
+        return new_kwargs
+
+    @staticmethod
+    def page_items(page: dict) -> list:
+        """
+        Pluck the items out of an unpacked page of PagedResults or PagedResponses.
+        """
+        for field in ClientWrapper.PAGED_RESULTS_FIELDS:
+            if field in page:
+                results = page[field]
+                if isinstance(results, Mapping):
+                    # ArrayOfX wraps a single repeated member named X
+                    results = next(iter(results.values()), None) if len(results) == 1 else None
+                return results or []
+        raise InvalidOperationException('page has none of {}'.format(', '.join(ClientWrapper.PAGED_RESULTS_FIELDS)))
+
+    def iter_pages(self, operation_name: str, page_size: Optional[int] = None, prefetch: int = 2, **kwargs) \
+            -> Iterator[dict]:
+        """
+        Invoke a paged operation against the currently bound service and port, yielding each unpacked page in order.
+        Pagination is filled in automatically, starting from any PageNumber in kwargs;
+        the page size is page_size, else any MaxNumberResults in kwargs, else DEFAULT_PAGE_SIZE.
+        The first page is fetched to learn the total number of results; after that, up to prefetch pages are
+        fetched concurrently while the caller consumes the current one. A prefetch of 0 fetches pages serially.
+        """
+        yield from self._iter_pages(operation_name, self.call_service, page_size, prefetch, kwargs)
+
+    def _pagination_start(self, operation_name: str, page_size: Optional[int], kwargs: dict) -> Tuple[List[str], int, int]:
+        """
+        Where the operation takes its Pagination, the page size, and the first page number for paging through it
+        with kwargs, as iter_pages describes.
+        """
+        path = self._pagination_path(operation_name)
+        pagination = kwargs
+        for key in path:
+            pagination = (pagination or {}).get(key)
+        pagination = pagination or {}
+        page_size = page_size or pagination.get('MaxNumberResults') or ClientWrapper.DEFAULT_PAGE_SIZE
+        return path, page_size, pagination.get('PageNumber') or 0
+
+    def _iter_pages(self, operation_name: str, call: Callable[..., Any], page_size: Optional[int], prefetch: int,
+                    kwargs: dict) -> Iterator[Any]:
+        """
+        Page through the operation as iter_pages does, fetching each page with call(operation_name, **kwargs).
+        """
+        path, page_size, first_page_number = self._pagination_start(operation_name, page_size, kwargs)
+
+        def fetch(page_number: int) -> Any:
+            return call(operation_name, **ClientWrapper._paginate(kwargs, path, page_size, page_number))
+
+        page = fetch(first_page_number)
+        yield page
+        total = ClientWrapper._page_total(page)
+        if total is None:
+            # without a total, keep going until a page comes up short
+            page_number = first_page_number
+            while ClientWrapper._page_length(page) >= page_size:
+                page_number += 1
+                page = fetch(page_number)
+                yield page
+            return
+        remaining = range(first_page_number + 1, int(math.ceil(total / float(page_size))))
+        if not prefetch:
+            for page_number in remaining:
+                yield fetch(page_number)
+            return
+        with BoundedExecutor(max_workers=prefetch) as executor:
+            pages = executor.map(fetch, remaining)
+            try:
+                for future in pages:
+                    yield future.result()
+            finally:
+                pages.close()
+
+    @staticmethod
+    def _page_total(page: Any) -> Optional[int]:
+        if isinstance(page, Columns):
+            return page.total
+        return next((page[field] for field in ClientWrapper.TOTAL_RESULTS_FIELDS if page.get(field) is not None), None)
+
+    @staticmethod
+    def _page_length(page: Any) -> int:
+        return page.row_count if isinstance(page, Columns) else len(ClientWrapper.page_items(page))
+
+    def iter_items(self, operation_name: str, page_size: Optional[int] = None, prefetch: int = 2, **kwargs) \
+            -> Iterator[dict]:
+        """
+        Invoke a paged operation like iter_pages, yielding the individual items of each page.
+        """
+        for page in self.iter_pages(operation_name, page_size=page_size, prefetch=prefetch, **kwargs):
+            yield from ClientWrapper.page_items(page)
+
+    def call_service_many(self, operation_name: str, iterable_of_kwargs: Iterable[dict], max_concurrency: int = 8,
+                          ordered: bool = True) -> Iterator[BatchResult]:
+        """
+        Invoke an operation once per set of kwargs against the currently bound service and port,
+        running up to max_concurrency calls at a time over the wrapper's (shared, authenticated) transport.
+        Yield a BatchResult per call, in input order if ordered, otherwise as calls complete.
+        A failing call doesn't abort the batch; its exception is reported in its BatchResult.
+        The kwargs are consumed lazily, so the iterable may be a generator of any length.
+        Keep max_concurrency within the transport's connection pool size to avoid opening throwaway connections.
+        """
+        def call(indexed_kwargs):
+            index, kwargs = indexed_kwargs
+            try:
+                return BatchResult(index, kwargs, result=self.call_service(operation_name, **kwargs))
+            except Exception as exc:  # pylint: disable=broad-except
+                return BatchResult(index, kwargs, error=exc)
+
+        with BoundedExecutor(max_workers=max_concurrency) as executor:
+            results = executor.map(call, enumerate(iterable_of_kwargs), ordered=ordered)
+            try:
+                for future in results:
+                    yield future.result()
+            finally:
+                results.close()
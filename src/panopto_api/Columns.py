@@ -0,0 +1,197 @@
+"""
+This module provides a columnar container of list-shaped results, with a typed array per column
+"""
+# Standard Library
+from array import array
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+import math
+
+
+Column = Union[array, list]
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        # Panopto times are UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class Columns(Mapping):
+    """
+    Results as a mapping of column name to column, rather than a dict per row. row_count is the number of rows.
+    Columns of numbers are stdlib arrays: booleans as 'b', integers as 'q' and floats as 'd'. Integer and boolean
+    columns with missing values are widened to 'd', with NaN for the missing values, and datetimes are stored as
+    'd' arrays of POSIX timestamps (naive datetimes are taken to be UTC), named in datetime_columns.
+    Anything else (strings, guids, nested values) is kept in a plain list.
+    A page of a paged operation also carries the total number of results across all pages, if the response has it.
+    Pages concatenate with extend or concat, which copy arrays in bulk.
+    """
+    NUMBER_TYPECODES = {bool: 'b', int: 'q', float: 'd'}
+    NUMPY_DTYPES = {'b': 'int8', 'q': 'int64', 'd': 'float64'}
+
+    def __init__(self, columns: Optional[Dict[str, Column]] = None, total: Optional[int] = None,
+                 datetime_columns: Iterable[str] = ()) -> None:
+        self.columns: Dict[str, Column] = columns if columns is not None else {}
+        self.total = total
+        self.datetime_columns = set(datetime_columns)
+
+    @staticmethod
+    def column(values: Sequence[Any]) -> Column:
+        """
+        A column of the values, typed by the first value present (see Columns).
+        """
+        first = next((value for value in values if value is not None), None)
+        if isinstance(first, datetime):
+            try:
+                return array('d', [math.nan if value is None else _timestamp(value) for value in values])
+            except (AttributeError, TypeError):
+                return list(values)
+        typecode = Columns.NUMBER_TYPECODES.get(type(first))
+        if typecode is None:
+            return list(values)
+        try:
+            return array(typecode, values)
+        except (TypeError, OverflowError):
+            pass
+        try:
+            return array('d', [math.nan if value is None else value for value in values])
+        except TypeError:
+            return list(values)
+
+    @classmethod
+    def from_values(cls, rows: Sequence[Mapping], total: Optional[int] = None,
+                    convert: Optional[Callable[[list], list]] = None) -> 'Columns':
+        """
+        Columns of a sequence of rows sharing the same fields (e.g. the __values__ of zeep objects of one type),
+        built a column at a time. Columns that end up as lists are passed through convert, if any.
+        """
+        if not rows:
+            return cls(total=total)
+        columns = {}
+        datetime_columns = []
+        for field in rows[0]:
+            values = [row.get(field) for row in rows]
+            column = columns[field] = Columns.column(values)
+            if isinstance(column, list):
+                if convert is not None:
+                    columns[field] = convert(column)
+            elif isinstance(next((value for value in values if value is not None), None), datetime):
+                datetime_columns.append(field)
+        return cls(columns, total=total, datetime_columns=datetime_columns)
+
+    @classmethod
+    def from_rows(cls, headers: List[str], rows: Iterable[Sequence[Any]], chunk_size: int = 10000) -> 'Columns':
+        """
+        Columns of rows given as sequences of values in header order (e.g. CSV rows),
+        converted chunk_size rows at a time so no more than a chunk is ever held as python objects.
+        """
+        columns = cls()
+        chunk: List[Sequence[Any]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                columns.extend(cls._from_chunk(headers, chunk))
+                chunk = []
+        if chunk or not columns.columns:
+            columns.extend(cls._from_chunk(headers, chunk))
+        return columns
+
+    @classmethod
+    def _from_chunk(cls, headers: List[str], chunk: List[Sequence[Any]]) -> 'Columns':
+        columns = {}
+        datetime_columns = []
+        for index, header in enumerate(headers):
+            values = [row[index] if index < len(row) else None for row in chunk]
+            columns[header] = Columns.column(values)
+            if isinstance(next((value for value in values if value is not None), None), datetime):
+                datetime_columns.append(header)
+        return cls(columns, datetime_columns=datetime_columns)
+
+    @staticmethod
+    def _as_floats(column: Column) -> array:
+        if isinstance(column, array):
+            return column if column.typecode == 'd' else array('d', column)
+        return array('d', [math.nan if value is None else value for value in column])
+
+    @staticmethod
+    def _concat_column(column: Column, more: Column) -> Column:
+        if not more:
+            return column
+        if not column:
+            return more[:]
+        if isinstance(column, array) and isinstance(more, array) and column.typecode == more.typecode:
+            column.extend(more)
+            return column
+        if isinstance(column, array) or isinstance(more, array):
+            # integers and booleans widen to floats, and so do missing values (e.g. a chunk of empty fields)
+            try:
+                widened = Columns._as_floats(column)
+                widened.extend(Columns._as_floats(more))
+                return widened
+            except TypeError:
+                pass
+        column = column if isinstance(column, list) else column.tolist()
+        column.extend(more)
+        return column
+
+    def extend(self, other: 'Columns') -> 'Columns':
+        """
+        Append the rows of other. A column missing from either side is filled with None for its rows. Return self.
+        """
+        length, more_length = self.row_count, other.row_count
+        for name in other.columns.keys() - self.columns.keys():
+            self.columns[name] = [None] * length
+        for name in list(self.columns):
+            more = other.columns.get(name)
+            self.columns[name] = Columns._concat_column(self.columns[name], [None] * more_length if more is None else more)
+        self.datetime_columns.update(other.datetime_columns)
+        if self.total is None:
+            self.total = other.total
+        return self
+
+    @classmethod
+    def concat(cls, pages: Iterable['Columns']) -> 'Columns':
+        """
+        Concatenate pages of columns (e.g. from ClientWrapper.iter_column_pages) into one.
+        """
+        columns = cls()
+        for page in pages:
+            columns.extend(page)
+        return columns
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        The columns as numpy arrays: numeric columns with the matching dtype, others with dtype object.
+        Requires numpy, which is imported here rather than with the module.
+        """
+        try:
+            import numpy  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise ImportError('to_numpy requires numpy') from exc
+        return {
+            name: numpy.array(column, dtype=Columns.NUMPY_DTYPES[column.typecode])
+            if isinstance(column, array) else numpy.array(column, dtype=object)
+            for name, column in self.columns.items()
+        }
+
+    def __getitem__(self, name: str) -> Column:
+        return self.columns[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    @property
+    def row_count(self) -> int:
+        """
+        The number of rows.
+        """
+        return len(next(iter(self.columns.values()), ()))
+
+    def __repr__(self) -> str:
+        return 'Columns({} rows: {})'.format(self.row_count, ', '.join(self.columns))
@@ -0,0 +1,210 @@
+"""
+This module provides request envelopes precompiled per operation, filled in with each call's arguments
+"""
+# Standard Library
+from collections.abc import Mapping
+from datetime import date, datetime, time as datetime_time
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Set, Tuple, Union
+from uuid import UUID
+import re
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep import Client
+
+
+# the python values rendered as text by a simple type's xmlvalue, as zeep would; anything else is left to zeep
+SIMPLE_VALUE_TYPES = (str, bool, int, float, Decimal, datetime, date, datetime_time, UUID, bytes)
+# characters XML 1.0 can't carry, which zeep (through lxml) refuses
+INVALID_XML_CHARACTERS = r'[^\t\n\r\x20-\uD7FF\uE000-\uFFFD\U00010000-\U0010FFFF]'
+ARGUMENTS_MARKER = 'PANOPTO-API-ARGUMENTS'
+
+Writer = Callable[[Any, List[str]], None]
+
+
+class UncompilableOperationException(Exception):
+    """
+    Exception raised when an operation's input can't be expressed as an envelope template
+    """
+    pass
+
+
+class UnsupportedValueException(Exception):
+    """
+    Exception raised when arguments don't fit an envelope template, so zeep must serialize the call instead
+    """
+    pass
+
+
+def _escape(text: Union[str, bytes]) -> str:
+    if isinstance(text, bytes):
+        # binary types (base64Binary, hexBinary) render as bytes, which zeep's lxml takes only as ascii
+        try:
+            text = text.decode('ascii')
+        except UnicodeDecodeError as exc:
+            raise UnsupportedValueException('binary text is not ascii') from exc
+    if not isinstance(text, str):
+        raise UnsupportedValueException('{} is not text'.format(type(text).__name__))
+    if re.search(INVALID_XML_CHARACTERS, text):
+        raise UnsupportedValueException('text has characters XML cannot carry')
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+
+
+class EnvelopeTemplate(object):
+    """
+    The request envelope of an operation, serialized once with a hole for the arguments, which are rendered into
+    it as text by writers compiled from the operation's input elements. Rendering this way skips what zeep does
+    per call (resolving the operation, building value objects from the arguments, an lxml tree for the envelope,
+    and serializing it) for a string join.
+    Only operations whose arguments are simple values, or dicts and lists of them, compile (see compile); and
+    only arguments zeep would render the same way are rendered (render raises UnsupportedValueException
+    otherwise, e.g. for zeep value objects, None for a required element, or unexpected names), so a caller can
+    always fall back to zeep for a call the template doesn't fit.
+    """
+    def __init__(self, head: bytes, tail: bytes, writers: Tuple[Tuple[str, Writer], ...],
+                 http_headers: Dict[str, str]) -> None:
+        self.head = head
+        self.tail = tail
+        self.writers = writers
+        self.names = frozenset(name for name, _ in writers)
+        self.http_headers = http_headers
+
+    @staticmethod
+    def compile(client: 'Client', binding: Any, options: dict, operation_name: str) -> 'EnvelopeTemplate':
+        """
+        Compile the envelope of the operation of the binding, as zeep would build it for the client with no
+        arguments, raising UncompilableOperationException if its input isn't simple enough to template, or if
+        zeep would change the envelope on its way out (WS-Addressing, plugins or WS-Security).
+        """
+        from zeep.wsdl.messages import DocumentMessage  # pylint: disable=import-outside-toplevel
+        from zeep.wsdl.utils import etree_to_string  # pylint: disable=import-outside-toplevel
+        operation = binding.get(operation_name)
+        if operation.abstract.wsa_action or client.plugins or client.wsse:
+            raise UncompilableOperationException('{} envelopes are rewritten on their way out'.format(operation_name))
+        if not isinstance(operation.input, DocumentMessage) or operation.input.body is None:
+            raise UncompilableOperationException('{} is not a document operation'.format(operation_name))
+        try:
+            envelope, http_headers = binding._create(  # pylint: disable=protected-access
+                operation_name, (), {}, client=client, options=options)
+        except Exception as exc:
+            raise UncompilableOperationException('{} needs arguments to serialize'.format(operation_name)) from exc
+        body = envelope.find('{%s}Body' % envelope.nsmap[envelope.prefix])
+        if body is None or len(body) != 1 or len(body[0]):
+            raise UncompilableOperationException('{} has an unexpected envelope'.format(operation_name))
+        in_scope = {namespace: prefix for prefix, namespace in body[0].nsmap.items() if prefix}
+        prefixes = dict(in_scope)
+        writers = tuple(EnvelopeTemplate._children(operation.input.body.type, prefixes, set(body[0].nsmap)))
+        body[0].text = ARGUMENTS_MARKER
+        head, tail = etree_to_string(envelope).split(ARGUMENTS_MARKER.encode('ascii'))
+        # declare the writers' namespaces once, on the operation element, rather than on every element as zeep does
+        declarations = ''.join(' xmlns:{}="{}"'.format(prefix, _escape(namespace).replace('"', '&quot;'))
+                               for namespace, prefix in prefixes.items() if namespace not in in_scope)
+        if client.settings.extra_http_headers:
+            # settings can change per call; they're applied by render
+            for name in client.settings.extra_http_headers:
+                http_headers.pop(name, None)
+        return EnvelopeTemplate(head[:-1] + declarations.encode('utf-8') + b'>', tail, writers, dict(http_headers))
+
+    @staticmethod
+    def _children(xsd_type: Any, prefixes: Dict[str, str], reserved: Set[str]) -> List[Tuple[str, Writer]]:
+        """
+        Writers of the elements of a complex type, in order, if it's a plain sequence of elements.
+        """
+        from zeep.xsd import ComplexType, Element  # pylint: disable=import-outside-toplevel
+        from zeep.xsd.elements.indicators import All, Sequence  # pylint: disable=import-outside-toplevel
+        if not isinstance(xsd_type, ComplexType) or xsd_type.attributes:
+            raise UncompilableOperationException('{} is not a plain complex type'.format(xsd_type))
+        # zeep has no public view of how a ComplexType derives or what its content is, so this depends on the
+        # ComplexType._extension, ._restriction and ._element attributes of zeep 4
+        # pylint: disable=protected-access
+        if xsd_type._extension is not None or xsd_type._restriction is not None:
+            raise UncompilableOperationException('{} is not a plain complex type'.format(xsd_type))
+        container = xsd_type._element
+        # pylint: enable=protected-access
+        if container is not None and (not isinstance(container, (Sequence, All)) or
+                                      not all(isinstance(child, Element) for child in container)):
+            raise UncompilableOperationException('{} is not a plain sequence of elements'.format(xsd_type))
+        return [(name, EnvelopeTemplate._writer(element, prefixes, reserved)) for name, element in xsd_type.elements]
+
+    @staticmethod
+    def _writer(element: Any, prefixes: Dict[str, str], reserved: Set[str]) -> Writer:
+        """
+        Compile a writer appending the element, rendered from a value, to a list of strings.
+        """
+        from zeep.xsd import AnySimpleType  # pylint: disable=import-outside-toplevel
+        namespace = element.qname.namespace
+        tag = element.qname.localname
+        if namespace:
+            prefix = prefixes.get(namespace)
+            if prefix is None:
+                index = len(prefixes)
+                while 'c{}'.format(index) in reserved:
+                    index += 1
+                prefix = prefixes[namespace] = 'c{}'.format(index)
+                reserved.add(prefix)
+            tag = '{}:{}'.format(prefix, tag)
+        open_tag = '<{}>'.format(tag)
+        close_tag = '</{}>'.format(tag)
+
+        if isinstance(element.type, AnySimpleType):
+            xmlvalue = element.type.xmlvalue
+
+            def write_value(value: Any, out: List[str]) -> None:
+                if not isinstance(value, SIMPLE_VALUE_TYPES):
+                    raise UnsupportedValueException('{} is not a simple value'.format(type(value).__name__))
+                out.append(open_tag)
+                out.append(_escape(xmlvalue(value)))
+                out.append(close_tag)
+        else:
+            children = tuple(EnvelopeTemplate._children(element.type, prefixes, reserved))
+            names = frozenset(name for name, _ in children)
+
+            def write_value(value: Any, out: List[str]) -> None:
+                if not isinstance(value, Mapping) or not names.issuperset(value):
+                    raise UnsupportedValueException('{} does not fit {}'.format(type(value).__name__, tag))
+                out.append(open_tag)
+                for name, write in children:
+                    write(value.get(name), out)
+                out.append(close_tag)
+
+        optional = element.is_optional
+
+        def write_item(value: Any, out: List[str]) -> None:
+            if value is None:
+                if not optional:
+                    raise UnsupportedValueException('{} is required'.format(tag))
+                return
+            write_value(value, out)
+
+        if not element.accepts_multiple:
+            return write_item
+        min_occurs = element.min_occurs
+        max_occurs = element.max_occurs if isinstance(element.max_occurs, int) else None
+
+        def write_items(value: Any, out: List[str]) -> None:
+            if value is None:
+                write_item(value, out)
+                return
+            if not isinstance(value, list) or len(value) < min_occurs or \
+                    (max_occurs is not None and len(value) > max_occurs):
+                raise UnsupportedValueException('{} takes a list of {} to {} items'.format(tag, min_occurs, max_occurs))
+            for item in value:
+                write_item(item, out)
+        return write_items
+
+    def render(self, client: 'Client', kwargs: dict) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Render the envelope for the arguments, returning the message and http headers to post.
+        """
+        if not self.names.issuperset(kwargs):
+            raise UnsupportedValueException('unexpected arguments {}'.format(', '.join(sorted(set(kwargs) - self.names))))
+        if client._default_soapheaders:  # pylint: disable=protected-access
+            raise UnsupportedValueException('the client adds soap headers')
+        out: List[str] = []
+        for name, write in self.writers:
+            write(kwargs.get(name), out)
+        http_headers = dict(self.http_headers)
+        if client.settings.extra_http_headers:
+            http_headers.update(client.settings.extra_http_headers)
+        return self.head + ''.join(out).encode('utf-8') + self.tail, http_headers
@@ -0,0 +1,202 @@
+"""
+This module provides per-operation metrics of SOAP calls and a registry summarizing them
+"""
+# Standard Library
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import collections
+import logging
+import math
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+class CallMetrics(object):
+    """
+    What one instrumented event cost. kind is one of:
+        call: ClientWrapper.call_service
+        raw: ClientWrapper.call_service_raw
+        columns: ClientWrapper.call_service_columns
+        authenticate: a log on by AuthenticatedClientFactory
+        construct: client construction by AuthenticatedClientFactory (operation is the endpoint)
+    phases maps phase name to seconds: wait (queueing on a RateLimiter), serialize (building the envelope),
+    network (the http round trip), parse (zeep parsing the reply), unpack (converting the result to pythonic objects),
+    and total.
+    Phases that didn't happen (e.g. on a cache hit) are absent; phases repeated by a retry accumulate.
+    """
+    __slots__ = ('kind', 'operation', 'phases', 'request_bytes', 'response_bytes', 'retries', 'cache_hit', 'error')
+
+    def __init__(self, operation: str, kind: str = 'call') -> None:
+        self.kind = kind
+        self.operation = operation
+        self.phases: Dict[str, float] = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.cache_hit = False
+        self.error: Optional[str] = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        """
+        Add time to a phase.
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def __repr__(self) -> str:
+        return 'CallMetrics({})'.format(', '.join('{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+
+Instrument = Callable[[CallMetrics], None]
+
+
+@contextmanager
+def measure(instrument: Instrument, operation: str, kind: str = 'call') -> Iterator[CallMetrics]:
+    """
+    Measure the block as one event, yielding its CallMetrics to fill in. On exit, the total time and any error are
+    recorded and the metrics are reported to the instrument. A failing instrument is logged, never raised,
+    so it can't break what it measures.
+    """
+    metrics = CallMetrics(operation, kind=kind)
+    start = time.perf_counter()
+    try:
+        yield metrics
+    except BaseException as exc:
+        metrics.error = type(exc).__name__
+        raise
+    finally:
+        metrics.add('total', time.perf_counter() - start)
+        try:
+            instrument(metrics)
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception('Instrument failed to record %r', metrics)
+
+
+class Histogram(object):
+    """
+    A histogram of positive values in logarithmic buckets, each GROWTH times wider than the last,
+    so percentiles are accurate to within that factor at constant memory and cost per value.
+    """
+    GROWTH = 1.1
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._buckets: Dict[int, int] = collections.defaultdict(int)
+        self._log_growth = math.log(Histogram.GROWTH)
+
+    def add(self, value: float) -> None:
+        """
+        Count a value.
+        """
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self._buckets[math.floor(math.log(value) / self._log_growth) if value > 0 else -math.inf] += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate the value at or below which q percent of the values fall.
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                upper = 0.0 if bucket == -math.inf else Histogram.GROWTH ** (bucket + 1)
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        Count, total, mean, min, max and the 50th, 90th and 99th percentiles.
+        """
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class MetricsRegistry(object):
+    """
+    An instrument (pass it as instrument to a ClientWrapper or AuthenticatedClientFactory) aggregating CallMetrics
+    per kind and operation: counts of events, errors, retries and cache hits, and histograms of each phase's timings
+    and of payload sizes. Recording is a few dictionary updates under a lock, cheap enough to leave on in production.
+    Optionally forward every event to another instrument as well (e.g. a statsd or logging callback).
+    """
+    COUNTERS = ('count', 'errors', 'retries', 'cache_hits')
+
+    def __init__(self, forward: Optional[Instrument] = None) -> None:
+        self.forward = forward
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._histograms: Dict[Tuple[str, str], Dict[str, Histogram]] = {}
+
+    def __call__(self, metrics: CallMetrics) -> None:
+        self.record(metrics)
+
+    def record(self, metrics: CallMetrics) -> None:
+        """
+        Aggregate one event.
+        """
+        key = (metrics.kind, metrics.operation)
+        with self._lock:
+            counters = self._counters.get(key)
+            if counters is None:
+                counters = self._counters[key] = dict.fromkeys(MetricsRegistry.COUNTERS, 0)
+                self._histograms[key] = collections.defaultdict(Histogram)
+            counters['count'] += 1
+            counters['errors'] += metrics.error is not None
+            counters['retries'] += metrics.retries
+            counters['cache_hits'] += metrics.cache_hit
+            histograms = self._histograms[key]
+            for phase, seconds in metrics.phases.items():
+                histograms[phase].add(seconds)
+            if metrics.request_bytes:
+                histograms['request_bytes'].add(metrics.request_bytes)
+            if metrics.response_bytes:
+                histograms['response_bytes'].add(metrics.response_bytes)
+        if self.forward is not None:
+            self.forward(metrics)
+
+    def summary(self, kind: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Summarize every operation (of the specified kind, if any), keyed by 'kind:operation':
+        its counters, and a summary of each histogram of phase timings (in seconds) or payload sizes (in bytes).
+        """
+        with self._lock:
+            return {
+                '{}:{}'.format(*key): dict(counters, **{
+                    name: histogram.summary() for name, histogram in self._histograms[key].items()})
+                for key, counters in self._counters.items() if kind is None or key[0] == kind
+            }
+
+    def hot_operations(self, phase: str = 'total', limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        The operations that spent the most time in the phase overall, with that time, most first.
+        """
+        with self._lock:
+            totals = [('{}:{}'.format(*key), histograms[phase].total)
+                      for key, histograms in self._histograms.items() if phase in histograms]
+        return sorted(totals, key=lambda total: total[1], reverse=True)[:limit]
+
+    def reset(self) -> None:
+        """
+        Forget everything recorded so far.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
@@ -0,0 +1,45 @@
+"""
+This module provides a zeep transport with a configurable, shareable HTTP connection pool
+"""
+# Standard Library
+from typing import Optional
+
+# Third Party
+import requests
+from requests.adapters import HTTPAdapter
+from zeep import Transport
+
+
+class PooledTransport(Transport):
+    """
+    A zeep transport backed by a single requests session with a sized connection pool.
+    One instance is meant to be shared by every client talking to a host, so connections (and their TLS handshakes)
+    are reused across services, and the authentication cookie lives in one place for all of them.
+    """
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, *, max_retries: int = 0,
+                 keep_alive: bool = True, timeout: float = 300, operation_timeout: Optional[float] = None,
+                 cache=None) -> None:
+        """
+        pool_connections: number of hosts to keep connection pools for
+        pool_maxsize: maximum number of connections kept alive per host
+        max_retries: connection-level retries performed by urllib3
+        keep_alive: reuse connections between requests
+        timeout: timeout for loading wsdl and xsd documents
+        operation_timeout: timeout for operation calls (None waits indefinitely)
+        cache: zeep cache for loaded documents
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not keep_alive:
+            session.headers['Connection'] = 'close'
+        super().__init__(cache=cache, timeout=timeout, operation_timeout=operation_timeout, session=session)
+        # the session was created here, so it's ours to close
+        self._close_session = True
+
+    def close(self) -> None:
+        """
+        Close every pooled connection.
+        """
+        self.session.close()
@@ -0,0 +1,275 @@
+"""
+This module provides adaptive rate and concurrency limiting of calls to a Panopto host
+"""
+# Standard Library
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+import collections
+import random
+import sys
+import threading
+import time
+
+
+class RateLimiter(object):  # pylint: disable=too-many-instance-attributes
+    """
+    Limits the calls made to a host, to get the most sustained throughput out of it without overloading it.
+    Share one limiter among every client of the host (AuthenticatedClientFactory does, given one). Coroutines wait
+    on it with limit_call_async, so sync and async clients can share it too.
+    Three mechanisms combine:
+        rate: a token bucket admitting at most rate calls per second on average, in bursts of up to burst calls
+            (None leaves the rate unlimited)
+        concurrency: at most limit calls are in flight at once, and limit adapts between min_concurrency and
+            max_concurrency, AIMD-style. Every healthy call adds increase / limit to it (so about increase per
+            round of calls), and a congested call multiplies it by decrease. A call is congested if it failed
+            transiently (see is_transient) or took longer than latency_tolerance times the fastest of the last
+            latency_window calls to the same operation (or longer than latency_target, if one is set).
+            Only calls started since the last decrease can decrease it again, so one burst of congestion
+            counts once.
+        retries: a call that fails transiently is retried up to max_retries times, after a backoff drawn
+            uniformly from zero to backoff * 2 ** attempt seconds (capped at max_backoff), so retries from
+            many threads spread out rather than arriving together. Only operations that are safe to repeat
+            (see is_idempotent) are retried after any transient failure; others only after failures showing the
+            host never acted on the call (see is_unhandled), since a timeout or a 502 may follow a call that
+            took effect.
+    """
+    TRANSIENT_STATUS_CODES = frozenset([408, 429, 502, 503, 504])
+    # statuses with which a host turns a call away without acting on it
+    UNHANDLED_STATUS_CODES = frozenset([429, 503])
+    # operations named for reading are safe to repeat
+    READ_ONLY_PREFIXES = ('Get', 'List', 'Describe', 'Search')
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None,  # pylint: disable=too-many-arguments
+                 *, initial_concurrency: int = 4, min_concurrency: int = 1, max_concurrency: int = 64,
+                 increase: float = 1.0, decrease: float = 0.5, latency_tolerance: float = 3.0,
+                 latency_target: Optional[float] = None, latency_window: int = 50, max_retries: int = 3,
+                 backoff: float = 0.1, max_backoff: float = 10.0, idempotent_operations: Iterable[str] = ()) -> None:
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive')
+        if not 1 <= min_concurrency <= initial_concurrency <= max_concurrency:
+            raise ValueError('concurrency must satisfy 1 <= min_concurrency <= initial_concurrency <= max_concurrency')
+        if not 0 < decrease < 1:
+            raise ValueError('decrease must be between 0 and 1')
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency_target = latency_target
+        self.latency_window = latency_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idempotent_operations = frozenset(idempotent_operations)
+        self.limit = float(initial_concurrency)
+        self.in_flight = 0
+        self.congested_calls = 0
+        self._condition = threading.Condition()
+        self._last_decrease = -float('inf')
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._bucket_lock = threading.Lock()
+        # (loop, asyncio.Event) of each coroutine waiting for a slot, woken by release
+        self._async_waiters: List[Tuple[Any, Any]] = []
+
+    @staticmethod
+    def is_transient(exc: BaseException) -> bool:
+        """
+        Whether a call failed in a way worth retrying after a pause, and that suggests the host is overloaded:
+        connection failures, timeouts, and http statuses in TRANSIENT_STATUS_CODES.
+        SOAP faults are the host answering, so they aren't transient.
+        """
+        # by the time a call has failed, zeep and requests are loaded
+        from requests.exceptions import ConnectionError as RequestsConnectionError  # pylint: disable=import-outside-toplevel
+        from requests.exceptions import Timeout  # pylint: disable=import-outside-toplevel
+        from zeep.exceptions import TransportError  # pylint: disable=import-outside-toplevel
+        if isinstance(exc, TransportError):
+            return exc.status_code in RateLimiter.TRANSIENT_STATUS_CODES
+        # zeep's async transport fails with httpx's exceptions; if httpx isn't loaded, nothing raised them
+        httpx = sys.modules.get('httpx')
+        if httpx is not None and isinstance(exc, (httpx.TimeoutException, httpx.NetworkError)):
+            return True
+        return isinstance(exc, (RequestsConnectionError, Timeout))
+
+    @staticmethod
+    def is_unhandled(exc: BaseException) -> bool:
+        """
+        Whether a call failed before the host could act on it: the connection couldn't be made, or the host
+        answered with a status in UNHANDLED_STATUS_CODES.
+        """
+        from requests.exceptions import ConnectionError as RequestsConnectionError  # pylint: disable=import-outside-toplevel
+        from requests.exceptions import ConnectTimeout  # pylint: disable=import-outside-toplevel
+        from urllib3.exceptions import ConnectTimeoutError, MaxRetryError  # pylint: disable=import-outside-toplevel
+        from zeep.exceptions import TransportError  # pylint: disable=import-outside-toplevel
+        if isinstance(exc, TransportError):
+            return exc.status_code in RateLimiter.UNHANDLED_STATUS_CODES
+        httpx = sys.modules.get('httpx')
+        if isinstance(exc, ConnectTimeout) or \
+                (httpx is not None and isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))):
+            return True
+        if isinstance(exc, RequestsConnectionError):
+            # requests reports connections refused and connections dropped mid-call alike; urllib3's reason tells
+            reason = exc.args[0] if exc.args else None
+            if isinstance(reason, MaxRetryError):
+                reason = reason.reason
+            # NewConnectionError, raised when a connection can't be made, is a ConnectTimeoutError
+            return isinstance(reason, ConnectTimeoutError)
+        return False
+
+    def is_idempotent(self, operation_name: str) -> bool:
+        """
+        Whether the operation is safe to repeat: it's named for reading (see READ_ONLY_PREFIXES) or listed in
+        idempotent_operations.
+        """
+        return operation_name.startswith(RateLimiter.READ_ONLY_PREFIXES) or operation_name in self.idempotent_operations
+
+    def should_retry(self, operation_name: str, exc: BaseException) -> bool:
+        """
+        Whether a call to the operation that failed with exc may be retried: any transient failure of an idempotent
+        operation, and only unhandled failures of others.
+        """
+        if self.is_idempotent(operation_name):
+            return RateLimiter.is_transient(exc)
+        return RateLimiter.is_unhandled(exc)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        How long to wait before retry number attempt (counting from 0), with full jitter.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def acquire(self) -> float:
+        """
+        Wait for a concurrency slot and a token, and return how long that took. Follow with release.
+        """
+        start = time.perf_counter()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        if self.rate is not None:
+            delay = self._take_token()
+            if delay:
+                time.sleep(delay)
+        return time.perf_counter() - start
+
+    async def acquire_async(self) -> float:
+        """
+        Wait for a concurrency slot and a token without blocking the event loop, and return how long that took.
+        Follow with release.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    break
+                woken = asyncio.Event()
+                self._async_waiters.append((loop, woken))
+            await woken.wait()
+        if self.rate is not None:
+            delay = self._take_token()
+            if delay:
+                try:
+                    await asyncio.sleep(delay)
+                except BaseException:
+                    # cancelled holding the slot, before the call started
+                    with self._condition:
+                        self.in_flight -= 1
+                        self._notify()
+                    raise
+        return time.perf_counter() - start
+
+    def _take_token(self) -> float:
+        """
+        Take a token, returning how long to wait for it to be due.
+        """
+        with self._bucket_lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            # take the token now even if it isn't there yet, so waiting callers are served in turn
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def _notify(self) -> None:
+        """
+        Wake the threads and coroutines waiting for a slot. Call holding the condition.
+        """
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, woken in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(woken.set)
+
+    def release(self, operation_name: str, started: float, latency: float, transient_failure: bool = False,
+                succeeded: bool = True) -> None:
+        """
+        Free the slot of a call to the operation that started (on the monotonic clock) at started and took latency
+        seconds, adapting the concurrency limit to how it went. Only the latencies of calls that succeeded are
+        judged (and kept as the operation's baseline), since a call that failed fast says nothing about how long a
+        healthy one takes.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if transient_failure or (succeeded and self._slow(operation_name, latency)):
+                self.congested_calls += 1
+                if started >= self._last_decrease:
+                    self.limit = max(float(self.min_concurrency), self.limit * self.decrease)
+                    self._last_decrease = time.monotonic()
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + self.increase / self.limit)
+            self._notify()
+
+    def _slow(self, operation_name: str, latency: float) -> bool:
+        if self.latency_target is not None:
+            return latency > self.latency_target
+        latencies = self._latencies.get(operation_name)
+        if latencies is None:
+            latencies = self._latencies[operation_name] = collections.deque(maxlen=self.latency_window)
+        slow = bool(latencies) and latency > self.latency_tolerance * min(latencies)
+        latencies.append(latency)
+        return slow
+
+    @contextmanager
+    def limit_call(self, operation_name: str) -> Iterator[float]:
+        """
+        Hold a slot for the duration of the block, yielding how long it took to get one.
+        A transient failure raised from the block is reported as congestion.
+        """
+        waited = self.acquire()
+        started = time.monotonic()
+        transient_failure = False
+        succeeded = False
+        try:
+            yield waited
+            succeeded = True
+        except BaseException as exc:
+            transient_failure = isinstance(exc, Exception) and RateLimiter.is_transient(exc)
+            raise
+        finally:
+            self.release(operation_name, started, time.monotonic() - started, transient_failure, succeeded)
+
+    @asynccontextmanager
+    async def limit_call_async(self, operation_name: str) -> AsyncIterator[float]:
+        """
+        Hold a slot for the duration of the async block, as limit_call does, waiting for it without blocking the
+        event loop.
+        """
+        waited = await self.acquire_async()
+        started = time.monotonic()
+        transient_failure = False
+        succeeded = False
+        try:
+            yield waited
+            succeeded = True
+        except BaseException as exc:
+            transient_failure = isinstance(exc, Exception) and RateLimiter.is_transient(exc)
+            raise
+        finally:
+            self.release(operation_name, started, time.monotonic() - started, transient_failure, succeeded)
@@ -0,0 +1,164 @@
+"""
+This module provides compact, typed records of the complex types of a wsdl
+"""
+# Standard Library
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Tuple
+import keyword
+import threading
+
+
+Member = Tuple[str, str, str, bool]
+
+
+def attribute_name(name: str) -> str:
+    """
+    A python identifier for a member or argument name.
+    """
+    name = ''.join(c if c.isalnum() or c == '_' else '_' for c in name)
+    if not name or name[0].isdigit():
+        name = '_' + name
+    return name + '_' if keyword.iskeyword(name) else name
+
+
+class Record(Mapping):
+    """
+    A record of a complex type, with a slot per member rather than a dict per instance, so it takes a fraction
+    of the memory of the dict ClientWrapper would otherwise unpack. A record class lists (attribute, field, type,
+    repeated) per member in _members, where field is the member's name on the wire, attribute its python name
+    (the same, unless the field isn't a valid identifier), type its qualified type name (as in ClientWrapper.types)
+    and repeated whether it's a list. Members are read as attributes, or by field as from a read-only mapping,
+    so a record compares equal to the dict it replaces; to_dict converts it back.
+    """
+    __slots__ = ()
+    _type = ''
+    _members: Tuple[Member, ...] = ()
+    _attributes: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._attributes = {field: attribute for attribute, field, _, _ in cls._members}
+
+    def __init__(self, **kwargs) -> None:
+        for attribute, _, _, _ in self._members:
+            setattr(self, attribute, None)
+        for name, value in kwargs.items():
+            attribute = self._attributes.get(name, name)
+            if attribute not in self.__slots__:
+                raise TypeError('{} has no member {}'.format(type(self).__name__, name))
+            setattr(self, attribute, value)
+
+    @classmethod
+    def from_dict(cls, values: dict, records: Dict[str, type]) -> 'Record':
+        """
+        Build a record from an unpacked dict, turning members of the complex types in records into records too.
+        """
+        record = cls.__new__(cls)
+        for attribute, field, type_name, repeated in cls._members:
+            value = values.get(field)
+            if value is not None and type_name in records:
+                if repeated:
+                    value = [to_record(item, type_name, records) for item in value]
+                else:
+                    value = to_record(value, type_name, records)
+            setattr(record, attribute, value)
+        return record
+
+    def to_dict(self) -> dict:
+        """
+        The record as an unpacked dict, as ClientWrapper.call_service would have returned it (and accepts it).
+        """
+        return {field: to_dict(getattr(self, attribute)) for attribute, field, _, _ in self._members}
+
+    def __getitem__(self, field: str) -> Any:
+        try:
+            return getattr(self, self._attributes[field])
+        except KeyError:
+            raise KeyError(field) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._attributes)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(attribute, getattr(self, attribute)) for attribute, _, _, _ in self._members))
+
+    def __reduce__(self) -> tuple:
+        values = tuple(getattr(self, attribute) for attribute, _, _, _ in self._members)
+        if getattr(type(self), '_dynamic', False):
+            # a class made by record_class can't be found by name, so make it again
+            return _restore, (self._type, self._members, values)
+        return _restore_instance, (type(self), values)
+
+
+_RECORD_CLASSES: Dict[Tuple[str, Tuple[Member, ...]], type] = {}
+_RECORD_CLASSES_LOCK = threading.Lock()
+
+
+def record_class(type_name: str, members: Tuple[Member, ...]) -> type:
+    """
+    The record class of the named complex type with the members, made on first use and then shared process-wide.
+    """
+    key = (type_name, members)
+    cls = _RECORD_CLASSES.get(key)
+    if cls is None:
+        with _RECORD_CLASSES_LOCK:
+            cls = _RECORD_CLASSES.get(key)
+            if cls is None:
+                cls = _RECORD_CLASSES[key] = type(attribute_name(type_name.split(':')[-1]), (Record,), {
+                    '__slots__': tuple(attribute for attribute, _, _, _ in members),
+                    '__module__': __name__,
+                    '_type': type_name,
+                    '_members': members,
+                    '_dynamic': True,
+                })
+    return cls
+
+
+def record_members(definition: dict) -> Tuple[Member, ...]:
+    """
+    The record members of a complex type, from its definition in ClientWrapper.types.
+    """
+    members = []
+    for member in definition.get('members') or []:
+        if not member or not member.get('name'):
+            continue
+        repeated = member['type'].endswith('[]')
+        type_name = '{}:{}'.format(member['namespace'], member['type'][:-2] if repeated else member['type'])
+        members.append((attribute_name(member['name']), member['name'], type_name, repeated))
+    return tuple(members)
+
+
+def _restore_instance(cls: type, values: tuple) -> Record:
+    record = cls.__new__(cls)
+    for (attribute, _, _, _), value in zip(cls._members, values):  # pylint: disable=protected-access
+        setattr(record, attribute, value)
+    return record
+
+
+def _restore(type_name: str, members: Tuple[Member, ...], values: tuple) -> Record:
+    return _restore_instance(record_class(type_name, members), values)
+
+
+def to_record(value: Any, type_name: str, records: Dict[str, type]) -> Any:
+    """
+    Convert an unpacked value of the named type into a record, if the type has one.
+    """
+    cls = records.get(type_name)
+    if cls is None or not isinstance(value, dict):
+        return value
+    return cls.from_dict(value, records)
+
+
+def to_dict(value: Any) -> Any:
+    """
+    Convert records (and lists of records), however deeply nested, back into unpacked dicts.
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_dict(item) for item in value]
+    return value
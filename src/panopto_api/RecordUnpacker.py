@@ -0,0 +1,83 @@
+"""
+This module provides a converter from zeep response objects to compact records
+"""
+# Standard Library
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Optional
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep.xsd import ComplexType
+    from zeep.xsd.valueobjects import CompoundValue
+
+# Local
+from panopto_api.Record import record_class, record_members
+from panopto_api.ResponseUnpacker import Converter, ResponseUnpacker
+
+
+class RecordUnpacker(ResponseUnpacker):
+    """
+    Unpacks zeep responses like ResponseUnpacker, except that values of the complex types described in the wsdl's
+    types (see ClientWrapper.types) become Records rather than dicts, and so do their nested complex members;
+    lists stay lists. Values of types the wsdl doesn't describe (e.g. anonymous types), or carrying members their
+    type doesn't declare, are unpacked into dicts as before.
+    """
+    def __init__(self, types: Dict[str, dict], namespaces: Dict[str, str]) -> None:
+        """
+        Make records of the types, whose names are qualified with the prefixes of the namespaces.
+        """
+        super().__init__()
+        self.types = types
+        self._prefixes = {namespace: prefix for prefix, namespace in namespaces.items()}
+
+    def record_class(self, xsd_type: 'ComplexType') -> Optional[type]:
+        """
+        The record class of the complex type, or None if the wsdl's types don't describe it.
+        """
+        qname = xsd_type.qname
+        if qname is None or qname.namespace not in self._prefixes:
+            return None
+        type_name = '{}:{}'.format(self._prefixes[qname.namespace], qname.localname)
+        members = record_members(self.types.get(type_name) or {})
+        return record_class(type_name, members) if members else None
+
+    def _compile_compound(self, xsd_type: 'ComplexType') -> Converter:
+        """
+        Plan the conversion of each member of the record: simple singular members are set as they are,
+        simple repeated members are set as new lists, and complex members are converted recursively.
+        """
+        from zeep.xsd import ComplexType  # pylint: disable=import-outside-toplevel
+        cls = self.record_class(xsd_type)
+        if cls is None:
+            return super()._compile_compound(xsd_type)
+        as_dict = super()._compile_compound(xsd_type)
+        elements = dict(xsd_type.elements)
+        plan = []
+        for attribute, field, _, repeated in cls._members:  # pylint: disable=protected-access
+            element = elements.get(field)
+            if element is not None and isinstance(element.type, ComplexType):
+                converter = self._convert
+            elif repeated:
+                converter = list
+            else:
+                converter = None
+            # set slots through their descriptors, the cheapest way in
+            plan.append((field, getattr(cls, attribute).__set__, converter))
+        fields = frozenset(field for field, _, _ in plan)
+        member_count = len(plan)
+        new = partial(cls.__new__, cls)
+        # CompoundValue overrides __getattribute__ in python; go around it
+        get_attribute = object.__getattribute__
+
+        def convert(value: 'CompoundValue') -> object:
+            values = get_attribute(value, '__values__')
+            if len(values) != member_count and not fields.issuperset(values):
+                return as_dict(value)
+            record = new()
+            for field, set_member, converter in plan:
+                item = values.get(field)
+                if item is not None and converter is not None:
+                    item = converter(item)
+                set_member(record, item)
+            return record
+        return convert
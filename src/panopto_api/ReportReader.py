@@ -0,0 +1,217 @@
+"""
+This module provides streaming download and lazy CSV decoding of UsageReporting reports
+"""
+# Standard Library
+from contextlib import closing
+from tempfile import SpooledTemporaryFile
+from typing import IO, Callable, Dict, Iterator, List, Optional
+from xml.sax.handler import ContentHandler
+import base64
+import csv
+import io
+import re
+import xml.sax
+import zipfile
+
+# Local
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.Columns import Columns
+
+
+class InvalidReportException(Exception):
+    """
+    Exception raised when a downloaded report can't be read
+    """
+    pass
+
+
+class _Base64ElementDecoder(ContentHandler):
+    """
+    SAX handler decoding the base64 text of one element straight into a file, a chunk at a time,
+    so the encoded report is never held in memory.
+    """
+    def __init__(self, element_name: str, target: IO[bytes]) -> None:
+        super().__init__()
+        self.element_name = element_name
+        self.target = target
+        self.found = False
+        self._inside = False
+        self._pending = ''
+
+    def startElementNS(self, name, qname, attrs):  # noqa: N802 pylint: disable=invalid-name
+        if name[1] == self.element_name:
+            self._inside = self.found = True
+
+    def endElementNS(self, name, qname):  # noqa: N802 pylint: disable=invalid-name
+        if name[1] == self.element_name:
+            self._inside = False
+            self.target.write(base64.b64decode(self._pending))
+            self._pending = ''
+
+    def characters(self, content):
+        if self._inside:
+            # base64 decodes in 4-character quanta; carry any remainder over to the next chunk
+            data = self._pending + ''.join(content.split())
+            cut = len(data) - len(data) % 4
+            self.target.write(base64.b64decode(data[:cut]))
+            self._pending = data[cut:]
+
+
+class ReportReader(object):
+    """
+    A UsageReporting report, downloaded into a spooled temporary file (in memory while small, on disk beyond
+    spool_size) and read lazily: the zipped CSV entry is only opened, decompressed and parsed as rows are consumed,
+    so peak memory stays flat regardless of report size. Use download() to fetch a report.
+    Rows are dicts keyed by the report's column headers, with the leading BOM stripped and quoted fields handled.
+    """
+    ZIP_SIGNATURE = b'PK\x03\x04'
+    SPOOL_SIZE = 8 * 1024 * 1024
+    CHUNK_SIZE = 64 * 1024
+    # zero-padded numbers (ids, codes) are kept as text
+    INTEGER_REGEX = re.compile(r'^-?(0|[1-9]\d*)$')
+    FLOAT_REGEX = re.compile(r'^-?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][-+]?\d+)?$')
+
+    def __init__(self, report_file: IO[bytes]) -> None:
+        """
+        Read the zipped report in report_file, which must be seekable. The reader takes ownership of the file.
+        """
+        self._file = report_file
+
+    def __enter__(self) -> 'ReportReader':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.rows()
+
+    def close(self) -> None:
+        """
+        Discard the downloaded report.
+        """
+        self._file.close()
+
+    @classmethod
+    def download(cls, usage_client: ClientWrapper, report_id: str, spool_size: int = SPOOL_SIZE,
+                 chunk_size: int = CHUNK_SIZE) -> 'ReportReader':
+        """
+        Download the report with GetReport through the usage client, streaming the http body into a spooled file.
+        The report may come back either as the raw zip or as base64 text in a SOAP envelope; both are handled
+        without holding the whole body in memory.
+        """
+        from zeep.utils import get_media_type  # pylint: disable=import-outside-toplevel
+        report_file = SpooledTemporaryFile(max_size=spool_size)  # pylint: disable=consider-using-with
+        try:
+            with closing(usage_client.call_service_streamed('GetReport', reportId=report_id)) as response:
+                media_type = get_media_type(response.headers.get('Content-Type', 'text/xml'))
+                if response.status_code != 200 or media_type == 'multipart/related':
+                    # faults and MTOM replies go through zeep in full; a fault raises here
+                    report_file.write(usage_client.process_response('GetReport', response) or b'')
+                else:
+                    cls._spool(response.iter_content(chunk_size), report_file)
+            report_file.seek(0)
+        except BaseException:
+            report_file.close()
+            raise
+        return cls(report_file)
+
+    @classmethod
+    def _spool(cls, chunks: Iterator[bytes], report_file: IO[bytes]) -> None:
+        first = b''
+        for chunk in chunks:
+            first += chunk
+            if len(first) >= len(cls.ZIP_SIGNATURE):
+                break
+        if first.startswith(cls.ZIP_SIGNATURE):
+            report_file.write(first)
+            for chunk in chunks:
+                report_file.write(chunk)
+            return
+        decoder = _Base64ElementDecoder('GetReportResult', report_file)
+        parser = xml.sax.make_parser()
+        parser.setFeature(xml.sax.handler.feature_namespaces, True)
+        parser.setFeature(xml.sax.handler.feature_external_ges, False)
+        parser.setContentHandler(decoder)
+        parser.feed(first)
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+        if not decoder.found:
+            raise InvalidReportException('GetReport response has no GetReportResult')
+
+    def _open_entry(self) -> IO[bytes]:
+        self._file.seek(0)
+        try:
+            archive = zipfile.ZipFile(self._file)  # pylint: disable=consider-using-with
+        except zipfile.BadZipFile as exc:
+            raise InvalidReportException('report is not a zip archive') from exc
+        names = archive.namelist()
+        if not names:
+            raise InvalidReportException('report archive is empty')
+        # there's just one report, the archive is for compression only
+        return archive.open(names[0])
+
+    @staticmethod
+    def infer_type(value: str) -> object:
+        """
+        Convert a CSV field to an int or float if it looks like one, unless it's zero-padded. Empty fields become None.
+        """
+        if value == '':
+            return None
+        if ReportReader.INTEGER_REGEX.match(value):
+            return int(value)
+        if ReportReader.FLOAT_REGEX.match(value):
+            return float(value)
+        return value
+
+    @property
+    def headers(self) -> List[str]:
+        """
+        The report's column headers.
+        """
+        with self._open_entry() as entry:
+            return next(csv.reader(io.TextIOWrapper(entry, encoding='utf-8-sig', newline='')), [])
+
+    def _typed_rows(self, converters: Optional[Dict[str, Callable[[str], object]]],
+                    infer_types: bool) -> Iterator[list]:
+        """
+        Yield the report's column headers, then each row's converted values in header order.
+        """
+        converters = converters or {}
+        default = ReportReader.infer_type if infer_types else str
+        with self._open_entry() as entry:
+            reader = csv.reader(io.TextIOWrapper(entry, encoding='utf-8-sig', newline=''))
+            headers = next(reader, None)
+            if headers is None:
+                return
+            yield headers
+            column_converters = [converters.get(header, default) for header in headers]
+            for row in reader:
+                yield [convert(value) for convert, value in zip(column_converters, row)]
+
+    def rows(self, converters: Optional[Dict[str, Callable[[str], object]]] = None,
+             infer_types: bool = True) -> Iterator[dict]:
+        """
+        Yield the report's rows as dicts keyed by column header.
+        Fields are converted by the converter for their column if there is one, else by infer_type if infer_types,
+        else left as strings.
+        """
+        rows = self._typed_rows(converters, infer_types)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        for values in rows:
+            yield dict(zip(headers, values))
+
+    def columns(self, converters: Optional[Dict[str, Callable[[str], object]]] = None, infer_types: bool = True,
+                chunk_size: int = 10000) -> Columns:
+        """
+        Read the report into Columns, converting fields as rows does, chunk_size rows at a time,
+        so a report's numbers end up in typed arrays without ever holding a dict per row.
+        """
+        rows = self._typed_rows(converters, infer_types)
+        headers = next(rows, None)
+        if headers is None:
+            return Columns()
+        return Columns.from_rows(headers, rows, chunk_size=chunk_size)
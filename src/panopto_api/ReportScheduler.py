@@ -0,0 +1,202 @@
+"""
+This module provides a scheduler that queues UsageReporting reports, polls for them in bulk and downloads them
+"""
+# Standard Library
+from concurrent import futures
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+import logging
+import threading
+import time
+
+# Local
+from panopto_api.BoundedExecutor import BoundedExecutor
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.ReportReader import ReportReader
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ReportTimeoutException(Exception):
+    """
+    Exception raised when a report isn't available within the scheduler's timeout
+    """
+    pass
+
+
+class _PendingReport(object):
+    """
+    A queued report the scheduler is waiting on.
+    """
+    def __init__(self, report_id: str, future: Future, deadline: Optional[float]) -> None:
+        self.report_id = report_id
+        self.future = future
+        self.deadline = deadline
+
+
+class _ReportTypePoll(object):
+    """
+    The polling state of one report type: its pending reports and adaptive poll interval.
+    """
+    def __init__(self, interval: float) -> None:
+        self.pending: Dict[str, _PendingReport] = {}
+        self.interval = interval
+        self.next_poll = time.monotonic()
+
+
+class ReportScheduler(object):
+    """
+    Queues reports across report types and date ranges, and delivers each as a future resolving to a ReportReader.
+    A single background thread polls GetRecentReports once per report type for all of that type's pending reports.
+    A type's poll interval starts at min_interval and grows by the backoff factor (up to max_interval) while nothing
+    becomes available, and drops back to min_interval when something does or a new report is queued.
+    Downloads start on a thread pool as soon as a report is available. Reports not available within timeout seconds
+    (if a timeout is set) fail with ReportTimeoutException.
+    Futures can be awaited from asyncio with asyncio.wrap_future. Shut the scheduler down when done with it.
+    """
+    def __init__(self, usage_client: ClientWrapper, min_interval: float = 5.0, max_interval: float = 120.0, *,
+                 backoff: float = 1.5, download_concurrency: int = 4, timeout: Optional[float] = None) -> None:
+        self.usage_client = usage_client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self._polls: Dict[str, _ReportTypePoll] = {}
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._downloads = BoundedExecutor(max_workers=download_concurrency, thread_name_prefix='panopto_api_reports')
+        self._poller = threading.Thread(target=self._poll_forever, name='panopto_api_report_poller', daemon=True)
+        self._poller.start()
+
+    def __enter__(self) -> 'ReportScheduler':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown(wait=exc_type is None)
+
+    def submit(self, report_type: str, start_time: datetime, end_time: datetime) -> Future:
+        """
+        Queue a report of the specified type covering the specified time range,
+        and return a future resolving to its ReportReader once it's generated and downloaded.
+        """
+        report_id = self.usage_client.call_service(
+            'QueueReport', reportType=report_type, startTime=start_time, endTime=end_time)
+        return self.track(report_type, report_id)
+
+    def track(self, report_type: str, report_id: str) -> Future:
+        """
+        Wait for an already-queued report, returning a future as submit does.
+        """
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('cannot track reports after shutdown')
+            poll = self._polls.get(report_type)
+            if poll is None:
+                poll = self._polls[report_type] = _ReportTypePoll(self.min_interval)
+            poll.pending[str(report_id).lower()] = _PendingReport(report_id, future, deadline)
+            # a fresh report is worth a prompt look
+            poll.interval = self.min_interval
+            poll.next_poll = min(poll.next_poll, time.monotonic() + self.min_interval)
+            self._condition.notify()
+        return future
+
+    @staticmethod
+    def as_completed(report_futures: Iterable[Future], timeout: Optional[float] = None) -> Iterator[Future]:
+        """
+        Yield the report futures as they complete.
+        """
+        return futures.as_completed(report_futures, timeout=timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop polling. Reports still pending are cancelled; downloads in progress finish if wait.
+        """
+        with self._condition:
+            self._shutdown = True
+            # taken out of their polls, so a poll in progress can't also resolve them
+            pending = []
+            for poll in self._polls.values():
+                pending.extend(poll.pending.values())
+                poll.pending.clear()
+            self._polls.clear()
+            self._condition.notify()
+        for report in pending:
+            ReportScheduler._fail(report.future, futures.CancelledError('report scheduler shut down'))
+        if wait:
+            self._poller.join()
+        self._downloads.shutdown(wait=wait)
+
+    @staticmethod
+    def _fail(future: Future, exc: BaseException) -> None:
+        """
+        Fail the future, unless it's already resolved.
+        """
+        try:
+            future.set_exception(exc)
+        except futures.InvalidStateError:
+            LOG.debug('Report future already resolved; dropping %r', exc)
+
+    def _poll_forever(self) -> None:
+        while True:
+            with self._condition:
+                while not self._shutdown:
+                    due = [(report_type, poll) for report_type, poll in self._polls.items()
+                           if poll.pending and poll.next_poll <= time.monotonic()]
+                    if due:
+                        break
+                    next_polls = [poll.next_poll for poll in self._polls.values() if poll.pending]
+                    self._condition.wait(max(min(next_polls) - time.monotonic(), 0) if next_polls else None)
+                if self._shutdown:
+                    return
+            for report_type, poll in due:
+                self._poll(report_type, poll)
+
+    def _poll(self, report_type: str, poll: _ReportTypePoll) -> None:
+        """
+        Check all pending reports of one type with a single GetRecentReports call.
+        """
+        try:
+            recent = self.usage_client.call_service('GetRecentReports', reportType=report_type) or []
+            available = {str(report['ReportId']).lower() for report in recent if report.get('IsAvailable')}
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception('Failed to poll %s reports', report_type)
+            available = set()
+        now = time.monotonic()
+        ready, expired = [], []
+        with self._condition:
+            for key in list(poll.pending):
+                report = poll.pending[key]
+                if key in available:
+                    ready.append(poll.pending.pop(key))
+                elif report.deadline is not None and now >= report.deadline:
+                    expired.append(poll.pending.pop(key))
+            poll.interval = self.min_interval if ready else min(poll.interval * self.backoff, self.max_interval)
+            poll.next_poll = now + poll.interval
+        for report in expired:
+            ReportScheduler._fail(report.future, ReportTimeoutException(
+                '{} report {} not available after {} seconds'.format(report_type, report.report_id, self.timeout)))
+        for report in ready:
+            try:
+                self._downloads.submit(self._download, report)
+            except RuntimeError:
+                # shut down (without waiting) while this poll was in progress
+                ReportScheduler._fail(report.future, futures.CancelledError('report scheduler shut down'))
+
+    def _download(self, report: _PendingReport) -> None:
+        if report.future.done():
+            return
+        try:
+            reader = ReportReader.download(self.usage_client, report.report_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            ReportScheduler._fail(report.future, exc)
+            return
+        try:
+            report.future.set_result(reader)
+        except futures.InvalidStateError:
+            # nobody will get the reader to close it
+            reader.close()
@@ -0,0 +1,251 @@
+"""
+This module provides an opt-in cache of unpacked responses to read-only SOAP operations
+"""
+# Standard Library
+from datetime import date, datetime, time as datetime_time
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from uuid import UUID
+import collections
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class CacheStats(NamedTuple):
+    """
+    A snapshot of cache hit and miss counts.
+    """
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The fraction of lookups that were hits, or 0.0 if there were none.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MemoryCacheBackend(object):
+    """
+    An in-process, thread-safe LRU store of cache entries, holding at most max_entries.
+    Values are stored by reference, so a cached response is shared by every caller that hits it.
+    """
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: 'collections.OrderedDict[str, Tuple[float, Any]]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """
+        Return the (expiry, value) entry for the key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, expires: float, value: Any) -> None:
+        """
+        Store the entry, evicting the least recently used entries beyond max_entries.
+        """
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """
+        Remove the entry for the key, if any.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCacheBackend(object):
+    """
+    A store of cache entries in a local sqlite database, so they survive restarts and can be shared between processes
+    on one machine. Values are pickled, so only cache responses from trusted servers in a private location.
+    Holds at most max_entries, evicting the least recently used.
+    """
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000) -> None:
+        self.path = path or DiskCacheBackend.default_path()
+        self.max_entries = max_entries
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires REAL, accessed REAL, value BLOB)')
+
+    @staticmethod
+    def default_path() -> str:
+        """
+        The location of the cache database in the platform cache directory for this package, honoring XDG_CACHE_HOME.
+        """
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'panopto_api', 'responses.sqlite')
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """
+        Return the (expiry, value) entry for the key, or None.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT expires, value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        return row[0], pickle.loads(row[1])
+
+    def set(self, key: str, expires: float, value: Any) -> None:
+        """
+        Store the entry, evicting the least recently used entries beyond max_entries.
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO entries (key, expires, accessed, value) VALUES (?, ?, ?, ?)',
+                (key, expires, time.time(), data))
+            self._connection.execute(
+                'DELETE FROM entries WHERE key IN '
+                '(SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def delete(self, key: str) -> None:
+        """
+        Remove the entry for the key, if any.
+        """
+        with self._lock:
+            self._connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            self._connection.execute('DELETE FROM entries')
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCache(object):
+    """
+    A cache of unpacked operation responses, keyed by service address, bound service and port, operation name,
+    canonicalized arguments, the identity calling (responses depend on the caller's permissions) and the form
+    results are unpacked in. Calls with arguments that can't be canonicalized aren't cached.
+    Caching is opt-in per operation: only operations given a ttl (in seconds) are cached, so pass ttls for read-only
+    operations whose results change rarely, e.g.
+        ResponseCache({'DescribeReportTypes': 3600, 'GetSessionsById': 300})
+    Entries live in a MemoryCacheBackend unless another backend (such as a DiskCacheBackend) is given.
+    A hit skips both the round trip and unpacking, and returns the very object cached: don't mutate it.
+    """
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, backend: Optional[Any] = None) -> None:
+        self.ttls = dict(ttls or {})
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self._stats: Dict[str, list] = collections.defaultdict(lambda: [0, 0])
+        self._stats_lock = threading.Lock()
+
+    def ttl(self, operation_name: str) -> Optional[float]:
+        """
+        The ttl of the operation's responses, or None if the operation isn't cached.
+        """
+        return self.ttls.get(operation_name)
+
+    @staticmethod
+    def _canonical(value: Any) -> Any:
+        """
+        Map argument values json can't serialize to stable equivalents, raising TypeError for values with none.
+        """
+        if isinstance(value, (datetime, date, datetime_time)):
+            return value.isoformat()
+        if isinstance(value, (UUID, Decimal)):
+            return str(value)
+        if isinstance(value, (set, frozenset)):
+            return sorted(value, key=repr)
+        if isinstance(value, bytes):
+            return value.hex()
+        try:
+            # zeep value objects
+            return dict(object.__getattribute__(value, '__values__'))
+        except AttributeError:
+            raise TypeError('{} has no canonical form'.format(type(value).__name__)) from None
+
+    @staticmethod
+    def key(address: str, service_name: str, port_name: str, operation_name: str, kwargs: dict, *,
+            identity: str = '', results: str = '') -> str:
+        """
+        The cache key of an operation invocation by identity (e.g. a username), unpacked into results (see
+        ClientWrapper). Arguments are canonicalized, so equal arguments make equal keys regardless of ordering, and
+        hashed, so credentials among them aren't stored in the clear. Raises TypeError if an argument has no
+        canonical form, since falling back to e.g. its repr could make equal arguments miss, or different ones hit.
+        """
+        arguments = json.dumps(kwargs, sort_keys=True, separators=(',', ':'), default=ResponseCache._canonical)
+        digest = hashlib.sha256('\n'.join(
+            (address, service_name, port_name, identity, results, arguments)).encode('utf-8')).hexdigest()
+        return '{}:{}'.format(operation_name, digest)
+
+    def _count(self, operation_name: str, hit: bool) -> None:
+        with self._stats_lock:
+            self._stats[operation_name][0 if hit else 1] += 1
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up the key, returning (True, value) on a hit or (False, None) on a miss. Expired entries are misses.
+        """
+        operation_name = key.split(':', 1)[0]
+        entry = self.backend.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._count(operation_name, True)
+                return True, entry[1]
+            self.backend.delete(key)
+        self._count(operation_name, False)
+        return False, None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """
+        Cache the value under the key for ttl seconds.
+        """
+        self.backend.set(key, time.time() + ttl, value)
+
+    def clear(self) -> None:
+        """
+        Remove every entry. Statistics are kept.
+        """
+        self.backend.clear()
+
+    def stats(self, operation_name: Optional[str] = None) -> CacheStats:
+        """
+        Hits and misses for the specified operation, or for all operations if unspecified.
+        """
+        with self._stats_lock:
+            if operation_name is not None:
+                return CacheStats(*self._stats.get(operation_name, (0, 0)))
+            return CacheStats(sum(counts[0] for counts in self._stats.values()),
+                              sum(counts[1] for counts in self._stats.values()))
@@ -0,0 +1,118 @@
+"""
+This module provides a fast converter from zeep response objects to pythonic dicts and lists
+"""
+# Standard Library
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Union
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep.xsd import ComplexType
+    from zeep.xsd.valueobjects import CompoundValue
+
+
+Converter = Callable[[object], object]
+
+
+class ResponseUnpacker(object):
+    """
+    Unpacks zeep responses into the same dicts and lists as ClientWrapper._unpack_response,
+    without probing every node by reflection. The first time a zeep value class is seen, a converter is compiled
+    from its xsd type: members declared as simple types pass straight through, and only complex or repeated members
+    are descended into. Converters are cached per value class, which zeep creates once per complex type, so an
+    unpacker should live as long as the wsdl document it serves (ClientWrapper keeps one per document).
+    """
+    LEAF_MODULES = frozenset(['builtins', 'datetime', 'decimal', 'uuid'])
+
+    def __init__(self) -> None:
+        self._converters: Dict[type, Optional[Converter]] = {
+            list: self._convert_list,
+            dict: None,
+        }
+
+    def unpack(self, response: Union[list, dict, object]) -> object:
+        """
+        Unpack the response into a pythonic object.
+        """
+        return self._convert(response)
+
+    def _converter(self, value_class: type) -> Optional[Converter]:
+        try:
+            return self._converters[value_class]
+        except KeyError:
+            converter = self._converters[value_class] = self._compile(value_class)
+            return converter
+
+    def _convert(self, value: object) -> object:
+        converter = self._converter(type(value))
+        return value if converter is None else converter(value)
+
+    def _convert_list(self, values: list) -> list:
+        """
+        Lists are (nearly always) homogeneous, so look up the converter once for the class of the first item.
+        """
+        if not values:
+            return []
+        first_class = type(values[0])
+        converter = self._converter(first_class)
+        convert = self._convert
+        # converters are compiled per exact class, so a subclass must go through _convert to get its own
+        # pylint: disable=unidiomatic-typecheck
+        if converter is None:
+            return [value if type(value) is first_class else convert(value) for value in values]
+        return [converter(value) if type(value) is first_class else convert(value) for value in values]
+
+    def _compile(self, value_class: type) -> Optional[Converter]:
+        """
+        Compile the converter for a value class. None means the value passes through unchanged.
+        """
+        # by the time there's a response to unpack, zeep is loaded
+        from zeep.xsd import ComplexType  # pylint: disable=import-outside-toplevel
+        from zeep.xsd.valueobjects import CompoundValue  # pylint: disable=import-outside-toplevel
+        if issubclass(value_class, CompoundValue) and isinstance(getattr(value_class, '_xsd_type', None), ComplexType):
+            return self._compile_compound(value_class._xsd_type)  # pylint: disable=protected-access
+        if value_class.__module__ in ResponseUnpacker.LEAF_MODULES:
+            return None
+        # anything else might be a zeep object without a known xsd type (e.g. soap-encoded arrays)
+        return self._convert_object
+
+    def _convert_object(self, value: object) -> object:
+        try:
+            values = object.__getattribute__(value, '__values__')
+        except AttributeError:
+            return value
+        convert = self._convert
+        return {key: convert(item) for key, item in values.items()}
+
+    def _compile_compound(self, xsd_type: 'ComplexType') -> Converter:
+        """
+        Plan the conversion of each member of the complex type:
+        simple singular members are copied as they are, simple repeated members are copied as new lists,
+        and complex members are converted recursively. Members the type doesn't declare take the generic route.
+        """
+        from zeep.xsd import ComplexType  # pylint: disable=import-outside-toplevel
+        declared = set()
+        descend = []
+        for name, element in xsd_type.elements:
+            declared.add(name)
+            if isinstance(element.type, ComplexType):
+                descend.append((name, self._convert))
+            elif element.accepts_multiple:
+                descend.append((name, list))
+        declared.update(name for name, _ in xsd_type.attributes)
+        declared_count = len(declared)
+        generic = self._convert
+        # CompoundValue overrides __getattribute__ in python; go around it
+        get_attribute = object.__getattribute__
+
+        def convert(value: 'CompoundValue') -> dict:
+            # copy every member in one go, then replace the few that need converting
+            ret = dict(get_attribute(value, '__values__'))
+            for name, converter in descend:
+                item = ret.get(name)
+                if item is not None:
+                    ret[name] = converter(item)
+            if len(ret) != declared_count:
+                for name in ret.keys() - declared:
+                    ret[name] = generic(ret[name])
+            return ret
+        return convert
@@ -0,0 +1,76 @@
+"""
+This module provides a process-wide registry of parsed Panopto service definitions
+"""
+# Standard Library
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+import logging
+import threading
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep import Transport
+    from zeep.wsdl import Document
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ServiceRegistry(object):
+    """
+    A registry of parsed WSDL documents keyed by service name and version.
+    Every Panopto host serves the same contract for a given service version, so a document parsed for one host can
+    back clients for any other host; only the service address needs to be rebound (see ClientWrapper.rebind_address).
+    Documents are parsed with the registry's own transport so they don't hold on to any one factory's session.
+    """
+    def __init__(self) -> None:
+        self._documents: Dict[Tuple[str, str], 'Document'] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        # made on first parse, so the registry (and SERVICE_REGISTRY) costs nothing until it's used
+        self._transport: Optional['Transport'] = None
+
+    def get_document(self, service: str, version: str, wsdl: str) -> 'Document':
+        """
+        Return the parsed WSDL document for the specified service and version,
+        parsing it from the wsdl location (url or path) if it isn't registered yet.
+        Concurrent requests for the same unregistered document wait for a single parse.
+        """
+        key = (service, version)
+        document = self._documents.get(key)
+        if document is not None:
+            return document
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            document = self._documents.get(key)
+            if document is None:
+                from zeep import Transport  # pylint: disable=import-outside-toplevel
+                from zeep.wsdl import Document  # pylint: disable=import-outside-toplevel
+                LOG.debug('Parsing WSDL for %s %s from %s', service, version, wsdl)
+                with self._lock:
+                    if self._transport is None:
+                        self._transport = Transport()
+                document = Document(wsdl, self._transport)
+                self._documents[key] = document
+        return document
+
+    def register(self, service: str, version: str, document: 'Document') -> None:
+        """
+        Register an already-parsed WSDL document for the specified service and version.
+        """
+        self._documents[(service, version)] = document
+
+    def invalidate(self, service: Optional[str] = None, version: Optional[str] = None) -> int:
+        """
+        Forget registered documents matching all of the specified service and version.
+        Unspecified criteria match everything. Return the number of documents forgotten.
+        """
+        with self._lock:
+            keys = [key for key in self._documents
+                    if (service is None or key[0] == service) and (version is None or key[1] == version)]
+            for key in keys:
+                del self._documents[key]
+        return len(keys)
+
+
+SERVICE_REGISTRY = ServiceRegistry()
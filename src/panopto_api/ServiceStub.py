@@ -0,0 +1,121 @@
+"""
+This module provides the runtime side of service stubs generated ahead of time by StubGenerator
+"""
+# Standard Library
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, Optional, Tuple
+import collections.abc
+import importlib
+import io
+import logging
+import re
+import threading
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep.wsdl import Document
+
+# Local
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.Record import to_dict, to_record
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ServiceStub(object):
+    """
+    The typed operations of a service, generated by StubGenerator as a subclass with a method per operation.
+    Arguments may be records or plain values, and results come back as records.
+    Around an AsyncClientWrapper, the operations return awaitables of their results.
+    """
+    RECORDS: Dict[str, type] = {}
+
+    def __init__(self, client: ClientWrapper) -> None:
+        self.client = client
+
+    def _call(self, operation_name: str, output_type: Optional[str], **kwargs) -> Any:
+        arguments = {name: to_dict(value) for name, value in kwargs.items() if value is not None}
+        response = self.client.call_service(operation_name, **arguments)
+        if isinstance(response, collections.abc.Awaitable):
+            return self._to_record_async(response, output_type)
+        return to_record(response, output_type, self.RECORDS) if output_type else response
+
+    async def _to_record_async(self, response: Awaitable, output_type: Optional[str]) -> Any:
+        response = await response
+        return to_record(response, output_type, self.RECORDS) if output_type else response
+
+
+class StubPackage(object):
+    """
+    A package of stub modules generated by StubGenerator, one per service version.
+    A stub module carries its service's wsdl and the definitions ClientWrapper would otherwise derive from it,
+    so a client can be constructed from it without downloading the wsdl, and its wrapper never inspects the wsdl.
+    zeep still builds its schema from the embedded wsdl, once per process per stub module.
+    """
+    MODULE_NAME_REGEX = re.compile(r'[^A-Za-z0-9_]')
+
+    def __init__(self, package: str) -> None:
+        """
+        Load stubs from the named (importable) package.
+        """
+        self.package = package
+        self._modules: Dict[Tuple[str, str], Optional[ModuleType]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def module_name(service: str, version: str) -> str:
+        """
+        The name of the stub module of the service version, e.g. UserManagement_4_0.
+        """
+        return StubPackage.MODULE_NAME_REGEX.sub('_', '{}_{}'.format(service, version))
+
+    def module(self, service: str, version: str) -> Optional[ModuleType]:
+        """
+        The stub module of the service version, or None if the package has none.
+        """
+        key = (service, version)
+        if key not in self._modules:
+            name = '{}.{}'.format(self.package, StubPackage.module_name(service, version))
+            try:
+                self._modules[key] = importlib.import_module(name)
+            except ModuleNotFoundError as exc:
+                if exc.name != name:
+                    raise
+                LOG.debug('No stub %s for %s %s', name, service, version)
+                self._modules[key] = None
+        return self._modules[key]
+
+    def document(self, service: str, version: str) -> Optional['Document']:
+        """
+        The parsed wsdl document of the service version's stub, or None if the package has none.
+        The document is parsed once per process and registered with ClientWrapper along with the stub's definitions.
+        """
+        module = self.module(service, version)
+        if module is None:
+            return None
+        document = getattr(module, '_document', None)
+        if document is None:
+            with self._lock:
+                document = getattr(module, '_document', None)
+                if document is None:
+                    from zeep import Transport  # pylint: disable=import-outside-toplevel
+                    from zeep.wsdl import Document  # pylint: disable=import-outside-toplevel
+                    document = Document(io.BytesIO(module.WSDL.encode('utf-8')), Transport())
+                    ClientWrapper._DEFINITIONS[document] = {  # pylint: disable=protected-access
+                        'namespaces': module.NAMESPACES,
+                        'services': module.SERVICES,
+                        'elements': module.ELEMENTS,
+                        'types': module.TYPES,
+                    }
+                    module._document = document  # pylint: disable=protected-access
+        return document
+
+    def stub(self, client: ClientWrapper, service: str, version: str) -> ServiceStub:
+        """
+        Wrap the client in the typed operations of the service version's stub.
+        """
+        module = self.module(service, version)
+        if module is None:
+            raise ModuleNotFoundError('{} has no stub for {} {}'.format(self.package, service, version))
+        return module.STUB_CLASS(client)
@@ -0,0 +1,193 @@
+"""
+This module provides stores persisting authentication cookies so they can be reused across processes
+"""
+# Standard Library
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+LOG = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """
+    The interface of a store of authentication cookies (the Set-Cookie value from LogOnWithPassword),
+    keyed by host and username. Pass a store to AuthenticatedClientFactory so that a new process can reuse a cookie
+    a previous one logged on for, rather than logging on again. Implement load, save and clear to store cookies
+    elsewhere (e.g. in a shared cache); override lock if the store is shared between processes.
+    Cookies are treated as expired margin seconds early, so a reused cookie doesn't expire mid-job.
+    """
+    DEFAULT_TTL = 60 * 60
+    EXPIRES_REGEX = re.compile(r'expires=([^;]+?\d\d:\d\d:\d\d[^;,]*)', re.IGNORECASE)
+    MAX_AGE_REGEX = re.compile(r'max-age=(\d+)', re.IGNORECASE)
+
+    def __init__(self, default_ttl: float = DEFAULT_TTL, margin: float = 60) -> None:
+        self.default_ttl = default_ttl
+        self.margin = margin
+
+    def expiry(self, cookie: str) -> float:
+        """
+        When the cookie expires, as a unix time: the earliest Max-Age or Expires attribute in the Set-Cookie value,
+        or default_ttl seconds from now if it has neither.
+        """
+        from email.utils import parsedate_to_datetime  # pylint: disable=import-outside-toplevel
+        now = time.time()
+        expiries = [now + int(max_age) for max_age in SessionStore.MAX_AGE_REGEX.findall(cookie)]
+        for expires in SessionStore.EXPIRES_REGEX.findall(cookie):
+            try:
+                expiries.append(parsedate_to_datetime(expires.strip()).timestamp())
+            except (TypeError, ValueError):
+                LOG.warning('Ignoring unparseable cookie expiry %r', expires)
+        return min(expiries) if expiries else now + self.default_ttl
+
+    @staticmethod
+    def key(host: str, username: str) -> str:
+        """
+        The key of the cookie for the specified host and username.
+        """
+        return '{}@{}'.format(username, host)
+
+    @abstractmethod
+    def load(self, host: str, username: str) -> Optional[str]:
+        """
+        Return the stored cookie for the host and username, or None if there is none or it has expired.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, host: str, username: str, cookie: str) -> None:
+        """
+        Store the cookie for the host and username.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self, host: str, username: str) -> None:
+        """
+        Forget the cookie for the host and username.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, host: str, username: str) -> Iterator[None]:  # pylint: disable=unused-argument
+        """
+        Hold the lock under which the factory checks for a fresh cookie and, failing that, logs on and saves one,
+        so concurrent refreshes result in a single log on. Stores shared between processes must lock across them;
+        by default there is no lock beyond the factory's own.
+        """
+        yield
+
+
+class FileSessionStore(SessionStore):
+    """
+    A SessionStore in a local json file, readable only by its owner, which processes on the machine share.
+    Refreshes, saves and clears are serialized across processes by an exclusive lock on a sidecar lock file
+    (on platforms without fcntl, only the factory's in-process lock applies). The lock is re-entrant within a
+    thread, so a save made while holding it, as the factory's refresh does, doesn't wait on itself.
+    """
+    def __init__(self, path: Optional[str] = None, default_ttl: float = SessionStore.DEFAULT_TTL,
+                 margin: float = 60) -> None:
+        super().__init__(default_ttl=default_ttl, margin=margin)
+        self.path = path or FileSessionStore.default_path()
+        # how deeply the current thread holds the lock; only the outermost hold takes the file lock
+        self._held = threading.local()
+
+    def __getstate__(self) -> dict:
+        # the lock depth belongs to this process's threads; a pickled copy (e.g. for a worker process) starts unlocked
+        state = dict(self.__dict__)
+        del state['_held']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._held = threading.local()
+
+    @staticmethod
+    def default_path() -> str:
+        """
+        The location of the store in the platform cache directory for this package, honoring XDG_CACHE_HOME.
+        """
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'panopto_api', 'sessions.json')
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as store_file:
+                return json.load(store_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            LOG.warning('Ignoring corrupt session store %s', self.path)
+            return {}
+
+    def _write(self, sessions: dict) -> None:
+        """
+        Replace the store atomically, so concurrent readers never see a partial file.
+        """
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+                json.dump(sessions, temp_file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def load(self, host: str, username: str) -> Optional[str]:
+        session = self._read().get(SessionStore.key(host, username))
+        if not session or session.get('expires', 0) - self.margin <= time.time():
+            return None
+        return session.get('cookie')
+
+    def save(self, host: str, username: str, cookie: str) -> None:
+        # the file holds every user's sessions, so the read and the write must not interleave with another save
+        with self.lock(host, username):
+            sessions = self._read()
+            now = time.time()
+            # drop the expired sessions of other users while we're at it
+            sessions = {key: session for key, session in sessions.items() if session.get('expires', 0) > now}
+            sessions[SessionStore.key(host, username)] = {'cookie': cookie, 'expires': self.expiry(cookie)}
+            self._write(sessions)
+
+    def clear(self, host: str, username: str) -> None:
+        with self.lock(host, username):
+            sessions = self._read()
+            if sessions.pop(SessionStore.key(host, username), None) is not None:
+                self._write(sessions)
+
+    @contextmanager
+    def lock(self, host: str, username: str) -> Iterator[None]:
+        # the whole file is locked, not just the host and username, since saves rewrite every user's sessions
+        depth = getattr(self._held, 'depth', 0)
+        if fcntl is None or depth:
+            self._held.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._held.depth = depth
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path + '.lock', 'a', encoding='utf-8') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            self._held.depth = 1
+            try:
+                yield
+            finally:
+                self._held.depth = 0
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
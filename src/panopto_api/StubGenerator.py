@@ -0,0 +1,215 @@
+"""
+This module generates importable, typed service stubs from Panopto service WSDLs ahead of time
+
+usage: python -m panopto_api.StubGenerator HOST OUTPUT_DIR [--no-ssl]
+"""
+# Standard Library
+from typing import Dict, List, Optional
+import argparse
+import io
+import os
+import pprint
+
+# Third Party
+from zeep import Client, Transport
+from zeep.wsdl import Document
+
+# Local
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.Record import attribute_name, record_members
+from panopto_api.ServiceStub import StubPackage
+
+
+class StubGenerator(object):
+    """
+    Generates a stub module per service version: the wsdl itself, the namespaces, services, elements and types
+    ClientWrapper derives from it, a Record class per complex type, and a ServiceStub class with a typed method
+    per operation. Load generated stubs with a StubPackage (e.g. pass stubs=StubPackage('my_stubs') to an
+    AuthenticatedClientFactory). Stubs are only as current as the wsdls they were generated from;
+    regenerate them when ENDPOINTS changes.
+    """
+    PYTHON_TYPES = {
+        'anyURI': 'str', 'base64Binary': 'bytes', 'boolean': 'bool', 'byte': 'int', 'date': 'datetime.date',
+        'dateTime': 'datetime.datetime', 'decimal': 'decimal.Decimal', 'double': 'float', 'float': 'float',
+        'guid': 'str', 'int': 'int', 'integer': 'int', 'long': 'int', 'short': 'int', 'string': 'str',
+        'time': 'datetime.time', 'unsignedByte': 'int', 'unsignedInt': 'int', 'unsignedLong': 'int',
+        'unsignedShort': 'int',
+    }
+    WSDL_CHUNK_SIZE = 100
+
+    def __init__(self, service: str, version: str, wsdl: bytes) -> None:
+        """
+        Generate the stub of the service version from its wsdl content.
+        """
+        self.service = service
+        self.version = version
+        self.wsdl = wsdl
+        self.wrapper = ClientWrapper(Client(wsdl=Document(io.BytesIO(wsdl), Transport())))
+        self.class_names = self._class_names()
+
+    def _complex_types(self) -> Dict[str, dict]:
+        return {name: definition for name, definition in self.wrapper.types.items() if definition.get('members')}
+
+    def _class_names(self) -> Dict[str, str]:
+        """
+        A class name per complex type, qualified by namespace prefix only where names clash across namespaces.
+        """
+        names: Dict[str, List[str]] = {}
+        for type_name, definition in self._complex_types().items():
+            names.setdefault(attribute_name(definition['name']), []).append(type_name)
+        class_names = {}
+        for name, type_names in names.items():
+            for type_name in type_names:
+                class_names[type_name] = name if len(type_names) == 1 else '{}_{}'.format(
+                    name, attribute_name(type_name.split(':')[0]))
+        return class_names
+
+    def _annotation(self, type_name: Optional[str], repeated: bool = False) -> str:
+        if type_name is None:
+            return 'Any'
+        annotation = self.class_names.get(type_name) or StubGenerator.PYTHON_TYPES.get(type_name.split(':')[-1], 'Any')
+        return 'List[{}]'.format(annotation) if repeated else annotation
+
+    def _record_class(self, type_name: str, definition: dict) -> List[str]:
+        members = record_members(definition)
+        lines = [
+            '',
+            '',
+            'class {}(Record):'.format(self.class_names[type_name]),
+            '    """',
+            '    {}'.format(type_name),
+            '    """',
+            '    __slots__ = ({})'.format(''.join('{!r}, '.format(attribute) for attribute, _, _, _ in members).rstrip()),
+            '    _type = {!r}'.format(type_name),
+            '    _members = (',
+        ]
+        lines.extend('        {!r},'.format(member) for member in members)
+        lines.append('    )')
+        lines.extend("    {}: Optional['{}']".format(attribute, self._annotation(member_type, repeated))
+                     for attribute, _, member_type, repeated in members)
+        return lines
+
+    def _operation(self, operation_name: str, signature: dict) -> List[str]:
+        inputs = signature['input'] or {}
+        outputs = signature['output'] or {}
+        output_type = next(iter(outputs.values())) if len(outputs) == 1 else None
+        returns = self._annotation(output_type) if outputs else 'None'
+        lines = ['', '    def {}('.format(operation_name), '            self,']
+        lines.extend("            {}: Optional['{}'] = None,".format(attribute_name(name),
+                                                                     self._annotation(input_type))
+                     for name, input_type in inputs.items())
+        lines.append("    ) -> Optional['{}']:".format(returns))
+        arguments = [
+            # an argument whose name isn't an identifier is passed under its wsdl name by unpacking
+            '{0}={0}'.format(name) if attribute_name(name) == name
+            else '**{{{!r}: {}}}'.format(name, attribute_name(name))
+            for name in inputs]
+        lines.append('        return self._call({})'.format(
+            ', '.join([repr(operation_name), repr(output_type)] + arguments)))
+        return lines
+
+    def _literal(self, name: str, value: object) -> List[str]:
+        return ['{} = {}'.format(name, pprint.pformat(value, width=120))]
+
+    def source(self) -> str:
+        """
+        The python source of the stub module.
+        """
+        wsdl = self.wsdl.decode('utf-8')
+        chunk_size = StubGenerator.WSDL_CHUNK_SIZE
+        lines = [
+            '"""',
+            'Stub of the Panopto {} {} service, generated by panopto_api.StubGenerator. Do not edit.'.format(
+                self.service, self.version),
+            '"""',
+            '# pylint: skip-file',
+            '# flake8: noqa',
+            '# Standard Library',
+            'from typing import Any, List, Optional',
+            'import datetime',
+            'import decimal',
+            '',
+            '# Local',
+            'from panopto_api.Record import Record',
+            'from panopto_api.ServiceStub import ServiceStub',
+            '',
+            '',
+            'SERVICE = {!r}'.format(self.service),
+            'VERSION = {!r}'.format(self.version),
+            'WSDL = (',
+        ]
+        lines.extend('    {!r}'.format(wsdl[i:i + chunk_size]) for i in range(0, len(wsdl), chunk_size))
+        lines.append(')')
+        lines.extend(self._literal('NAMESPACES', dict(self.wrapper.namespaces)))
+        lines.extend(self._literal('SERVICES', self.wrapper.services))
+        lines.extend(self._literal('ELEMENTS', self.wrapper.elements))
+        lines.extend(self._literal('TYPES', self.wrapper.types))
+        for type_name, definition in sorted(self._complex_types().items()):
+            lines.extend(self._record_class(type_name, definition))
+        lines.extend(['', '', 'RECORDS = {'])
+        lines.extend('    {!r}: {},'.format(type_name, class_name)
+                     for type_name, class_name in sorted(self.class_names.items()))
+        lines.append('}')
+        stub_class = '{}Stub'.format(attribute_name(self.service))
+        lines.extend([
+            '',
+            '',
+            'class {}(ServiceStub):'.format(stub_class),
+            '    """',
+            '    The typed operations of the {} {} service.'.format(self.service, self.version),
+            '    """',
+            '    RECORDS = RECORDS',
+        ])
+        # a wsdl of a single Panopto service has a single service and port
+        operations = next(iter(next(iter(self.wrapper.services.values())).values()))
+        for operation_name, signature in sorted(operations.items()):
+            lines.extend(self._operation(operation_name, signature))
+        lines.extend(['', '', 'STUB_CLASS = {}'.format(stub_class), ''])
+        return '\n'.join(lines)
+
+    def write(self, output_dir: str) -> str:
+        """
+        Write the stub module into the directory and return its path.
+        """
+        path = os.path.join(output_dir, '{}.py'.format(StubPackage.module_name(self.service, self.version)))
+        with open(path, 'w', encoding='utf-8') as stub_file:
+            stub_file.write(self.source())
+        return path
+
+    @staticmethod
+    def generate_package(host: str, output_dir: str, over_ssl: bool = True, transport: Optional[Transport] = None) \
+            -> List[str]:
+        """
+        Download the wsdl of every service version in AuthenticatedClientFactory.ENDPOINTS from the host
+        and write a stub module for each into output_dir, which is made a package. Return the paths written.
+        """
+        transport = transport or Transport()
+        os.makedirs(output_dir, exist_ok=True)
+        init_path = os.path.join(output_dir, '__init__.py')
+        if not os.path.exists(init_path):
+            with open(init_path, 'w', encoding='utf-8') as init_file:
+                init_file.write('"""\nPanopto service stubs generated by panopto_api.StubGenerator\n"""\n')
+        paths = []
+        for service, version in sorted(AuthenticatedClientFactory.ENDPOINTS.items()):
+            url = 'http{}://{}/{}?singleWsdl'.format(
+                's' if over_ssl else '', host, AuthenticatedClientFactory.get_endpoint(service))
+            paths.append(StubGenerator(service, version, transport.load(url)).write(output_dir))
+        return paths
+
+
+def main() -> None:
+    """
+    Generate stubs from the command line: python -m panopto_api.StubGenerator host output_dir
+    """
+    parser = argparse.ArgumentParser(description='Generate typed Panopto service stubs')
+    parser.add_argument('host', help='the Panopto host to download the service wsdls from')
+    parser.add_argument('output_dir', help='the package directory to write the stubs into')
+    parser.add_argument('--no-ssl', action='store_true', help='download the wsdls over plain http')
+    args = parser.parse_args()
+    for path in StubGenerator.generate_package(args.host, args.output_dir, over_ssl=not args.no_ssl):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
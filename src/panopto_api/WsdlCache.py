@@ -0,0 +1,129 @@
+"""
+This module provides a persistent, versioned on-disk cache of Panopto service WSDLs
+"""
+# Standard Library
+from typing import TYPE_CHECKING, Optional
+import logging
+import os
+import re
+import tempfile
+import time
+
+# Third Party
+if TYPE_CHECKING:
+    from zeep import Transport
+
+
+LOG = logging.getLogger(__name__)
+
+
+class WsdlCache(object):
+    """
+    A cache of WSDL documents on local disk, keyed by host, scheme, service name and service version.
+    The scheme is part of the key because a server writes the address it was reached at into the WSDL,
+    so a WSDL fetched over http would point a client meant for https at http.
+    A cached WSDL is a plain file, so a restarted process can construct clients from it without any network round trip.
+    Entries older than the ttl (in seconds) are considered stale and are downloaded again on next use;
+    a ttl of None means entries never go stale and must be invalidated explicitly.
+    """
+    DEFAULT_TTL = 24 * 60 * 60
+    UNSAFE_PATH_CHARACTERS = re.compile(r'[^A-Za-z0-9._-]')
+    SCHEMES = ('http', 'https')
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: Optional[float] = DEFAULT_TTL) -> None:
+        self.cache_dir = cache_dir or WsdlCache.default_cache_dir()
+        self.ttl = ttl
+
+    @staticmethod
+    def default_cache_dir() -> str:
+        """
+        The platform cache directory for this package, honoring XDG_CACHE_HOME.
+        """
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'panopto_api', 'wsdl')
+
+    def path(self, host: str, service: str, version: str, over_ssl: bool = False) -> str:
+        """
+        The location of the cache entry for the specified host, service and version, fetched over ssl or not,
+        whether or not it exists.
+        """
+        return os.path.join(
+            self.cache_dir,
+            WsdlCache.UNSAFE_PATH_CHARACTERS.sub('_', host),
+            WsdlCache.SCHEMES[over_ssl],
+            '{}-{}.wsdl'.format(WsdlCache.UNSAFE_PATH_CHARACTERS.sub('_', service),
+                                WsdlCache.UNSAFE_PATH_CHARACTERS.sub('_', version)))
+
+    def _is_fresh(self, path: str) -> bool:
+        try:
+            modified = os.path.getmtime(path)
+        except OSError:
+            return False
+        return self.ttl is None or time.time() - modified < self.ttl
+
+    def get(self, host: str, service: str, version: str, over_ssl: bool = False) -> Optional[str]:
+        """
+        Return the path of the cached WSDL for the specified host, service and version, fetched over ssl or not.
+        If there is no entry, or the entry is stale, return None.
+        """
+        path = self.path(host, service, version, over_ssl)
+        return path if self._is_fresh(path) else None
+
+    def store(self, host: str, service: str, version: str, content: bytes, over_ssl: bool = False) -> str:
+        """
+        Write the WSDL content, fetched over ssl or not, into the cache and return the path of the entry.
+        The entry is replaced atomically so concurrent readers never see a partial document.
+        """
+        path = self.path(host, service, version, over_ssl)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return path
+
+    def fetch(self, host: str, service: str, version: str, url: str, transport: Optional['Transport'] = None) -> str:
+        """
+        Return the path of the cached WSDL for the specified host, service and version, fetched over url's scheme,
+        downloading it from url (with the provided transport, if any) when there is no fresh entry.
+        """
+        over_ssl = url.lower().startswith('https:')
+        path = self.get(host, service, version, over_ssl)
+        if path is None:
+            from zeep import Transport  # pylint: disable=import-outside-toplevel
+            LOG.debug('WSDL cache miss for %s %s %s, loading %s', host, service, version, url)
+            path = self.store(host, service, version, (transport or Transport()).load(url), over_ssl)
+        return path
+
+    def invalidate(self, host: Optional[str] = None, service: Optional[str] = None,
+                   version: Optional[str] = None) -> int:
+        """
+        Remove cache entries matching all of the specified host, service and version, over either scheme.
+        Unspecified criteria match everything, so invalidate() clears the whole cache.
+        Return the number of entries removed.
+        """
+        removed = 0
+        if host is None:
+            hosts = os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else []
+        else:
+            hosts = [WsdlCache.UNSAFE_PATH_CHARACTERS.sub('_', host)]
+        scheme_paths = [os.path.join(self.cache_dir, host_dir, scheme) for host_dir in hosts for scheme in WsdlCache.SCHEMES]
+        for scheme_path in scheme_paths:
+            if not os.path.isdir(scheme_path):
+                continue
+            for entry in os.listdir(scheme_path):
+                name, extension = os.path.splitext(entry)
+                if extension != '.wsdl':
+                    continue
+                entry_service, _, entry_version = name.rpartition('-')
+                if service is not None and entry_service != WsdlCache.UNSAFE_PATH_CHARACTERS.sub('_', service):
+                    continue
+                if version is not None and entry_version != WsdlCache.UNSAFE_PATH_CHARACTERS.sub('_', version):
+                    continue
+                os.unlink(os.path.join(scheme_path, entry))
+                removed += 1
+        return removed
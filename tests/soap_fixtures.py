@@ -0,0 +1,162 @@
+"""
+Shared fixtures for exercising the panopto_api wrappers against local WSDLs without a Panopto server.
+"""
+# Standard Library
+import io
+import os
+from typing import Callable, Dict, List, Union
+
+# Third Party
+from requests.adapters import BaseAdapter
+import requests
+from zeep import Transport
+from zeep.transports import AsyncTransport
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DATACONTRACT_NS = 'http://schemas.datacontract.org/2004/07/Panopto.Server.Services.PublicAPI.V40'
+
+
+def wsdl_path(name: str) -> str:
+    """
+    Path to one of the WSDL documents in the test data directory.
+    """
+    return os.path.join(DATA_DIR, '{}.wsdl'.format(name))
+
+
+def read_wsdl(name: str) -> bytes:
+    """
+    Raw content of one of the WSDL documents in the test data directory.
+    """
+    with open(wsdl_path(name), 'rb') as wsdl_file:
+        return wsdl_file.read()
+
+
+def envelope(body: str) -> str:
+    """
+    Wrap a SOAP body fragment in an envelope.
+    """
+    return '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>{}</s:Body></s:Envelope>'.format(body)
+
+
+def make_response(content: Union[str, bytes], status_code: int = 200, headers: Dict[str, str] = None) \
+        -> requests.Response:
+    """
+    Build a requests.Response as if it came off the wire.
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers['Content-Type'] = 'text/xml; charset=utf-8'
+    response.headers.update(headers or {})
+    response._content = content.encode('utf-8') if isinstance(content, str) else content  # pylint: disable=protected-access
+    return response
+
+
+class HandlerAdapter(BaseAdapter):
+    """
+    A requests transport adapter answering every request from a handler, the way a server would over the wire:
+    the handler receives the SOAP action and the request body and returns a requests.Response (or body string).
+    Response bodies are served from a stream, so streamed reads work as they would against a server.
+    """
+    def __init__(self, handler: Callable[[str, bytes], Union[str, requests.Response]]) -> None:
+        super().__init__()
+        self.handler = handler
+        self.posts: List[dict] = []
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+        self.posts.append({'address': request.url, 'message': body, 'headers': dict(request.headers)})
+        response = self.handler(request.headers.get('SOAPAction', '').strip('"').rsplit('/', 1)[-1], body)
+        if not isinstance(response, requests.Response):
+            response = make_response(response)
+        content = response._content  # pylint: disable=protected-access
+        response._content = False  # pylint: disable=protected-access
+        response.raw = io.BytesIO(content)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class FakeTransport(Transport):
+    """
+    A zeep transport whose session answers posts from a handler rather than the network. See HandlerAdapter.
+    """
+    def __init__(self, handler: Callable[[str, bytes], Union[str, requests.Response]], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.adapter = HandlerAdapter(handler)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    @property
+    def handler(self) -> Callable[[str, bytes], Union[str, requests.Response]]:
+        return self.adapter.handler
+
+    @handler.setter
+    def handler(self, handler: Callable[[str, bytes], Union[str, requests.Response]]) -> None:
+        self.adapter.handler = handler
+
+    @property
+    def posts(self) -> List[dict]:
+        return self.adapter.posts
+
+    def load(self, url):
+        if url.startswith(('http://', 'https://')):
+            raise AssertionError('unexpected network load of {}'.format(url))
+        return super().load(url)
+
+
+class FakeAsyncTransport(AsyncTransport):
+    """
+    A zeep async transport answering posts from a handler rather than the network. See FakeTransport.
+    """
+    def __init__(self, handler: Callable[[str, bytes], Union[str, requests.Response]], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.handler = handler
+        self.posts: List[dict] = []
+
+    async def post(self, address, message, headers):
+        message = message.encode('utf-8') if isinstance(message, str) else message
+        self.posts.append({'address': address, 'message': message, 'headers': dict(headers)})
+        response = self.handler(headers.get('SOAPAction', '').strip('"').rsplit('/', 1)[-1], message)
+        if not isinstance(response, requests.Response):
+            response = make_response(response)
+        return httpx.Response(response.status_code, headers=dict(response.headers), content=response.content,
+                              request=httpx.Request('POST', address))
+
+    def load(self, url):
+        if url.startswith(('http://', 'https://')):
+            raise AssertionError('unexpected network load of {}'.format(url))
+        return super().load(url)
+
+
+def list_users_response(user_ids: List[str], total: int) -> str:
+    """
+    A ListUsers response with a page of users having the specified ids.
+    """
+    users = ''.join(
+        '<a:User><a:Email>{0}@example.com</a:Email><a:FirstName>First</a:FirstName><a:LastName>Last</a:LastName>'
+        '<a:UserId>{0}</a:UserId><a:UserKey>user-{0}</a:UserKey></a:User>'.format(user_id) for user_id in user_ids)
+    return envelope(
+        '<ListUsersResponse xmlns="http://tempuri.org/"><ListUsersResult xmlns:a="{}">'
+        '<a:PagedResults>{}</a:PagedResults><a:TotalNumberResults>{}</a:TotalNumberResults>'
+        '</ListUsersResult></ListUsersResponse>'.format(DATACONTRACT_NS, users, total))
+
+
+def sessions_by_id_response(session_ids: List[str]) -> str:
+    """
+    A GetSessionsById response with a session for each of the specified ids.
+    """
+    sessions = ''.join(
+        '<a:Session><a:Duration>60.5</a:Duration><a:Id>{0}</a:Id><a:Name>Session {0}</a:Name>'
+        '<a:StartTime>2024-01-01T00:00:00Z</a:StartTime></a:Session>'.format(session_id) for session_id in session_ids)
+    return envelope(
+        '<GetSessionsByIdResponse xmlns="http://tempuri.org/"><GetSessionsByIdResult xmlns:a="{}">{}'
+        '</GetSessionsByIdResult></GetSessionsByIdResponse>'.format(DATACONTRACT_NS, sessions))
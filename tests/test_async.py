@@ -0,0 +1,218 @@
+from contextlib import contextmanager
+from panopto_api.RateLimiter import RateLimiter
+from panopto_api.SessionStore import SessionStore
+from panopto_api.WsdlCache import WsdlCache
+from soap_fixtures import envelope, list_users_response, make_response, read_wsdl
+import asyncio
+import re
+import tempfile
+import unittest
+
+try:
+    import httpx  # noqa: F401 pylint: disable=unused-import
+    from panopto_api.AsyncAuthenticatedClientFactory import AsyncAuthenticatedClientFactory
+    from soap_fixtures import FakeAsyncTransport
+except ImportError:
+    httpx = None
+
+
+LOG_ON_RESPONSE = envelope(
+    '<LogOnWithPasswordResponse xmlns="http://tempuri.org/">'
+    '<LogOnWithPasswordResult>true</LogOnWithPasswordResult>'
+    '</LogOnWithPasswordResponse>')
+
+
+class MemorySessionStore(SessionStore):
+    """
+    A session store in memory, recording when its lock is held
+    """
+    def __init__(self):
+        super().__init__()
+        self.sessions = {}
+        self.locked = 0
+
+    def load(self, host, username):
+        return self.sessions.get(SessionStore.key(host, username))
+
+    def save(self, host, username, cookie):
+        self.sessions[SessionStore.key(host, username)] = cookie
+
+    def clear(self, host, username):
+        self.sessions.pop(SessionStore.key(host, username), None)
+
+    @contextmanager
+    def lock(self, host, username):
+        self.locked += 1
+        yield
+
+
+@unittest.skipIf(httpx is None, 'async support requires httpx')
+class TestAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the async factory and wrapper
+    """
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = WsdlCache(self.cache_dir.name)
+        self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+        self.cache.store('localhost', 'UserManagement', '4.0', read_wsdl('PublicAPI'))
+        self.logons = 0
+        self.user_ids = ['u{}'.format(i) for i in range(5)]
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def handler(self, action, message):
+        """
+        Answer LogOnWithPassword with a new cookie each time, and ListUsers from user_ids
+        """
+        if action == 'ListUsers':
+            page_number = int(re.search(rb'PageNumber>(\d+)<', message).group(1))
+            page_size = int(re.search(rb'MaxNumberResults>(\d+)<', message).group(1))
+            return make_response(list_users_response(
+                self.user_ids[page_number * page_size:(page_number + 1) * page_size], len(self.user_ids)))
+        self.logons += 1
+        return make_response(LOG_ON_RESPONSE, headers={'Set-Cookie': '.ASPXAUTH={}'.format(self.logons)})
+
+    async def test_concurrent_authentication_logs_on_once(self):
+        """
+        Tests concurrent authentication shares a single log on
+        """
+        # Arrange
+        transport = FakeAsyncTransport(self.handler)
+        auth = AsyncAuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache,
+                                               transport=transport)
+
+        # Act
+        responses = await asyncio.gather(*[auth.authenticate_factory() for _ in range(5)])
+
+        # Assert
+        self.assertEqual(responses, [True] * 5)
+        self.assertEqual(self.logons, 1)
+        self.assertEqual(transport.client.headers['Cookie'], '.ASPXAUTH=1')
+
+    async def test_call_service(self):
+        """
+        Tests awaiting an operation through the async wrapper
+        """
+        # Arrange
+        auth = AsyncAuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache,
+                                               transport=FakeAsyncTransport(self.handler))
+        client = await auth.get_client('Auth', authenticate_now=False)
+
+        # Act
+        response = await client.call_service('LogOnWithPassword', userKey='admin', password='password')
+
+        # Assert
+        self.assertTrue(response)
+
+    async def test_instrumented_call_service(self):
+        """
+        Tests the async wrapper reports the phases of an instrumented call
+        """
+        # Arrange
+        events = []
+        auth = AsyncAuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache,
+                                               transport=FakeAsyncTransport(self.handler), instrument=events.append)
+        client = await auth.get_client('Auth', authenticate_now=False)
+
+        # Act
+        response = await client.call_service('LogOnWithPassword', userKey='admin', password='password')
+
+        # Assert
+        self.assertTrue(response)
+        self.assertEqual([(m.kind, m.operation) for m in events],
+                         [('construct', 'Panopto/PublicAPI/4.2/Auth.svc'), ('call', 'LogOnWithPassword')])
+        self.assertEqual(set(events[-1].phases), {'serialize', 'network', 'parse', 'unpack', 'total'})
+
+    async def test_iter_items_and_call_service_many(self):
+        """
+        Tests paging and batches through the async wrapper are async generators
+        """
+        # Arrange
+        auth = AsyncAuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache,
+                                               transport=FakeAsyncTransport(self.handler))
+        client = await auth.get_client('UserManagement', authenticate_now=False)
+
+        # Act
+        items = [item async for item in client.iter_items('ListUsers', page_size=2, searchQuery='u', parameters={})]
+        results = [result async for result in client.call_service_many(
+            'ListUsers', ({'searchQuery': 'u', 'parameters': {'Pagination': {'MaxNumberResults': 2, 'PageNumber': i}}}
+                          for i in range(3)), max_concurrency=2,
+            ordered=False)]
+        raw = await client.call_service_raw('ListUsers', searchQuery='u',
+                                            parameters={'Pagination': {'MaxNumberResults': 2, 'PageNumber': 0}})
+
+        # Assert
+        self.assertEqual(client.process_response('ListUsers', raw)['TotalNumberResults'], 5)
+        self.assertEqual([item['UserId'] for item in items], self.user_ids)
+        self.assertEqual(sorted(result.index for result in results), [0, 1, 2])
+        self.assertEqual([len(result.result['PagedResults']['User']) for result in sorted(
+            results, key=lambda result: result.index)], [2, 2, 1])
+        with self.assertRaises(TypeError):
+            client.call_service_items('ListUsers', searchQuery='u')
+        with self.assertRaises(TypeError):
+            client.call_service_streamed('ListUsers', searchQuery='u')
+
+    async def test_limiter_bounds_and_retries_calls(self):
+        """
+        Tests the async wrappers of a factory wait on its rate limiter without blocking the loop, and retry as it directs
+        """
+        # Arrange
+        counts = {'in_flight': 0, 'peak': 0}
+        unavailable = ['ListUsers']
+
+        def handler(action, message):
+            if action == 'ListUsers' and unavailable:
+                unavailable.pop()
+                return make_response('', status_code=503)
+            return self.handler(action, message)
+
+        class SlowTransport(FakeAsyncTransport):
+            async def post(self, address, message, headers):
+                counts['in_flight'] += 1
+                counts['peak'] = max(counts['peak'], counts['in_flight'])
+                try:
+                    await asyncio.sleep(0.01)
+                    return await super().post(address, message, headers)
+                finally:
+                    counts['in_flight'] -= 1
+
+        transport = SlowTransport(handler)
+        limiter = RateLimiter(initial_concurrency=2, max_concurrency=2, backoff=0.001)
+        auth = AsyncAuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache,
+                                               transport=transport, limiter=limiter)
+        client = await auth.get_client('UserManagement')
+        batch = [{'searchQuery': 'u', 'parameters': {'Pagination': {'MaxNumberResults': 1, 'PageNumber': page}}}
+                 for page in range(5)]
+
+        # Act
+        results = [result async for result in client.call_service_many('ListUsers', batch, max_concurrency=8)]
+        unavailable.append('ListUsers')
+        raw = await client.call_service_raw('ListUsers', searchQuery='u', parameters=batch[0]['parameters'])
+
+        # Assert
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(raw.status_code, 200)
+        self.assertEqual(counts['peak'], 2)
+        self.assertEqual(sum(b'ListUsers' in post['message'] for post in transport.posts), 8)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.congested_calls, 2)
+
+    async def test_refresh_holds_session_store_lock(self):
+        """
+        Tests concurrent refreshes with a session store log on once, under the store's lock
+        """
+        # Arrange
+        store = MemorySessionStore()
+        auth = AsyncAuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache,
+                                               transport=FakeAsyncTransport(self.handler), session_store=store)
+
+        # Act
+        responses = await asyncio.gather(*[auth.refresh_authentication(None) for _ in range(3)])
+
+        # Assert
+        self.assertEqual(responses, [True] * 3)
+        self.assertEqual(self.logons, 1)
+        self.assertEqual(store.locked, 1)
+        self.assertEqual(store.load('localhost', 'admin'), '.ASPXAUTH=1')
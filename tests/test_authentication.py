@@ -0,0 +1,150 @@
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.WsdlCache import WsdlCache
+from soap_fixtures import FakeTransport, envelope, make_response, read_wsdl, sessions_by_id_response
+from concurrent.futures import ThreadPoolExecutor
+from zeep.exceptions import Fault, TransportError
+import tempfile
+import unittest
+
+
+LOG_ON_RESPONSE = envelope(
+    '<LogOnWithPasswordResponse xmlns="http://tempuri.org/">'
+    '<LogOnWithPasswordResult>true</LogOnWithPasswordResult>'
+    '</LogOnWithPasswordResponse>')
+AUTH_FAULT_RESPONSE = envelope(
+    '<s:Fault><faultcode>s:Client</faultcode><faultstring>Authentication failed</faultstring></s:Fault>')
+PERMISSION_FAULT_RESPONSE = envelope(
+    '<s:Fault><faultcode>s:Client</faultcode><faultstring>Access denied: user is unauthorized to view session'
+    '</faultstring></s:Fault>')
+
+
+class TestAuthentication(unittest.TestCase):
+    """
+    Tests authenticating a factory and its clients
+    """
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = WsdlCache(self.cache_dir.name)
+        self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+        self.logons = 0
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def handler(self, action, message):
+        """
+        Answer LogOnWithPassword with a new cookie each time
+        """
+        self.logons += 1
+        return make_response(LOG_ON_RESPONSE, headers={'Set-Cookie': '.ASPXAUTH={}'.format(self.logons)})
+
+    def test_clients_share_transport_and_cookie(self):
+        """
+        Tests every client of a factory shares its transport, so re-authenticating updates them all
+        """
+        # Arrange
+        transport = FakeTransport(self.handler)
+        auth = AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache, transport=transport)
+        clients = [auth.get_client('Auth') for _ in range(2)]
+
+        # Act
+        auth.authenticate_factory()
+
+        # Assert
+        self.assertTrue(all(c.client.transport is transport for c in clients))
+        self.assertEqual(transport.session.headers['Cookie'], '.ASPXAUTH=2')
+
+    def test_concurrent_refreshes_log_on_once(self):
+        """
+        Tests threads finding the same cookie stale share a single log on, through the cached Auth service
+        """
+        # Arrange
+        transport = FakeTransport(self.handler)
+        auth = AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache, transport=transport)
+        auth.authenticate_factory()
+        stale_cookie = auth.cookie
+        auth_service = auth._get_auth_service()  # pylint: disable=protected-access
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda _: auth.refresh_authentication(stale_cookie), range(8)))
+
+        # Assert
+        self.assertEqual(responses, [True] * 8)
+        self.assertEqual(self.logons, 2)
+        self.assertIs(auth._get_auth_service(), auth_service)  # pylint: disable=protected-access
+        self.assertEqual(auth.cookie, '.ASPXAUTH=2')
+
+    def test_call_retried_after_authentication_fault(self):
+        """
+        Tests a call failing for want of authentication is retried once with a renewed cookie
+        """
+        # Arrange
+        self.cache.store('localhost', 'UsageReporting', '4.0', read_wsdl('PublicAPI'))
+        faults = []
+
+        def handler(action, message):
+            if action == 'LogOnWithPassword':
+                return self.handler(action, message)
+            if not faults:
+                faults.append(action)
+                return make_response(AUTH_FAULT_RESPONSE, status_code=500)
+            return sessions_by_id_response(['s1'])
+
+        transport = FakeTransport(handler)
+        auth = AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache, transport=transport)
+        usage = auth.get_client('UsageReporting')
+
+        # Act
+        response = usage.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+
+        # Assert
+        self.assertEqual(response[0]['Id'], 's1')
+        self.assertEqual(faults, ['GetSessionsById'])
+        self.assertEqual(self.logons, 2)
+        self.assertEqual(transport.posts[-1]['headers']['Cookie'], '.ASPXAUTH=2')
+
+    def test_other_faults_are_not_retried(self):
+        """
+        Tests faults unrelated to authentication are raised without renewing the cookie
+        """
+        # Arrange
+        auth = AuthenticatedClientFactory('localhost', 'admin', 'password', transport=FakeTransport(self.handler))
+
+        # Act
+        is_auth_fault = auth.is_authentication_fault(Fault('Session not found'))
+
+        # Assert
+        self.assertFalse(is_auth_fault)
+        self.assertTrue(auth.is_authentication_fault(Fault('Authentication failed')))
+        self.assertTrue(auth.is_authentication_fault(TransportError(status_code=401)))
+        self.assertTrue(auth.is_authentication_fault(Fault('Not logged on')))
+        self.assertFalse(auth.is_authentication_fault(Fault('Access is denied')))
+        self.assertFalse(auth.is_authentication_fault(Fault('User is unauthorized to edit this folder')))
+        self.assertFalse(auth.is_authentication_fault(TransportError(status_code=403)))
+
+    def test_permission_fault_not_retried(self):
+        """
+        Tests a call the caller isn't permitted to make is raised at once, without logging on again
+        """
+        # Arrange
+        self.cache.store('localhost', 'UsageReporting', '4.0', read_wsdl('PublicAPI'))
+        calls = []
+
+        def handler(action, message):
+            if action == 'LogOnWithPassword':
+                return self.handler(action, message)
+            calls.append(action)
+            return make_response(PERMISSION_FAULT_RESPONSE, status_code=500)
+
+        transport = FakeTransport(handler)
+        auth = AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache, transport=transport)
+        usage = auth.get_client('UsageReporting')
+
+        # Act
+        with self.assertRaises(Fault):
+            usage.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+
+        # Assert
+        self.assertEqual(calls, ['GetSessionsById'])
+        self.assertEqual(self.logons, 1)
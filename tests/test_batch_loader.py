@@ -0,0 +1,98 @@
+from panopto_api.BatchLoader import BatchLoader
+from panopto_api.ClientWrapper import ClientWrapper
+from soap_fixtures import FakeTransport, sessions_by_id_response, wsdl_path
+from zeep import Client
+from concurrent.futures import ThreadPoolExecutor
+import re
+import threading
+import unittest
+
+
+class TestBatchLoader(unittest.TestCase):
+    """
+    Tests the BatchLoader
+    """
+    def setUp(self):
+        self.requested = []
+        self.lock = threading.Lock()
+        self.transport = FakeTransport(self.handler)
+        self.client = ClientWrapper(Client(wsdl_path('PublicAPI'), transport=self.transport))
+
+    def handler(self, action, message):
+        """
+        Answer GetSessionsById with a session for each requested id except 'missing', in reverse order
+        """
+        ids = re.findall(r'<(?:\w+:)?guid[^>]*>([^<]+)<', message.decode('utf-8'))
+        with self.lock:
+            self.requested.append(ids)
+        return sessions_by_id_response([i.upper() for i in reversed(ids) if i != 'missing'])
+
+    def test_loads_coalesce_and_deduplicate(self):
+        """
+        Tests loads from many threads become few calls, with each id requested once and its result fanned out
+        """
+        # Arrange
+        keys = ['s{}'.format(i % 25) for i in range(100)] + ['missing']
+
+        # Act
+        with BatchLoader(self.client, 'GetSessionsById', window=0.2) as loader:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = list(executor.map(loader.load, keys))
+            results = [future.result(timeout=10) for future in futures]
+
+        # Assert
+        self.assertEqual([r['Id'] if r else None for r in results], [k.upper() if k != 'missing' else None for k in keys])
+        self.assertEqual(len(self.requested), 1)
+        self.assertEqual(sorted(self.requested[0]), sorted(set(keys)))
+
+    def test_batches_are_bounded(self):
+        """
+        Tests a full batch is dispatched without waiting out the window
+        """
+        # Arrange
+        keys = ['s{}'.format(i) for i in range(25)]
+
+        # Act
+        with BatchLoader(self.client, 'GetSessionsById', max_batch_size=10, window=60) as loader:
+            futures = loader.load_many(keys)
+            first = futures[0].result(timeout=10)
+            loader.flush()
+            results = [future.result(timeout=10) for future in futures]
+
+        # Assert
+        self.assertEqual(first['Id'], 'S0')
+        self.assertEqual(sorted(len(batch) for batch in self.requested), [5, 10, 10])
+        self.assertEqual([r['Id'] for r in results], [k.upper() for k in keys])
+
+    def test_call_failure_fails_the_batch(self):
+        """
+        Tests every future of a failing call gets its exception
+        """
+        # Arrange
+        self.transport.handler = lambda action, message: 'not xml'
+
+        # Act
+        with BatchLoader(self.client, 'GetSessionsById', window=0.01) as loader:
+            futures = loader.load_many(['a', 'b'])
+
+        # Assert
+        self.assertEqual(len(self.transport.posts), 1)
+        self.assertTrue(all(future.exception(timeout=10) is not None for future in futures))
+
+    def test_cancelled_load_leaves_the_batch(self):
+        """
+        Tests a load cancelled while pending is dropped from its batch, and the other ids still resolve
+        """
+        # Arrange
+        with BatchLoader(self.client, 'GetSessionsById', window=60) as loader:
+            futures = loader.load_many(['a', 'b', 'c'])
+
+            # Act
+            cancelled = futures[1].cancel()
+            loader.flush()
+            results = [futures[0].result(timeout=10), futures[2].result(timeout=10)]
+
+        # Assert
+        self.assertTrue(cancelled)
+        self.assertEqual([r['Id'] for r in results], ['A', 'C'])
+        self.assertEqual(self.requested, [['a', 'c']])
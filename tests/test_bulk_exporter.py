@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from functools import partial
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.BulkExporter import BulkExporter, Shard, ShardRunner
+from panopto_api.WsdlCache import WsdlCache
+from soap_fixtures import FakeTransport, envelope, list_users_response, make_response, read_wsdl
+import csv
+import io
+import os
+import re
+import tempfile
+import unittest
+
+
+USER_IDS = ['u{}'.format(i) for i in range(7)]
+LOG_ON_RESPONSE = envelope(
+    '<LogOnWithPasswordResponse xmlns="http://tempuri.org/">'
+    '<LogOnWithPasswordResult>true</LogOnWithPasswordResult>'
+    '</LogOnWithPasswordResponse>')
+
+
+def answer(failing_pages, action, message):
+    """
+    Answer log ons, and ListUsers from USER_IDS, failing the pages in failing_pages.
+    """
+    if action == 'LogOnWithPassword':
+        return make_response(LOG_ON_RESPONSE, headers={'Set-Cookie': '.ASPXAUTH=1'})
+    page_number = int(re.search(rb'PageNumber>(\d+)<', message).group(1))
+    page_size = int(re.search(rb'MaxNumberResults>(\d+)<', message).group(1))
+    if page_number in failing_pages:
+        return make_response(envelope(
+            '<s:Fault><faultcode>s:Server</faultcode><faultstring>page unavailable</faultstring></s:Fault>'), 500)
+    return make_response(list_users_response(
+        USER_IDS[page_number * page_size:(page_number + 1) * page_size], len(USER_IDS)))
+
+
+def build_factory(cache_dir, failing_pages=()):
+    """
+    A factory answered by answer, with its WSDLs cached in cache_dir; picklable through functools.partial.
+    """
+    cache = WsdlCache(cache_dir)
+    cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+    cache.store('localhost', 'UserManagement', '4.0', read_wsdl('PublicAPI'))
+    return AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=cache,
+                                      transport=FakeTransport(partial(answer, failing_pages)))
+
+
+class TestBulkExporter(unittest.TestCase):
+    """
+    Tests sharded bulk exports
+    """
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.addCleanup(self.output_dir.cleanup)
+
+    def exporter(self, failing_pages=(), **kwargs) -> BulkExporter:
+        return BulkExporter(partial(build_factory, self.cache_dir.name, failing_pages), self.output_dir.name, **kwargs)
+
+    def test_exports_pages_across_processes(self):
+        """
+        Tests every page of a paged operation is exported by the pool, one file per page
+        """
+        # Arrange
+        exporter = self.exporter(processes=2)
+        shards = exporter.page_shards('users', 'UserManagement', 'ListUsers', page_size=3, searchQuery='u',
+                                      parameters={})
+
+        # Act
+        result = exporter.run(shards)
+
+        # Assert
+        self.assertTrue(result.ok)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(sorted(result.completed.values()), [1, 3, 3])
+        self.assertEqual([row['UserId'] for row in exporter.read('users')], USER_IDS)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.output_dir.name, 'users'))),
+                         ['page-000000.jsonl', 'page-000001.jsonl', 'page-000002.jsonl'])
+
+    def test_resumes_from_checkpoint(self):
+        """
+        Tests a failed shard doesn't stop the others, and running again exports only what's missing
+        """
+        # Arrange
+        exporter = self.exporter(failing_pages=(1,), processes=0)
+        shards = exporter.page_shards('users', 'UserManagement', 'ListUsers', page_size=3, searchQuery='u',
+                                      parameters={})
+        failed = exporter.run(shards)
+        resumed = self.exporter(processes=0)
+
+        # Act
+        result = resumed.run(shards)
+
+        # Assert
+        self.assertEqual(list(failed.failed), ['users/page-000001'])
+        self.assertEqual(sorted(failed.completed), ['users/page-000000', 'users/page-000002'])
+        self.assertTrue(result.ok)
+        self.assertEqual(list(result.completed), ['users/page-000001'])
+        self.assertEqual(sorted(result.skipped), ['users/page-000000', 'users/page-000002'])
+        posts = resumed._runner._factory.transport.posts  # pylint: disable=protected-access
+        self.assertEqual(sum(b'ListUsers' in post['message'] for post in posts), 1)
+        self.assertEqual([row['UserId'] for row in resumed.read('users')], USER_IDS)
+
+    def test_exports_csv(self):
+        """
+        Tests a paged shard is exported as CSV, nested members flattened into dotted columns
+        """
+        # Arrange
+        exporter = self.exporter(processes=0, file_format=BulkExporter.CSV)
+        shard = Shard('users', 'all', 'UserManagement', 'ListUsers', {'searchQuery': 'u', 'parameters': {}}, paged=True)
+
+        # Act
+        result = exporter.run([shard])
+
+        # Assert
+        self.assertEqual(result.completed, {'users/all': 7})
+        rows = list(exporter.read('users'))
+        self.assertEqual([row['UserId'] for row in rows], USER_IDS)
+        self.assertEqual(rows[0]['Email'], 'u0@example.com')
+
+    def test_csv_keeps_every_column(self):
+        """
+        Tests CSV columns come from every row, not just the first, with missing values left empty
+        """
+        # Arrange
+        out = io.StringIO()
+        rows = [{'Id': 'a'}, {'Id': 'b', 'Owner': {'Name': 'Ada'}}, {'Id': 'c', 'Tags': ['x', 'y']}]
+
+        # Act
+        count = ShardRunner.write_csv(rows, out)
+
+        # Assert
+        self.assertEqual(count, 3)
+        self.assertEqual(list(csv.reader(io.StringIO(out.getvalue()))), [
+            ['Id', 'Owner.Name', 'Tags'], ['a', '', ''], ['b', 'Ada', ''], ['c', '', '["x","y"]']])
+
+    def test_shard_paths_are_distinct(self):
+        """
+        Tests keys that differ only in characters unsafe in file names get files of their own
+        """
+        # Arrange
+        shards = [Shard('sessions', key, 'SessionManagement', 'GetSessionsList', {}) for key in ('a/b', 'a_b', 'a:b')]
+
+        # Act
+        paths = [BulkExporter.shard_path('out', shard, BulkExporter.JSONL) for shard in shards]
+
+        # Assert
+        self.assertEqual(len(set(paths)), 3)
+        self.assertEqual(paths[1], os.path.join('out', 'sessions', 'a_b.jsonl'))
+
+    def test_plans_date_range_and_value_shards(self):
+        """
+        Tests date ranges are split into intervals, and values are set at nested argument paths
+        """
+        # Act
+        ranges = BulkExporter.date_range_shards('usage', 'UsageReporting', 'GetSessionSummaryUsage',
+                                                datetime(2024, 1, 1), datetime(2024, 1, 3, 12), timedelta(days=1),
+                                                sessionId='s1', granularity='Daily')
+        folders = BulkExporter.value_shards('sessions', 'SessionManagement', 'GetSessionsList',
+                                            ('request', 'FolderId'), ['f1', 'f2'], request={'SortBy': 'Name'})
+
+        # Assert
+        self.assertEqual([shard.kwargs['endRange'] - shard.kwargs['beginRange'] for shard in ranges],
+                         [timedelta(days=1), timedelta(days=1), timedelta(hours=12)])
+        self.assertEqual(ranges[0].key, '20240101T000000-20240102T000000')
+        self.assertEqual(ranges[2].kwargs['sessionId'], 's1')
+        self.assertEqual([shard.kwargs for shard in folders], [
+            {'request': {'SortBy': 'Name', 'FolderId': 'f1'}}, {'request': {'SortBy': 'Name', 'FolderId': 'f2'}}])
@@ -0,0 +1,179 @@
+from panopto_api.ClientWrapper import ClientWrapper, InvalidOperationException
+from soap_fixtures import FakeTransport, envelope, list_users_response, make_response, sessions_by_id_response, wsdl_path
+from zeep import Client
+from zeep.exceptions import Fault
+import pickle
+import re
+import sys
+import unittest
+
+
+class TestClientWrapper(unittest.TestCase):
+    """
+    Tests the ClientWrapper
+    """
+    def setUp(self):
+        self.transport = FakeTransport(self.handler)
+        self.client = Client(wsdl_path('PublicAPI'), transport=self.transport)
+        self.responses = {}
+
+    def handler(self, action, message):
+        """
+        Answer with the canned response for the action
+        """
+        return self.responses[action]
+
+    def test_introspection_is_lazy_and_shared(self):
+        """
+        Tests wrapping a client inspects nothing until asked, and then only once per wsdl
+        """
+        # Arrange
+        first = ClientWrapper(self.client)
+        second = ClientWrapper(Client(self.client.wsdl, transport=self.transport))
+
+        # Act
+        before = dict(ClientWrapper._DEFINITIONS.get(self.client.wsdl, {}))  # pylint: disable=protected-access
+        services = first.services
+
+        # Assert
+        self.assertEqual(before, {})
+        self.assertIs(second.services, services)
+        self.assertEqual(first.bound_operation('GetSessionsById')['input'],
+                         {'auth': 'ns3:AuthenticationInfo', 'sessionIds': 'ns2:ArrayOfguid'})
+
+    def test_call_service_unpacks_like_unpack_response(self):
+        """
+        Tests the compiled unpacker produces the same result as the generic _unpack_response
+        """
+        # Arrange
+        self.responses['ListUsers'] = list_users_response(['u1', 'u2'], total=2)
+        wrapper = ClientWrapper(self.client)
+        raw = wrapper._service['ListUsers'](searchQuery='admin')  # pylint: disable=protected-access
+
+        # Act
+        response = wrapper.call_service('ListUsers', searchQuery='admin')
+
+        # Assert
+        self.assertEqual(response, ClientWrapper._unpack_response(raw))  # pylint: disable=protected-access
+        self.assertEqual([u['UserId'] for u in response['PagedResults']['User']], ['u1', 'u2'])
+
+    def test_record_results(self):
+        """
+        Tests record results hold the same data as dicts in less memory, with attribute and key access
+        """
+        # Arrange
+        self.responses['ListUsers'] = list_users_response(['u{}'.format(i) for i in range(3)], total=3)
+        dicts = ClientWrapper(self.client)
+        records = ClientWrapper(self.client, results=ClientWrapper.RECORD_RESULTS)
+
+        # Act
+        expected = dicts.call_service('ListUsers', searchQuery='admin')
+        response = records.call_service('ListUsers', searchQuery='admin')
+
+        # Assert
+        self.assertEqual(response, expected)
+        self.assertEqual(response.to_dict(), expected)
+        users = response.PagedResults.User
+        self.assertEqual([u.UserId for u in users], ['u0', 'u1', 'u2'])
+        self.assertEqual(users[1]['Email'], 'u1@example.com')
+        self.assertIsInstance(users, list)
+        self.assertFalse(hasattr(users[0], '__dict__'))
+        self.assertLess(sys.getsizeof(users[0]), sys.getsizeof(expected['PagedResults']['User'][0]))
+        self.assertEqual(pickle.loads(pickle.dumps(response)), response)
+        self.assertEqual([u.UserId for u in ClientWrapper.page_items(response)], ['u0', 'u1', 'u2'])
+        with self.assertRaises(ValueError):
+            ClientWrapper(self.client, results='rows')
+
+    def test_iter_items_across_pages(self):
+        """
+        Tests iterating the items of a paged operation fetches every page, in order, with the pagination filled in
+        """
+        # Arrange
+        user_ids = ['u{}'.format(i) for i in range(5)]
+
+        def list_users(action, message):
+            page_number = int(re.search(rb'PageNumber>(\d+)<', message).group(1))
+            page_size = int(re.search(rb'MaxNumberResults>(\d+)<', message).group(1))
+            return list_users_response(user_ids[page_number * page_size:(page_number + 1) * page_size], len(user_ids))
+        self.transport.handler = list_users
+        wrapper = ClientWrapper(self.client)
+
+        # Act
+        users = list(wrapper.iter_items('ListUsers', page_size=2, prefetch=2, searchQuery='u', parameters={}))
+
+        # Assert
+        self.assertEqual([u['UserId'] for u in users], user_ids)
+        self.assertEqual(len(self.transport.posts), 3)
+
+    def test_call_service_items_streams_like_call_service(self):
+        """
+        Tests streaming a response's items yields them one at a time, unpacked as call_service unpacks them
+        """
+        # Arrange
+        self.responses['ListUsers'] = list_users_response(['u{}'.format(i) for i in range(50)], total=50)
+        self.responses['GetSessionsById'] = sessions_by_id_response(['s1', 's2'])
+        wrapper = ClientWrapper(self.client)
+        # feed the parser in small chunks, so items straddle them
+        self.addCleanup(setattr, ClientWrapper, 'STREAM_CHUNK_SIZE', ClientWrapper.STREAM_CHUNK_SIZE)
+        ClientWrapper.STREAM_CHUNK_SIZE = 100
+        users = wrapper.call_service('ListUsers', searchQuery='u')['PagedResults']['User']
+        sessions = wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1', 's2']})
+
+        # Act
+        streamed_users = wrapper.call_service_items('ListUsers', searchQuery='u')
+        first = next(streamed_users)
+
+        # Assert
+        self.assertEqual([first] + list(streamed_users), users)
+        self.assertEqual(list(wrapper.call_service_items('GetSessionsById', sessionIds={'guid': ['s1', 's2']})),
+                         sessions)
+
+    def test_call_service_items_raises_faults(self):
+        """
+        Tests streaming the items of a response raises the fault sent in its place, and needs a list-shaped response
+        """
+        # Arrange
+        self.responses['ListUsers'] = make_response(envelope(
+            '<s:Fault><faultcode>s:Client</faultcode><faultstring>bad query</faultstring></s:Fault>'), 500)
+        wrapper = ClientWrapper(self.client)
+
+        # Act / Assert
+        with self.assertRaisesRegex(Fault, 'bad query'):
+            list(wrapper.call_service_items('ListUsers', searchQuery='u'))
+        with self.assertRaises(InvalidOperationException):
+            next(wrapper.call_service_items('QueueReport', reportType='SessionUsage'))
+
+    def test_iter_pages_rejects_unpaged_operation(self):
+        """
+        Tests iterating the pages of an operation without pagination raises
+        """
+        # Arrange
+        wrapper = ClientWrapper(self.client)
+
+        # Act / Assert
+        with self.assertRaises(InvalidOperationException):
+            next(wrapper.iter_pages('GetSessionsById', sessionIds={'guid': []}))
+
+    def test_call_service_many_reports_errors_per_item(self):
+        """
+        Tests a batch of calls returns results in order and reports failures without aborting
+        """
+        # Arrange
+        def get_sessions_by_id(action, message):
+            session_id = re.search(rb'guid[^>]*>([^<]+)<', message).group(1).decode()
+            if session_id == 'bad':
+                return make_response(envelope(
+                    '<s:Fault><faultcode>s:Client</faultcode><faultstring>bad id</faultstring></s:Fault>'), 500)
+            return sessions_by_id_response([session_id])
+        self.transport.handler = get_sessions_by_id
+        wrapper = ClientWrapper(self.client)
+        batch = ({'sessionIds': {'guid': [session_id]}} for session_id in ('s1', 'bad', 's3'))
+
+        # Act
+        results = list(wrapper.call_service_many('GetSessionsById', batch, max_concurrency=2))
+
+        # Assert
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertEqual(results[2].result[0]['Id'], 's3')
+        self.assertIn('bad id', str(results[1].error))
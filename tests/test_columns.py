@@ -0,0 +1,139 @@
+from array import array
+from panopto_api.ClientWrapper import ClientWrapper, InvalidOperationException
+from panopto_api.Columns import Columns
+from panopto_api.ReportReader import ReportReader
+from soap_fixtures import DATACONTRACT_NS, FakeTransport, envelope, list_users_response, make_response, wsdl_path
+from test_report_reader import zipped_report
+from zeep import Client
+import math
+import re
+import unittest
+
+
+def summary_usage_response(views) -> str:
+    """
+    A GetSessionSummaryUsage response with a day per count of views, None leaving the count out.
+    """
+    items = ''.join(
+        '<a:SummaryUsageResponseItem><a:MinutesViewed>{}</a:MinutesViewed>'
+        '<a:Time>2024-01-{:02d}T00:00:00Z</a:Time><a:UniqueUsers>{}</a:UniqueUsers>{}'
+        '</a:SummaryUsageResponseItem>'.format(
+            i * 1.5, i + 1, i, '' if count is None else '<a:Views>{}</a:Views>'.format(count))
+        for i, count in enumerate(views))
+    return envelope(
+        '<GetSessionSummaryUsageResponse xmlns="http://tempuri.org/"><GetSessionSummaryUsageResult xmlns:a="{}">{}'
+        '</GetSessionSummaryUsageResult></GetSessionSummaryUsageResponse>'.format(DATACONTRACT_NS, items))
+
+
+class TestColumns(unittest.TestCase):
+    """
+    Tests columnar results
+    """
+    def setUp(self):
+        self.transport = FakeTransport(lambda action, message: self.response)
+        self.wrapper = ClientWrapper(Client(wsdl_path('PublicAPI'), transport=self.transport))
+        self.response = None
+
+    def test_call_service_columns(self):
+        """
+        Tests a list-shaped response is laid out as typed columns matching call_service's rows
+        """
+        # Arrange
+        self.response = summary_usage_response([3, 5, 8])
+        rows = self.wrapper.call_service('GetSessionSummaryUsage', sessionId='s1')
+
+        # Act
+        columns = self.wrapper.call_service_columns('GetSessionSummaryUsage', sessionId='s1')
+
+        # Assert
+        self.assertEqual(columns.row_count, 3)
+        self.assertEqual(list(columns), ['MinutesViewed', 'Time', 'UniqueUsers', 'Views'])
+        self.assertEqual(columns['Views'], array('q', [row['Views'] for row in rows]))
+        self.assertEqual(columns['MinutesViewed'], array('d', [row['MinutesViewed'] for row in rows]))
+        self.assertEqual(list(columns['Time']), [row['Time'].timestamp() for row in rows])
+        self.assertEqual(columns.datetime_columns, {'Time'})
+
+    def test_missing_values_widen_to_float(self):
+        """
+        Tests an integer column with missing values becomes a float column with NaN for them
+        """
+        # Arrange
+        self.response = summary_usage_response([3, None])
+
+        # Act
+        columns = self.wrapper.call_service_columns('GetSessionSummaryUsage', sessionId='s1')
+
+        # Assert
+        views = columns['Views']
+        self.assertEqual(views.typecode, 'd')
+        self.assertEqual(views[0], 3.0)
+        self.assertTrue(math.isnan(views[1]))
+
+    def test_rejects_scalar_response(self):
+        """
+        Tests a response that isn't list-shaped can't be laid out as columns
+        """
+        # Arrange
+        self.response = envelope(
+            '<QueueReportResponse xmlns="http://tempuri.org/"><QueueReportResult>'
+            '00000000-0000-0000-0000-000000000000</QueueReportResult></QueueReportResponse>')
+
+        # Act / Assert
+        with self.assertRaises(InvalidOperationException):
+            self.wrapper.call_service_columns('QueueReport', reportType='SessionUsage')
+
+    def test_pages_concatenate(self):
+        """
+        Tests the pages of a paged operation concatenate into one set of columns
+        """
+        # Arrange
+        user_ids = ['u{}'.format(i) for i in range(5)]
+
+        def list_users(action, message):
+            page_number = int(re.search(rb'PageNumber>(\d+)<', message).group(1))
+            page_size = int(re.search(rb'MaxNumberResults>(\d+)<', message).group(1))
+            return make_response(list_users_response(
+                user_ids[page_number * page_size:(page_number + 1) * page_size], len(user_ids)))
+        self.transport.handler = list_users
+
+        # Act
+        pages = list(self.wrapper.iter_column_pages('ListUsers', page_size=2, searchQuery='u', parameters={}))
+        columns = Columns.concat(pages)
+
+        # Assert
+        self.assertEqual([page.row_count for page in pages], [2, 2, 1])
+        self.assertEqual(columns['UserId'], user_ids)
+        self.assertEqual(columns.total, 5)
+
+    def test_concat_widens_mixed_columns(self):
+        """
+        Tests concatenating an integer column with a float column widens it, and missing columns are filled
+        """
+        # Arrange
+        first = Columns({'a': array('q', [1, 2]), 'b': ['x', 'y']})
+        second = Columns({'a': array('d', [2.5])})
+
+        # Act
+        columns = Columns.concat([first, second])
+
+        # Assert
+        self.assertEqual(columns['a'], array('d', [1.0, 2.0, 2.5]))
+        self.assertEqual(columns['b'], ['x', 'y', None])
+        self.assertEqual(first['a'], array('q', [1, 2]))
+
+    def test_report_columns(self):
+        """
+        Tests a report is read into typed columns in chunks
+        """
+        # Arrange
+        self.response = make_response(zipped_report(), headers={'Content-Type': 'application/octet-stream'})
+
+        # Act
+        with ReportReader.download(self.wrapper, 'report-id') as report:
+            columns = report.columns(chunk_size=1)
+
+        # Assert
+        self.assertEqual(columns['Session Name'], ['Intro, part 1', 'Wrap up'])
+        self.assertEqual(columns['Views'], array('q', [12, 3]))
+        self.assertEqual(columns['Average Rating'][0], 4.5)
+        self.assertTrue(math.isnan(columns['Average Rating'][1]))
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.DeltaSync import DeltaSync
+from soap_fixtures import DATACONTRACT_NS, FakeTransport, envelope, wsdl_path
+from zeep import Client
+import os
+import re
+import tempfile
+import unittest
+
+
+DAY = timedelta(days=1)
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class TestDeltaSync(unittest.TestCase):
+    """
+    Tests incremental syncs of date-ranged operations
+    """
+    def setUp(self):
+        self.views = {}
+        self.requested = []
+        self.transport = FakeTransport(self.summary_usage)
+        self.wrapper = ClientWrapper(Client(wsdl_path('PublicAPI'), transport=self.transport))
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.sync = DeltaSync(os.path.join(state_dir.name, 'state.sqlite'), lookback=DAY)
+        self.addCleanup(self.sync.close)
+
+    def summary_usage(self, action, message):
+        """
+        Answer GetSessionSummaryUsage with the views of the days in the requested range
+        """
+        begin, end = (datetime.fromisoformat(value.decode('ascii')) for value in
+                      re.search(rb'beginRange>([^<]+)<.*endRange>([^<]+)<', message, re.DOTALL).groups())
+        self.requested.append((begin, end))
+        items = ''.join(
+            '<a:SummaryUsageResponseItem><a:MinutesViewed>0</a:MinutesViewed><a:Time>{}</a:Time>'
+            '<a:UniqueUsers>1</a:UniqueUsers><a:Views>{}</a:Views></a:SummaryUsageResponseItem>'.format(
+                day.isoformat(), views)
+            for day, views in sorted(self.views.items()) if begin <= day < end)
+        return envelope(
+            '<GetSessionSummaryUsageResponse xmlns="http://tempuri.org/"><GetSessionSummaryUsageResult xmlns:a="{}">{}'
+            '</GetSessionSummaryUsageResult></GetSessionSummaryUsageResponse>'.format(DATACONTRACT_NS, items))
+
+    def changes(self, **kwargs):
+        return [(delta.kind, delta.record['Views']) for delta in self.sync.changes(
+            self.wrapper, 'usage:s1', 'GetSessionSummaryUsage', key='Time', sessionId='s1', granularity='Daily',
+            **kwargs)]
+
+    def test_emits_only_new_and_changed_records(self):
+        """
+        Tests a sync after the first fetches from the watermark, less lookback, and emits only what changed
+        """
+        # Arrange
+        self.views = {START: 3, START + DAY: 5}
+        first = self.changes(start=START, end=START + 2 * DAY)
+        self.views.update({START + DAY: 6, START + 2 * DAY: 1})
+
+        # Act
+        second = self.changes(end=START + 3 * DAY)
+        third = self.changes(end=START + 3 * DAY)
+
+        # Assert
+        self.assertEqual(first, [(DeltaSync.ADDED, 3), (DeltaSync.ADDED, 5)])
+        self.assertEqual(second, [(DeltaSync.CHANGED, 6), (DeltaSync.ADDED, 1)])
+        self.assertEqual(third, [])
+        self.assertEqual(self.requested[1], (START + DAY, START + 3 * DAY))
+        self.assertEqual(self.sync.watermark('usage:s1'), START + 3 * DAY)
+
+    def test_unfinished_sync_saves_nothing(self):
+        """
+        Tests deltas a consumer didn't get through are emitted again by the next sync
+        """
+        # Arrange
+        self.views = {START: 3, START + DAY: 5}
+        deltas = self.sync.changes(self.wrapper, 'usage:s1', 'GetSessionSummaryUsage', key='Time', start=START,
+                                   end=START + 2 * DAY, sessionId='s1')
+
+        # Act
+        next(deltas)
+        deltas.close()
+
+        # Assert
+        self.assertIsNone(self.sync.watermark('usage:s1'))
+        self.assertEqual(self.changes(start=START, end=START + 2 * DAY), [(DeltaSync.ADDED, 3), (DeltaSync.ADDED, 5)])
+
+    def test_first_sync_needs_start(self):
+        """
+        Tests a stream never synced must be given a start, and a forgotten stream starts over
+        """
+        # Arrange
+        self.views = {START: 3}
+        self.changes(start=START, end=START + DAY)
+
+        # Act
+        self.sync.forget('usage:s1')
+
+        # Assert
+        with self.assertRaises(ValueError):
+            self.changes(end=START + DAY)
+        self.assertEqual(self.changes(start=START, end=START + DAY), [(DeltaSync.ADDED, 3)])
@@ -0,0 +1,109 @@
+from datetime import datetime
+from lxml import etree
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.EnvelopeTemplate import EnvelopeTemplate, UnsupportedValueException
+from soap_fixtures import FakeTransport, sessions_by_id_response, wsdl_path
+from uuid import UUID
+from zeep import Client
+from zeep.xsd import Element
+from zeep.xsd.types.builtins import Base64Binary, HexBinary
+import unittest
+
+
+def shape(element) -> tuple:
+    """
+    An element's names, text and children, whatever prefixes and namespace declarations it's written with.
+    """
+    return etree.QName(element).text, (element.text or '').strip(), [shape(child) for child in element]
+
+
+class TestEnvelopeTemplate(unittest.TestCase):
+    """
+    Tests precompiled request envelopes
+    """
+    def setUp(self):
+        self.transport = FakeTransport(lambda action, message: sessions_by_id_response(['s1']))
+        self.client = Client(wsdl_path('PublicAPI'), transport=self.transport)
+        self.compiled = ClientWrapper(self.client, compiled=True)
+        self.wrapper = ClientWrapper(self.client)
+
+    def test_envelopes_match_zeep(self):
+        """
+        Tests compiled envelopes carry the same elements, values and http headers as zeep's
+        """
+        # Arrange
+        calls = [
+            ('GetSessionsById', {'sessionIds': {'guid': ['s1', 's2']}}),
+            ('GetSessionSummaryUsage', {'sessionId': UUID(int=5), 'beginRange': datetime(2024, 1, 1),
+                                        'endRange': '2024-02-01T00:00:00Z', 'granularity': 'Daily'}),
+            ('ListUsers', {'parameters': {'Pagination': {'PageNumber': 2, 'MaxNumberResults': None},
+                                          'SortIncreasing': False}, 'searchQuery': 'a < b & c'}),
+            ('DescribeReportTypes', {}),
+        ]
+
+        for operation_name, kwargs in calls:
+            # Act
+            request = self.compiled._request(operation_name, kwargs)  # pylint: disable=protected-access
+            expected = self.wrapper._request(operation_name, kwargs)  # pylint: disable=protected-access
+
+            # Assert
+            self.assertIsNotNone(self.compiled._template(operation_name))  # pylint: disable=protected-access
+            self.assertEqual(shape(etree.fromstring(request[1])), shape(etree.fromstring(expected[1])))
+            self.assertEqual((request[0], request[2]), (expected[0], expected[2]))
+
+    def test_calls_post_compiled_envelopes(self):
+        """
+        Tests call_service posts the compiled envelope and unpacks the response as usual
+        """
+        # Arrange
+        message, _ = self.compiled._template('GetSessionsById').render(  # pylint: disable=protected-access
+            self.client, {'sessionIds': {'guid': ['s1']}})
+
+        # Act
+        sessions = self.compiled.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+
+        # Assert
+        self.assertEqual(sessions[0]['Id'], 's1')
+        self.assertEqual(self.transport.posts[0]['message'], message)
+
+    def test_falls_back_to_zeep(self):
+        """
+        Tests arguments the template doesn't fit are serialized, or rejected, by zeep
+        """
+        # Arrange
+        compiled = ClientWrapper(self.client, compiled=['GetSessionsById'])
+        array_of_guid = self.client.get_type('{http://schemas.microsoft.com/2003/10/Serialization/Arrays}ArrayOfguid')
+
+        # Act
+        sessions = compiled.call_service('GetSessionsById', sessionIds=array_of_guid(guid=['s1']))
+        kwargs = {'sessionIds': {'guid': ['s1']}}
+        message = compiled._request('GetSessionsById', kwargs)[1]  # pylint: disable=protected-access
+
+        # Assert
+        self.assertEqual(sessions[0]['Id'], 's1')
+        self.assertEqual(self.transport.posts[0]['message'],
+                         self.wrapper._request('GetSessionsById', kwargs)[1])  # pylint: disable=protected-access
+        self.assertNotEqual(message, self.transport.posts[0]['message'])
+        self.assertIsNone(compiled._template('ListUsers'))  # pylint: disable=protected-access
+        with self.assertRaises(TypeError):
+            compiled.call_service('GetSessionsById', sessionIds={'guid': ['s1']}, folderId='f1')
+
+    def test_binary_values(self):
+        """
+        Tests binary values, which zeep renders as bytes, are written as text, or left to zeep if they aren't ascii
+        """
+        # Arrange
+        prefixes = {}
+        writer = EnvelopeTemplate._writer  # pylint: disable=protected-access
+        base64 = writer(Element('{urn:test}data', Base64Binary()), prefixes, set())
+        hexadecimal = writer(Element('{urn:test}hex', HexBinary()), prefixes, set())
+        out = []
+
+        # Act
+        base64(b'a<b', out)
+        hexadecimal(b'0aff', out)
+
+        # Assert
+        self.assertEqual(''.join(out), '<c0:data>YTxi</c0:data><c0:hex>0aff</c0:hex>')
+        with self.assertRaises(UnsupportedValueException):
+            hexadecimal(b'\xff', [])
@@ -0,0 +1,74 @@
+import os
+import panopto_api
+import subprocess
+import sys
+import unittest
+
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(panopto_api.__file__)))
+HEAVY_MODULES = ('zeep', 'lxml', 'requests', 'isodate', 'pytz', 'httpx', 'numpy')
+LIGHT_MODULES = [
+    'panopto_api',
+    'panopto_api.AsyncAuthenticatedClientFactory',
+    'panopto_api.AuthenticatedClientFactory',
+    'panopto_api.BatchLoader',
+    'panopto_api.BulkExporter',
+    'panopto_api.ClientWrapper',
+    'panopto_api.Columns',
+    'panopto_api.DeltaSync',
+    'panopto_api.EnvelopeTemplate',
+    'panopto_api.Instrumentation',
+    'panopto_api.RateLimiter',
+    'panopto_api.ReportReader',
+    'panopto_api.ReportScheduler',
+    'panopto_api.ResponseCache',
+    'panopto_api.ServiceRegistry',
+    'panopto_api.ServiceStub',
+    'panopto_api.SessionStore',
+    'panopto_api.WsdlCache',
+]
+
+
+def run_fresh(statement: str) -> str:
+    """
+    Run the statement in a fresh interpreter with panopto_api on its path, returning what it prints.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable, '-c', statement], env=env, check=True, capture_output=True,
+                          text=True).stdout
+
+
+class TestImportTime(unittest.TestCase):
+    """
+    Guards the cold start of panopto_api: heavy dependencies load on first client construction, not on import
+    """
+    def test_import_loads_no_heavy_dependencies(self):
+        """
+        Tests importing the package and its modules loads none of zeep, lxml, requests or their dependencies
+        """
+        # Arrange
+        statement = 'import sys\n{}\nprint(" ".join(sorted(set(m.split(".")[0] for m in sys.modules))))'.format(
+            '\n'.join('import {}'.format(module) for module in LIGHT_MODULES))
+
+        # Act
+        loaded = set(run_fresh(statement).split())
+
+        # Assert
+        self.assertEqual(sorted(loaded.intersection(HEAVY_MODULES)), [])
+
+    def test_endpoints_without_zeep(self):
+        """
+        Tests endpoints can be looked up, and a factory made, without loading zeep
+        """
+        # Arrange
+        statement = (
+            'import sys\n'
+            'from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory\n'
+            'factory = AuthenticatedClientFactory("localhost", "admin", "password")\n'
+            'print(AuthenticatedClientFactory.get_endpoint("UserManagement"), "zeep" in sys.modules)')
+
+        # Act
+        output = run_fresh(statement)
+
+        # Assert
+        self.assertEqual(output.split(), ['Panopto/PublicAPI/4.0/UserManagement.svc', 'False'])
@@ -0,0 +1,117 @@
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.Instrumentation import Histogram, MetricsRegistry
+from panopto_api.ResponseCache import ResponseCache
+from panopto_api.WsdlCache import WsdlCache
+from soap_fixtures import FakeTransport, envelope, make_response, read_wsdl, sessions_by_id_response, wsdl_path
+from zeep import Client
+import tempfile
+import unittest
+
+
+LOG_ON_RESPONSE = envelope(
+    '<LogOnWithPasswordResponse xmlns="http://tempuri.org/">'
+    '<LogOnWithPasswordResult>true</LogOnWithPasswordResult>'
+    '</LogOnWithPasswordResponse>')
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Tests instrumenting calls, log ons and client construction
+    """
+    def setUp(self):
+        self.events = []
+        self.registry = MetricsRegistry(forward=self.events.append)
+        self.transport = FakeTransport(self.handler)
+
+    def handler(self, action, message):
+        if action == 'LogOnWithPassword':
+            return make_response(LOG_ON_RESPONSE, headers={'Set-Cookie': '.ASPXAUTH=1'})
+        return sessions_by_id_response(['s1', 's2'])
+
+    def test_call_service_phases(self):
+        """
+        Tests a call reports each phase, its payload sizes and cache hits
+        """
+        # Arrange
+        wrapper = ClientWrapper(Client(wsdl_path('PublicAPI'), transport=self.transport),
+                                cache=ResponseCache({'GetSessionsById': 60}), instrument=self.registry)
+
+        # Act
+        first = wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1', 's2']})
+        second = wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1', 's2']})
+        raw = wrapper.call_service_raw('GetSessionsById', sessionIds={'guid': ['s1']})
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertEqual(raw.status_code, 200)
+        miss, hit, raw_metrics = self.events
+        self.assertEqual(set(miss.phases), {'serialize', 'network', 'parse', 'unpack', 'total'})
+        self.assertEqual(len(self.transport.posts[0]['message']), miss.request_bytes)
+        self.assertGreater(miss.response_bytes, 0)
+        self.assertFalse(miss.cache_hit)
+        self.assertEqual((set(hit.phases), hit.cache_hit), ({'total'}, True))
+        self.assertEqual((raw_metrics.kind, set(raw_metrics.phases)), ('raw', {'serialize', 'network', 'total'}))
+        summary = self.registry.summary('call')['call:GetSessionsById']
+        self.assertEqual((summary['count'], summary['cache_hits'], summary['errors']), (2, 1, 0))
+        self.assertEqual(summary['network']['count'], 1)
+        self.assertEqual({name for name, _ in self.registry.hot_operations()},
+                         {'call:GetSessionsById', 'raw:GetSessionsById'})
+
+    def test_errors_are_counted(self):
+        """
+        Tests a failing call is reported with its error, and a failing instrument doesn't break the call
+        """
+        # Arrange
+        self.transport.handler = lambda action, message: make_response('oops', status_code=500)
+        wrapper = ClientWrapper(Client(wsdl_path('PublicAPI'), transport=self.transport), instrument=self.registry)
+
+        # Act
+        with self.assertRaises(Exception):
+            wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+        wrapper.instrument = lambda metrics: 1 / 0
+        self.transport.handler = self.handler
+        response = wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+
+        # Assert
+        self.assertEqual(len(response), 2)
+        self.assertIsNotNone(self.events[0].error)
+        self.assertEqual(self.registry.summary()['call:GetSessionsById']['errors'], 1)
+
+    def test_factory_measures_construction_and_log_on(self):
+        """
+        Tests the factory reports client construction and log ons, and instruments its wrappers
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # Arrange
+            cache = WsdlCache(cache_dir)
+            cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+            auth = AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=cache,
+                                              transport=self.transport, instrument=self.registry)
+
+            # Act
+            client = auth.get_client('Auth')
+
+        # Assert
+        self.assertIs(client.instrument, self.registry)
+        self.assertEqual([(m.kind, m.operation) for m in self.events], [
+            ('construct', 'Panopto/PublicAPI/4.2/Auth.svc'),
+            ('construct', 'Panopto/PublicAPI/4.2/Auth.svc'),
+            ('authenticate', 'LogOnWithPassword')])
+
+    def test_histogram_percentiles(self):
+        """
+        Tests histogram percentiles are within a bucket of the true value
+        """
+        # Arrange
+        histogram = Histogram()
+
+        # Act
+        for value in range(1, 1001):
+            histogram.add(value / 1000.0)
+
+        # Assert
+        summary = histogram.summary()
+        self.assertEqual((summary['count'], summary['min'], summary['max']), (1000, 0.001, 1.0))
+        self.assertAlmostEqual(summary['p50'], 0.5, delta=0.5 * (Histogram.GROWTH - 1))
+        self.assertAlmostEqual(summary['p99'], 0.99, delta=0.99 * (Histogram.GROWTH - 1))
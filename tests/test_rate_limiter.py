@@ -0,0 +1,257 @@
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.RateLimiter import RateLimiter
+from soap_fixtures import FakeTransport, envelope, make_response, sessions_by_id_response, wsdl_path
+from zeep import Client
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+from zeep.exceptions import Fault, TransportError
+import requests
+import threading
+import time
+import unittest
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Tests adaptive rate and concurrency limiting
+    """
+    def setUp(self):
+        self.transport = FakeTransport(lambda action, message: sessions_by_id_response(['s1']))
+        self.client = Client(wsdl_path('PublicAPI'), transport=self.transport)
+
+    def test_token_bucket_paces_calls(self):
+        """
+        Tests calls beyond the burst are spaced out to the rate
+        """
+        # Arrange
+        limiter = RateLimiter(rate=100, burst=2)
+
+        # Act
+        start = time.perf_counter()
+        for _ in range(7):
+            with limiter.limit_call('GetSessionsById'):
+                pass
+        elapsed = time.perf_counter() - start
+
+        # Assert
+        self.assertGreaterEqual(elapsed, 0.045)
+
+    def test_concurrency_adapts_additively_up_and_multiplicatively_down(self):
+        """
+        Tests healthy calls grow the concurrency limit, and congestion halves it once per burst
+        """
+        # Arrange
+        limiter = RateLimiter(initial_concurrency=4, max_concurrency=8)
+        started = time.monotonic()
+
+        # Act
+        for _ in range(8):
+            limiter.release('GetSessionsById', started, 0.01)
+        grown = limiter.limit
+        limiter.release('GetSessionsById', started, 0.01, transient_failure=True)
+        # a call started before the decrease can't decrease the limit again
+        limiter.release('GetSessionsById', started, 0.01, transient_failure=True)
+        after_burst = limiter.limit
+        limiter.release('GetSessionsById', time.monotonic(), 0.5)
+
+        # Assert
+        self.assertAlmostEqual(grown, 5.6, delta=0.2)
+        self.assertEqual(after_burst, grown / 2)
+        self.assertEqual(limiter.limit, grown / 4)
+        self.assertEqual(limiter.congested_calls, 3)
+
+    def test_failed_calls_do_not_set_the_latency_baseline(self):
+        """
+        Tests calls that fail fast, transiently or with a fault, don't make later healthy calls look slow
+        """
+        # Arrange
+        limiter = RateLimiter(initial_concurrency=4)
+        started = time.monotonic()
+        limiter.release('GetSessionsById', started, 0.1)
+
+        # Act
+        limiter.release('GetSessionsById', started, 0.001, transient_failure=True, succeeded=False)
+        with self.assertRaises(Fault):
+            with limiter.limit_call('GetSessionsById'):
+                raise Fault('bad id')
+        congested = limiter.congested_calls
+        limiter.release('GetSessionsById', time.monotonic(), 0.2)
+
+        # Assert
+        self.assertEqual(congested, 1)
+        self.assertEqual(limiter.congested_calls, 1)
+
+    def test_retries_transient_failures(self):
+        """
+        Tests a wrapper retries calls that fail transiently, but not faults
+        """
+        # Arrange
+        responses = [make_response('', status_code=503), make_response('', status_code=503),
+                     sessions_by_id_response(['s1']), make_response(envelope(
+                         '<s:Fault><faultcode>s:Client</faultcode><faultstring>bad id</faultstring></s:Fault>'), 500)]
+        self.transport.handler = lambda action, message: responses.pop(0)
+        limiter = RateLimiter(initial_concurrency=4, backoff=0.001)
+        wrapper = ClientWrapper(self.client, limiter=limiter)
+
+        # Act
+        sessions = wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+
+        # Assert
+        self.assertEqual(sessions[0]['Id'], 's1')
+        self.assertEqual(len(self.transport.posts), 3)
+        self.assertLess(limiter.limit, 4)
+        with self.assertRaises(Fault):
+            wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+        self.assertEqual(len(self.transport.posts), 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_gives_up_after_max_retries(self):
+        """
+        Tests a call failing transiently every time raises after max_retries retries
+        """
+        # Arrange
+        self.transport.handler = lambda action, message: make_response('', status_code=503)
+        wrapper = ClientWrapper(self.client, limiter=RateLimiter(max_retries=2, backoff=0.001))
+
+        # Act / Assert
+        with self.assertRaises(TransportError):
+            wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+        self.assertEqual(len(self.transport.posts), 3)
+
+    def test_retries_only_unhandled_failures_of_other_operations(self):
+        """
+        Tests operations that may not be repeated are retried only after failures the host can't have acted on
+        """
+        # Arrange
+        queued = envelope('<QueueReportResponse xmlns="http://tempuri.org/"><QueueReportResult>'
+                          '00000000-0000-0000-0000-00000000000a</QueueReportResult></QueueReportResponse>')
+        refused = requests.exceptions.ConnectionError(
+            MaxRetryError(None, 'http://localhost/', NewConnectionError(None, 'connection refused')))
+        dropped = requests.exceptions.ConnectionError(ProtocolError('connection aborted'))
+
+        def answer(*responses):
+            responses = list(responses)
+
+            def handler(action, message):
+                response = responses.pop(0)
+                if isinstance(response, Exception):
+                    raise response
+                return response
+            return handler
+
+        limiter = RateLimiter(backoff=0.001)
+        arguments = {'reportType': 'SessionUsage', 'startTime': '2024-01-01T00:00:00', 'endTime': '2024-02-01T00:00:00'}
+        wrapper = ClientWrapper(self.client, limiter=limiter)
+        idempotent = ClientWrapper(self.client, limiter=RateLimiter(backoff=0.001, idempotent_operations=['QueueReport']))
+
+        # Act
+        self.transport.handler = answer(refused, make_response('', status_code=503), make_response('', 429), queued)
+        retried = wrapper.call_service('QueueReport', **arguments)
+        self.transport.handler = answer(make_response('', status_code=502), queued)
+        with self.assertRaises(TransportError):
+            wrapper.call_service('QueueReport', **arguments)
+        self.transport.handler = answer(dropped, queued)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            wrapper.call_service('QueueReport', **arguments)
+        self.transport.handler = answer(make_response('', status_code=504), queued)
+        marked = idempotent.call_service('QueueReport', **arguments)
+
+        # Assert
+        self.assertEqual(retried, '00000000-0000-0000-0000-00000000000a')
+        self.assertEqual(marked, retried)
+        self.assertTrue(limiter.is_idempotent('GetSessionsById'))
+        self.assertFalse(limiter.is_idempotent('QueueReport'))
+        self.assertTrue(RateLimiter.is_transient(dropped))
+
+    def test_limits_raw_and_streamed_calls(self):
+        """
+        Tests raw, streamed and item by item calls also go through the limiter, and are retried as it directs
+        """
+        # Arrange
+        failures = []
+
+        def refuse_first(action, message):
+            if not failures:
+                failures.append(action)
+                raise requests.exceptions.ConnectionError(
+                    MaxRetryError(None, 'http://localhost/', NewConnectionError(None, 'connection refused')))
+            return sessions_by_id_response(['s1'])
+
+        self.transport.handler = refuse_first
+        limiter = RateLimiter(backoff=0.001)
+        wrapper = ClientWrapper(self.client, limiter=limiter)
+        calls = [
+            lambda: wrapper.call_service_raw('GetSessionsById', sessionIds={'guid': ['s1']}).status_code,
+            lambda: wrapper.call_service_streamed('GetSessionsById', sessionIds={'guid': ['s1']}).status_code,
+            lambda: [session['Id'] for session in wrapper.call_service_items('GetSessionsById',
+                                                                             sessionIds={'guid': ['s1']})],
+        ]
+        results = []
+
+        for call in calls:
+            # Act
+            failures.clear()
+            results.append(call())
+
+        # Assert
+        self.assertEqual(results, [200, 200, ['s1']])
+        self.assertEqual(len(self.transport.posts), 6)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.congested_calls, 3)
+
+    def test_raw_and_streamed_calls_raise_transient_statuses(self):
+        """
+        Tests raw and streamed calls raise a transient status for the limiter to see, and are retried as it directs
+        """
+        # Arrange
+        unavailable = []
+        self.transport.handler = lambda action, message: make_response('', status_code=503) if unavailable.pop() \
+            else sessions_by_id_response(['s1'])
+        limiter = RateLimiter(backoff=0.001, max_retries=1)
+        wrapper = ClientWrapper(self.client, limiter=limiter)
+        calls = [wrapper.call_service_raw, wrapper.call_service_streamed]
+        results = []
+        errors = []
+
+        for call in calls:
+            # Act
+            unavailable[:] = [False, True]
+            results.append(call('GetSessionsById', sessionIds={'guid': ['s1']}).status_code)
+            unavailable[:] = [True, True]
+            with self.assertRaises(TransportError) as raised:
+                call('GetSessionsById', sessionIds={'guid': ['s1']})
+            errors.append(raised.exception.status_code)
+
+        # Assert
+        self.assertEqual(results, [200, 200])
+        self.assertEqual(errors, [503, 503])
+        self.assertEqual(len(self.transport.posts), 8)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.congested_calls, 6)
+
+    def test_bounds_calls_in_flight(self):
+        """
+        Tests wrappers sharing a limiter never have more calls in flight than its limit, however many threads call
+        """
+        # Arrange
+        lock = threading.Lock()
+        counts = {'in_flight': 0, 'peak': 0}
+
+        def slow_handler(action, message):
+            with lock:
+                counts['in_flight'] += 1
+                counts['peak'] = max(counts['peak'], counts['in_flight'])
+            time.sleep(0.01)
+            with lock:
+                counts['in_flight'] -= 1
+            return sessions_by_id_response(['s1'])
+        self.transport.handler = slow_handler
+        limiter = RateLimiter(initial_concurrency=2, max_concurrency=2)
+        wrapper = ClientWrapper(self.client, limiter=limiter)
+        batch = ({'sessionIds': {'guid': ['s1']}} for _ in range(12))
+
+        # Act
+        results = list(wrapper.call_service_many('GetSessionsById', batch, max_concurrency=8))
+
+        # Assert
+        self.assertTrue(all(result.ok for result in results))
+        self.assertLessEqual(counts['peak'], 2)
@@ -0,0 +1,82 @@
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.ReportReader import ReportReader
+from soap_fixtures import FakeTransport, envelope, make_response, wsdl_path
+from zeep import Client
+import base64
+import io
+import unittest
+import zipfile
+
+
+REPORT_CSV = (
+    '﻿Session Name,Presenter,Views,Average Rating\r\n'
+    '"Intro, part 1",Ada,12,4.5\r\n'
+    'Wrap up,Grace,3,\r\n')
+
+
+def zipped_report() -> bytes:
+    """
+    A report archive as GetReport serves it.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('SessionUsage.csv', REPORT_CSV.encode('utf-8'))
+    return buffer.getvalue()
+
+
+class TestReportReader(unittest.TestCase):
+    """
+    Tests the ReportReader
+    """
+    def setUp(self):
+        self.transport = FakeTransport(lambda action, message: self.response)
+        self.usage = ClientWrapper(Client(wsdl_path('PublicAPI'), transport=self.transport))
+        self.response = None
+
+    def test_download_base64_envelope(self):
+        """
+        Tests a report sent as base64 in a SOAP envelope is decoded into parsed, typed rows
+        """
+        # Arrange
+        self.response = envelope(
+            '<GetReportResponse xmlns="http://tempuri.org/"><GetReportResult>{}</GetReportResult>'
+            '</GetReportResponse>'.format(base64.b64encode(zipped_report()).decode('ascii')))
+
+        # Act
+        with ReportReader.download(self.usage, 'report-id', chunk_size=7) as report:
+            rows = list(report)
+            headers = report.headers
+
+        # Assert
+        self.assertEqual(headers, ['Session Name', 'Presenter', 'Views', 'Average Rating'])
+        self.assertEqual(rows, [
+            {'Session Name': 'Intro, part 1', 'Presenter': 'Ada', 'Views': 12, 'Average Rating': 4.5},
+            {'Session Name': 'Wrap up', 'Presenter': 'Grace', 'Views': 3, 'Average Rating': None}])
+
+    def test_download_raw_zip(self):
+        """
+        Tests a report sent as the raw archive is read as is
+        """
+        # Arrange
+        self.response = make_response(zipped_report(), headers={'Content-Type': 'application/octet-stream'})
+
+        # Act
+        with ReportReader.download(self.usage, 'report-id') as report:
+            rows = list(report.rows(infer_types=False))
+
+        # Assert
+        self.assertEqual(rows[1], {'Session Name': 'Wrap up', 'Presenter': 'Grace', 'Views': '3', 'Average Rating': ''})
+
+    def test_infer_type_keeps_zero_padded_numbers(self):
+        """
+        Tests numbers are converted, but zero-padded ones stay text
+        """
+        # Arrange
+        values = ['0', '-12', '0.5', '1e3', '.5', '0012', '007.5', '00', 'Ada', '']
+
+        # Act
+        inferred = [ReportReader.infer_type(value) for value in values]
+
+        # Assert
+        self.assertEqual(inferred, [0, -12, 0.5, 1000.0, 0.5, '0012', '007.5', '00', 'Ada', None])
+        self.assertEqual([type(value) for value in inferred[:5]], [int, int, float, float, float])
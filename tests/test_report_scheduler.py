@@ -0,0 +1,150 @@
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.ReportReader import ReportReader
+from panopto_api.ReportScheduler import ReportScheduler, ReportTimeoutException, _PendingReport
+from soap_fixtures import DATACONTRACT_NS, FakeTransport, envelope, make_response, wsdl_path
+from test_report_reader import zipped_report
+from zeep import Client
+from concurrent.futures import CancelledError, Future
+from datetime import datetime
+from unittest import mock
+import threading
+import unittest
+
+
+REPORT_ID = '00000000-0000-0000-0000-00000000000a'
+
+
+def recent_reports_response(available: dict) -> str:
+    """
+    A GetRecentReports response listing reports by id with their availability.
+    """
+    reports = ''.join(
+        '<a:ReportInfo><a:IsAvailable>{}</a:IsAvailable><a:ReportId>{}</a:ReportId></a:ReportInfo>'.format(
+            'true' if is_available else 'false', report_id) for report_id, is_available in available.items())
+    return envelope(
+        '<GetRecentReportsResponse xmlns="http://tempuri.org/"><GetRecentReportsResult xmlns:a="{}">{}'
+        '</GetRecentReportsResult></GetRecentReportsResponse>'.format(DATACONTRACT_NS, reports))
+
+
+class TestReportScheduler(unittest.TestCase):
+    """
+    Tests the ReportScheduler
+    """
+    def setUp(self):
+        self.polls = 0
+        self.available_after = 2
+        self.lock = threading.Lock()
+        self.transport = FakeTransport(self.handle)
+        self.usage = ClientWrapper(Client(wsdl_path('PublicAPI'), transport=self.transport))
+
+    def handle(self, action, message):
+        if action == 'QueueReport':
+            return envelope(
+                '<QueueReportResponse xmlns="http://tempuri.org/"><QueueReportResult>{}</QueueReportResult>'
+                '</QueueReportResponse>'.format(REPORT_ID))
+        if action == 'GetRecentReports':
+            with self.lock:
+                self.polls += 1
+                available = self.polls >= self.available_after
+            return recent_reports_response({REPORT_ID.upper(): available})
+        return make_response(zipped_report(), headers={'Content-Type': 'application/octet-stream'})
+
+    def test_submit_polls_until_available_then_downloads(self):
+        """
+        Tests a queued report is polled for with backoff and downloaded once available
+        """
+        # Arrange
+        with ReportScheduler(self.usage, min_interval=0.01, max_interval=0.05) as scheduler:
+            # Act
+            future = scheduler.submit('SessionUsage', datetime(2024, 1, 1), datetime(2024, 2, 1))
+            with future.result(timeout=10) as report:
+                rows = list(report)
+
+        # Assert
+        self.assertEqual(self.polls, 2)
+        self.assertEqual(rows[0]['Presenter'], 'Ada')
+        actions = [post['headers']['SOAPAction'].strip('"').rsplit('/', 1)[-1] for post in self.transport.posts]
+        self.assertEqual(actions, ['QueueReport', 'GetRecentReports', 'GetRecentReports', 'GetReport'])
+
+    def test_polls_once_per_report_type(self):
+        """
+        Tests several pending reports of one type share each poll
+        """
+        # Arrange
+        recent = recent_reports_response({'a': True, 'b': True})
+        self.transport.handler = lambda action, message: (
+            recent if action == 'GetRecentReports' else self.handle(action, message))
+
+        with ReportScheduler(self.usage, min_interval=0.01) as scheduler:
+            # Act
+            futures = [scheduler.track('SessionUsage', 'A'), scheduler.track('SessionUsage', 'b')]
+            completed = list(scheduler.as_completed(futures, timeout=10))
+
+        # Assert
+        self.assertEqual(len(completed), 2)
+        polls = [post for post in self.transport.posts if b'GetRecentReports' in post['message']]
+        self.assertEqual(len(polls), 1)
+
+    def test_timeout(self):
+        """
+        Tests a report that never becomes available fails with ReportTimeoutException
+        """
+        # Arrange
+        self.available_after = float('inf')
+
+        with ReportScheduler(self.usage, min_interval=0.01, max_interval=0.02, timeout=0.1) as scheduler:
+            # Act
+            future = scheduler.track('SessionUsage', REPORT_ID)
+
+            # Assert
+            self.assertIsInstance(future.exception(timeout=10), ReportTimeoutException)
+
+    def test_shutdown_during_poll(self):
+        """
+        Tests reports cancelled by a shutdown while a poll is in progress aren't resolved or downloaded by that poll
+        """
+        # Arrange
+        polling, release = threading.Event(), threading.Event()
+        errors = []
+
+        def handler(action, message):
+            if action == 'GetRecentReports':
+                polling.set()
+                release.wait(10)
+                return recent_reports_response({REPORT_ID: True})
+            return self.handle(action, message)
+
+        self.transport.handler = handler
+        scheduler = ReportScheduler(self.usage, min_interval=0.01)
+        future = scheduler.track('SessionUsage', REPORT_ID)
+        self.assertTrue(polling.wait(10))
+
+        # Act
+        with mock.patch('threading.excepthook', errors.append):
+            scheduler.shutdown(wait=False)
+            release.set()
+            scheduler._poller.join(10)  # pylint: disable=protected-access
+
+        # Assert
+        self.assertIsInstance(future.exception(timeout=0), CancelledError)
+        self.assertEqual(errors, [])
+        self.assertFalse(any(b'GetReport>' in post['message'] for post in self.transport.posts))
+
+    def test_download_closed_if_undeliverable(self):
+        """
+        Tests a report downloaded for a future resolved in the meantime is closed rather than leaked
+        """
+        # Arrange
+        future = Future()
+        reader = mock.Mock()
+
+        def download(usage_client, report_id):
+            future.set_exception(CancelledError())
+            return reader
+
+        with ReportScheduler(self.usage) as scheduler, mock.patch.object(ReportReader, 'download', download):
+            # Act
+            scheduler._download(_PendingReport(REPORT_ID, future, None))  # pylint: disable=protected-access
+
+        # Assert
+        reader.close.assert_called_once_with()
@@ -0,0 +1,153 @@
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.ResponseCache import CacheStats, DiskCacheBackend, MemoryCacheBackend, ResponseCache
+from soap_fixtures import FakeTransport, sessions_by_id_response, wsdl_path
+from zeep import Client
+from datetime import datetime
+import os
+import tempfile
+import unittest
+
+
+class UnkeyableId(object):
+    """
+    An argument zeep renders as text, but with no canonical form for a cache key
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return self.value
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Tests the ResponseCache and its backends
+    """
+    def setUp(self):
+        self.transport = FakeTransport(lambda action, message: sessions_by_id_response(['s1']))
+        self.client = Client(wsdl_path('PublicAPI'), transport=self.transport)
+
+    def test_call_service_hits_skip_the_wire(self):
+        """
+        Tests a cached operation goes to the wire once per distinct set of arguments, and uncached operations always do
+        """
+        # Arrange
+        cache = ResponseCache({'GetSessionsById': 60})
+        wrapper = ClientWrapper(self.client, cache=cache)
+        uncached = ClientWrapper(self.client, cache=ResponseCache({'DescribeReportTypes': 60}))
+
+        # Act
+        first = wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+        second = wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+        wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s2']})
+        uncached.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+        uncached.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+
+        # Assert
+        self.assertIs(second, first)
+        self.assertEqual(first[0]['Name'], 'Session s1')
+        self.assertEqual(len(self.transport.posts), 4)
+        self.assertEqual(cache.stats('GetSessionsById'), CacheStats(hits=1, misses=2))
+        self.assertEqual(cache.stats(), CacheStats(hits=1, misses=2))
+
+    def test_key_is_canonical(self):
+        """
+        Tests argument ordering doesn't change the key, but addresses and values do
+        """
+        # Arrange
+        when = datetime(2024, 1, 1)
+
+        # Act
+        key = ResponseCache.key('http://a/svc', 'S', 'P', 'Op', {'x': 1, 'y': {'b': when, 'a': [1, 2]}})
+        same = ResponseCache.key('http://a/svc', 'S', 'P', 'Op', {'y': {'a': [1, 2], 'b': when}, 'x': 1})
+        other_host = ResponseCache.key('http://b/svc', 'S', 'P', 'Op', {'x': 1, 'y': {'b': when, 'a': [1, 2]}})
+        other_user = ResponseCache.key('http://a/svc', 'S', 'P', 'Op', {'x': 1, 'y': {'b': when, 'a': [1, 2]}},
+                                       identity='other')
+        records = ResponseCache.key('http://a/svc', 'S', 'P', 'Op', {'x': 1, 'y': {'b': when, 'a': [1, 2]}},
+                                    results=ClientWrapper.RECORD_RESULTS)
+
+        # Assert
+        self.assertEqual(key, same)
+        self.assertEqual(len({key, other_host, other_user, records}), 4)
+        with self.assertRaises(TypeError):
+            ResponseCache.key('http://a/svc', 'S', 'P', 'Op', {'x': object()})
+        self.assertTrue(key.startswith('Op:'))
+
+    def test_expired_entries_miss(self):
+        """
+        Tests entries past their ttl are misses
+        """
+        # Arrange
+        cache = ResponseCache()
+        cache.set('Op:key', 'value', ttl=-1)
+
+        # Act
+        hit, value = cache.get('Op:key')
+
+        # Assert
+        self.assertEqual((hit, value), (False, None))
+        self.assertEqual(len(cache.backend), 0)
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        """
+        Tests the memory backend keeps the most recently used entries within its bound
+        """
+        # Arrange
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set('a', 0, 'A')
+        backend.set('b', 0, 'B')
+        backend.get('a')
+
+        # Act
+        backend.set('c', 0, 'C')
+
+        # Assert
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), (0, 'A'))
+
+    def test_disk_backend_persists_and_evicts(self):
+        """
+        Tests the disk backend survives reopening and keeps within its bound
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # Arrange
+            path = os.path.join(cache_dir, 'responses.sqlite')
+            backend = DiskCacheBackend(path, max_entries=2)
+            for key in ('a', 'b', 'c'):
+                backend.set(key, 1.0, {'key': key})
+            backend.close()
+
+            # Act
+            reopened = DiskCacheBackend(path)
+            entries = [reopened.get(key) for key in ('a', 'b', 'c')]
+            reopened.close()
+
+        # Assert
+        self.assertEqual(entries, [None, (1.0, {'key': 'b'}), (1.0, {'key': 'c'})])
+
+    def test_calls_cached_per_identity_and_results(self):
+        """
+        Tests wrappers of different users, or unpacking into different results, don't share entries, and calls with
+        arguments that can't be keyed aren't cached
+        """
+        # Arrange
+        class Authenticator(object):
+            def __init__(self, username):
+                self.username = username
+                self.cookie = None
+
+        cache = ResponseCache({'GetSessionsById': 60})
+        admin = ClientWrapper(self.client, cache=cache, authenticator=Authenticator('admin'))
+        viewer = ClientWrapper(self.client, cache=cache, authenticator=Authenticator('viewer'))
+        records = ClientWrapper(self.client, cache=cache, authenticator=Authenticator('admin'),
+                                results=ClientWrapper.RECORD_RESULTS)
+
+        # Act
+        for wrapper in (admin, viewer, records, admin):
+            wrapper.call_service('GetSessionsById', sessionIds={'guid': ['s1']})
+        for _ in range(2):
+            admin.call_service('GetSessionsById', sessionIds={'guid': [UnkeyableId('s1')]})
+
+        # Assert
+        self.assertEqual(cache.stats(), CacheStats(hits=1, misses=3))
+        self.assertEqual(len(self.transport.posts), 5)
@@ -0,0 +1,50 @@
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.ServiceRegistry import ServiceRegistry
+from panopto_api.WsdlCache import WsdlCache
+from soap_fixtures import read_wsdl, wsdl_path
+import tempfile
+import unittest
+
+
+class TestServiceRegistry(unittest.TestCase):
+    """
+    Tests the ServiceRegistry
+    """
+    def test_document_parsed_once(self):
+        """
+        Tests the same service version is parsed once
+        """
+        # Arrange
+        registry = ServiceRegistry()
+
+        # Act
+        first = registry.get_document('Auth', '4.2', wsdl_path('Auth'))
+        second = registry.get_document('Auth', '4.2', wsdl_path('Auth'))
+
+        # Assert
+        self.assertIs(first, second)
+
+    def test_clients_share_document_across_hosts(self):
+        """
+        Tests clients for different hosts share a document and definitions but bind to their own host
+        """
+        # Arrange
+        registry = ServiceRegistry()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = WsdlCache(cache_dir)
+            for host in ('one.example.com', 'two.example.com'):
+                cache.store(host, 'Auth', '4.2', read_wsdl('Auth'))
+            factories = [AuthenticatedClientFactory(host, 'admin', 'password', wsdl_cache=cache,
+                                                    service_registry=registry)
+                         for host in ('one.example.com', 'two.example.com')]
+
+            # Act
+            clients = [factory.get_client('Auth', authenticate_now=False) for factory in factories]
+
+        # Assert
+        self.assertIs(clients[0].client.wsdl, clients[1].client.wsdl)
+        self.assertIs(clients[0].services, clients[1].services)
+        self.assertEqual(
+            [c._service._binding_options['address'] for c in clients],  # pylint: disable=protected-access
+            ['http://one.example.com/Panopto/PublicAPI/4.2/Auth.svc',
+             'http://two.example.com/Panopto/PublicAPI/4.2/Auth.svc'])
@@ -0,0 +1,148 @@
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.SessionStore import FileSessionStore, SessionStore
+from panopto_api.WsdlCache import WsdlCache
+from soap_fixtures import FakeTransport, envelope, make_response, read_wsdl
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+
+LOG_ON_RESPONSE = envelope(
+    '<LogOnWithPasswordResponse xmlns="http://tempuri.org/">'
+    '<LogOnWithPasswordResult>true</LogOnWithPasswordResult>'
+    '</LogOnWithPasswordResponse>')
+
+
+class TestSessionStore(unittest.TestCase):
+    """
+    Tests persisting cookies in a session store and reusing them across factories
+    """
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = WsdlCache(self.cache_dir.name)
+        self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+        self.store = FileSessionStore(os.path.join(self.cache_dir.name, 'sessions.json'))
+        self.logons = 0
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def handler(self, action, message):
+        """
+        Answer LogOnWithPassword with a new cookie each time
+        """
+        self.logons += 1
+        return make_response(LOG_ON_RESPONSE, headers={
+            'Set-Cookie': '.ASPXAUTH={}; path=/; max-age=3600; HttpOnly'.format(self.logons)})
+
+    def factory(self) -> AuthenticatedClientFactory:
+        return AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache,
+                                          transport=FakeTransport(self.handler), session_store=self.store)
+
+    def test_expiry(self):
+        """
+        Tests cookie expiry is read from Max-Age or Expires, falling back to the default ttl
+        """
+        # Arrange
+        store = FileSessionStore(self.store.path, default_ttl=100)
+        now = time.time()
+
+        # Act
+        max_age = store.expiry('.ASPXAUTH=x; max-age=60; path=/')
+        expires = store.expiry('.ASPXAUTH=x; expires=Wed, 01 Jan 2031 00:00:00 GMT; path=/')
+        default = store.expiry('.ASPXAUTH=x; path=/')
+
+        # Assert
+        self.assertAlmostEqual(max_age, now + 60, delta=5)
+        self.assertEqual(expires, 1924992000)
+        self.assertAlmostEqual(default, now + 100, delta=5)
+
+    def test_expired_cookies_are_not_loaded(self):
+        """
+        Tests a cookie within the margin of its expiry isn't handed out
+        """
+        # Arrange
+        self.store.save('localhost', 'admin', '.ASPXAUTH=old; max-age=30')
+        self.store.save('localhost', 'other', '.ASPXAUTH=new; max-age=3600')
+
+        # Act
+        old = self.store.load('localhost', 'admin')
+        new = self.store.load('localhost', 'other')
+
+        # Assert
+        self.assertIsNone(old)
+        self.assertEqual(new, '.ASPXAUTH=new; max-age=3600')
+
+    def test_new_factory_reuses_stored_cookie(self):
+        """
+        Tests a second factory sharing the store authenticates without logging on
+        """
+        # Arrange
+        self.factory().get_client('Auth')
+
+        # Act
+        second = self.factory()
+        client = second.get_client('Auth')
+
+        # Assert
+        self.assertEqual(self.logons, 1)
+        self.assertEqual(client.client.transport.session.headers['Cookie'], second.cookie)
+        self.assertTrue(second.cookie.startswith('.ASPXAUTH=1;'))
+
+    def test_refresh_adopts_cookie_renewed_elsewhere(self):
+        """
+        Tests a factory finding its cookie stale adopts one another factory already renewed, rather than logging on
+        """
+        # Arrange
+        first, second = self.factory(), self.factory()
+        first.get_client('Auth')
+        second.get_client('Auth')
+        stale_cookie = second.cookie
+        first.refresh_authentication(stale_cookie)
+
+        # Act
+        refreshed = second.refresh_authentication(stale_cookie)
+
+        # Assert
+        self.assertTrue(refreshed)
+        self.assertEqual(self.logons, 2)
+        self.assertEqual(second.cookie, first.cookie)
+
+    def test_store_is_abstract(self):
+        """
+        Tests a store must implement load, save and clear
+        """
+        # Arrange
+        class PartialStore(SessionStore):
+            def load(self, host, username):
+                return None
+
+        # Act
+        with self.assertRaises(TypeError):
+            PartialStore()
+
+        # Assert
+        with self.assertRaises(TypeError):
+            SessionStore()  # pylint: disable=abstract-class-instantiated
+
+    def test_concurrent_saves_keep_every_session(self):
+        """
+        Tests saves of different users don't overwrite each other, including saves made under the store's lock
+        """
+        # Arrange
+        usernames = ['user{}'.format(i) for i in range(16)]
+        copy = pickle.loads(pickle.dumps(self.store))
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda username: self.store.save('localhost', username, '.ASPXAUTH=' + username),
+                              usernames))
+        with copy.lock('localhost', 'admin'):
+            copy.save('localhost', 'admin', '.ASPXAUTH=admin')
+
+        # Assert
+        for username in usernames + ['admin']:
+            self.assertEqual(self.store.load('localhost', username), '.ASPXAUTH=' + username)
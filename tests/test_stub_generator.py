@@ -0,0 +1,107 @@
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.ClientWrapper import ClientWrapper
+from panopto_api.ServiceStub import StubPackage
+from panopto_api.StubGenerator import StubGenerator
+from soap_fixtures import FakeTransport, envelope, list_users_response, make_response, read_wsdl
+from zeep import Client
+import os
+import sys
+import tempfile
+import unittest
+
+
+LOG_ON_RESPONSE = envelope(
+    '<LogOnWithPasswordResponse xmlns="http://tempuri.org/">'
+    '<LogOnWithPasswordResult>true</LogOnWithPasswordResult>'
+    '</LogOnWithPasswordResponse>')
+
+
+class TestStubGenerator(unittest.TestCase):
+    """
+    Tests generating service stubs and constructing clients from them
+    """
+    def setUp(self):
+        self.stub_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.stub_dir.cleanup)
+        self.package = 'stubs_{}'.format(self.id().rsplit('.', 1)[-1])
+        package_dir = os.path.join(self.stub_dir.name, self.package)
+        os.makedirs(package_dir)
+        open(os.path.join(package_dir, '__init__.py'), 'w').close()
+        StubGenerator('Auth', '4.2', read_wsdl('Auth')).write(package_dir)
+        # the test PublicAPI wsdl stands in for the UserManagement service
+        StubGenerator('UserManagement', '4.0', read_wsdl('PublicAPI')).write(package_dir)
+        sys.path.insert(0, self.stub_dir.name)
+        self.addCleanup(sys.path.remove, self.stub_dir.name)
+        self.transport = FakeTransport(self.handler)
+
+    def handler(self, action, message):
+        if action == 'LogOnWithPassword':
+            return make_response(LOG_ON_RESPONSE, headers={'Set-Cookie': '.ASPXAUTH=1'})
+        return list_users_response(['u1', 'u2'], 2)
+
+    def test_stub_matches_wsdl(self):
+        """
+        Tests a stub carries the same definitions a wrapper derives from the wsdl
+        """
+        # Arrange
+        stubs = StubPackage(self.package)
+        wrapper = ClientWrapper(Client(os.path.join(os.path.dirname(__file__), 'data', 'PublicAPI.wsdl')))
+
+        # Act
+        module = stubs.module('UserManagement', '4.0')
+
+        # Assert
+        self.assertEqual(module.SERVICES, wrapper.services)
+        self.assertEqual(module.ELEMENTS, wrapper.elements)
+        self.assertEqual(module.TYPES, wrapper.types)
+        self.assertEqual(module.WSDL.encode('utf-8'), read_wsdl('PublicAPI'))
+        self.assertIsNone(stubs.module('SessionManagement', '4.6'))
+
+    def test_factory_builds_clients_from_stubs(self):
+        """
+        Tests the factory constructs clients from stubs without loading the wsdl, sharing the stub's definitions
+        """
+        # Arrange
+        stubs = StubPackage(self.package)
+        factory = AuthenticatedClientFactory('one.example.com', 'admin', 'password', transport=self.transport,
+                                             stubs=stubs)
+        other = AuthenticatedClientFactory('two.example.com', 'admin', 'password', transport=self.transport,
+                                           stubs=stubs)
+
+        # Act
+        client = factory.get_client('UserManagement')
+        other_client = other.get_client('UserManagement', authenticate_now=False)
+
+        # Assert
+        module = stubs.module('UserManagement', '4.0')
+        self.assertIs(client.client.wsdl, other_client.client.wsdl)
+        self.assertIs(client.services, module.SERVICES)
+        self.assertEqual(
+            [c._service._binding_options['address'] for c in (client, other_client)],  # pylint: disable=protected-access
+            ['http://one.example.com/Panopto/PublicAPI/4.0/PublicAPI.svc',
+             'http://two.example.com/Panopto/PublicAPI/4.0/PublicAPI.svc'])
+        self.assertEqual([post['address'] for post in self.transport.posts],
+                         ['https://one.example.com/Panopto/PublicAPI/4.2/Auth.svc'])
+
+    def test_typed_operations(self):
+        """
+        Tests a stub's operations take and return records
+        """
+        # Arrange
+        factory = AuthenticatedClientFactory('localhost', 'admin', 'password', transport=self.transport,
+                                             stubs=StubPackage(self.package))
+        stub = factory.get_stub('UserManagement')
+        module = sys.modules['{}.UserManagement_4_0'.format(self.package)]
+
+        # Act
+        response = stub.ListUsers(parameters=module.ListUsersRequest(
+            Pagination=module.Pagination(MaxNumberResults=2, PageNumber=0)), searchQuery='user')
+
+        # Assert
+        self.assertIsInstance(response, module.ListUsersResponse)
+        self.assertEqual(response.TotalNumberResults, 2)
+        users = response.PagedResults.User
+        self.assertEqual([user.UserId for user in users], ['u1', 'u2'])
+        self.assertEqual(users[0]['Email'], 'u1@example.com')
+        self.assertEqual(response.to_dict(), factory.get_client('UserManagement').call_service('ListUsers'))
+        self.assertIn(b'<ns1:MaxNumberResults>2</ns1:MaxNumberResults>', self.transport.posts[1]['message'])
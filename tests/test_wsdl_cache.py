@@ -0,0 +1,93 @@
+from panopto_api.AuthenticatedClientFactory import AuthenticatedClientFactory
+from panopto_api.WsdlCache import WsdlCache
+from soap_fixtures import read_wsdl
+import os
+import tempfile
+import time
+import unittest
+
+
+class TestWsdlCache(unittest.TestCase):
+    """
+    Tests the WsdlCache
+    """
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = WsdlCache(self.cache_dir.name, ttl=60)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_store_and_get(self):
+        """
+        Tests a stored WSDL is returned for its host, service and version only
+        """
+        # Act
+        path = self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+
+        # Assert
+        self.assertEqual(self.cache.get('localhost', 'Auth', '4.2'), path)
+        self.assertIsNone(self.cache.get('localhost', 'Auth', '4.0'))
+        self.assertIsNone(self.cache.get('otherhost', 'Auth', '4.2'))
+
+    def test_stale_entry(self):
+        """
+        Tests an entry older than the ttl is not returned
+        """
+        # Arrange
+        path = self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+        stale = time.time() - 120
+        os.utime(path, (stale, stale))
+
+        # Act
+        response = self.cache.get('localhost', 'Auth', '4.2')
+
+        # Assert
+        self.assertIsNone(response)
+
+    def test_invalidate(self):
+        """
+        Tests invalidation by service leaves other entries alone
+        """
+        # Arrange
+        self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+        self.cache.store('localhost', 'UsageReporting', '4.0', read_wsdl('PublicAPI'))
+
+        # Act
+        removed = self.cache.invalidate(service='Auth')
+
+        # Assert
+        self.assertEqual(removed, 1)
+        self.assertIsNone(self.cache.get('localhost', 'Auth', '4.2'))
+        self.assertIsNotNone(self.cache.get('localhost', 'UsageReporting', '4.0'))
+
+    def test_schemes_are_cached_apart(self):
+        """
+        Tests a WSDL fetched over http isn't returned for https, and invalidation removes both
+        """
+        # Arrange
+        plain = self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+
+        # Act
+        missed = self.cache.get('localhost', 'Auth', '4.2', over_ssl=True)
+        secure = self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'), over_ssl=True)
+        removed = self.cache.invalidate(host='localhost')
+
+        # Assert
+        self.assertIsNone(missed)
+        self.assertNotEqual(plain, secure)
+        self.assertEqual(removed, 2)
+
+    def test_get_client_from_cache(self):
+        """
+        Tests the factory builds a client from a cached WSDL without downloading it
+        """
+        # Arrange
+        self.cache.store('localhost', 'Auth', '4.2', read_wsdl('Auth'))
+        auth = AuthenticatedClientFactory('localhost', 'admin', 'password', wsdl_cache=self.cache)
+
+        # Act
+        client = auth.get_client('Auth', authenticate_now=False)
+
+        # Assert
+        self.assertEqual(client.bound_operation(), ['LogOnWithPassword'])